@@ -1,4 +1,10 @@
-from config import AI_SKILLS
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from config import AI_SKILLS, AI_SKILL_CACHE_SIZE
 
 
 class AIDetector:
@@ -14,6 +20,9 @@ class AIDetector:
         self.ai_skills = custom_ai_skills if custom_ai_skills else AI_SKILLS
         # Chuyển về lowercase để so sánh không phân biệt hoa thường
         self.ai_skills_lower = [skill.lower() for skill in self.ai_skills]
+        self._compile_matcher()
+        # Memo kết quả theo từng giá trị skill, dùng lại giữa các lần gọi
+        self._is_ai_cached = lru_cache(maxsize=AI_SKILL_CACHE_SIZE)(self.is_ai_project)
 
     def is_ai_project(self, skill):
         """
@@ -31,15 +40,43 @@ class AIDetector:
         skill_lower = str(skill).lower().strip()
 
         # Kiểm tra exact match
-        if skill_lower in self.ai_skills_lower:
+        if skill_lower in self._ai_skills_set:
             return True
 
-        # Kiểm tra partial match
-        for ai_skill in self.ai_skills_lower:
-            if ai_skill in skill_lower:
-                return True
+        # Kiểm tra partial match (một lần quét cho tất cả skill AI)
+        if self._ai_skills_pattern is None:
+            return False
+        return self._ai_skills_pattern.search(skill_lower) is not None
+
+    def _compile_matcher(self):
+        """Gộp danh sách skill AI thành set (exact match) và regex (partial match)"""
+        self._ai_skills_set = set(self.ai_skills_lower)
+
+        if not self._ai_skills_set:
+            self._ai_skills_pattern = None
+            return
+
+        # Regex dạng "skill1|skill2|..." tương đương với kiểm tra ai_skill in skill
+        terms = sorted(self._ai_skills_set, key=len, reverse=True)
+        self._ai_skills_pattern = re.compile("|".join(map(re.escape, terms)))
+
+    def detect(self, skills):
+        """
+        Nhận diện AI cho cả một Series skill
+
+        Args:
+            skills: Series chứa skill
+
+        Returns:
+            numpy array bool: True tại các dòng là AI project
+        """
+        # Chỉ phân loại mỗi giá trị skill duy nhất một lần rồi broadcast lại
+        codes, uniques = pd.factorize(skills)
+        flags = [self._is_ai_cached(skill) for skill in uniques]
 
-        return False
+        # Thêm False ở cuối cho code -1 (ô trống)
+        flags = np.array(flags + [False], dtype=bool)
+        return flags[codes]
 
     def mark_ai_projects(self, df, skill_column="Skill"):
         """
@@ -53,9 +90,8 @@ class AIDetector:
             DataFrame với cột 'AI Project' mới
         """
         # Nếu là AI thì ghi "AI", không thì để trống ""
-        df["AI Project"] = df[skill_column].apply(
-            lambda x: "AI" if self.is_ai_project(x) else ""
-        )
+        is_ai = self.detect(df[skill_column])
+        df["AI Project"] = np.where(is_ai, "AI", "").astype(object)
         return df
 
     def add_ai_skill(self, skill):
@@ -68,6 +104,8 @@ class AIDetector:
         if skill and skill not in self.ai_skills:
             self.ai_skills.append(skill)
             self.ai_skills_lower.append(skill.lower())
+            self._compile_matcher()
+            self._is_ai_cached.cache_clear()
 
     def get_ai_skills_list(self):
         """
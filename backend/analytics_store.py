@@ -0,0 +1,381 @@
+"""
+Kho phân tích (SQLite) lưu lịch sử effort nhiều năm: assignment gốc, dữ liệu
+phân bổ theo tháng và ratecard, có index để truy vấn theo tháng/project
+Chỉ là một file SQLite, không cần service ngoài
+"""
+
+import contextlib
+import os
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from config import ANALYTICS_DB_PATH
+from ratecard_cache import build_revenue_mapping
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS sources (
+        source_id INTEGER PRIMARY KEY,
+        source_hash TEXT NOT NULL UNIQUE,
+        source_file TEXT,
+        ratecard_hash TEXT NOT NULL,
+        rows INTEGER NOT NULL,
+        loaded_at TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS ratecards (
+        ratecard_hash TEXT NOT NULL,
+        project_code TEXT NOT NULL,
+        ratecard REAL NOT NULL,
+        PRIMARY KEY (ratecard_hash, project_code)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS assignments (
+        source_id INTEGER NOT NULL,
+        row_no INTEGER NOT NULL,
+        username TEXT,
+        mail TEXT,
+        project_code TEXT,
+        member_type TEXT,
+        skill TEXT,
+        ai_project TEXT,
+        from_date TEXT,
+        to_date TEXT,
+        calendar_effort REAL,
+        revenue REAL,
+        PRIMARY KEY (source_id, row_no)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_assignments_project "
+    "ON assignments (project_code)",
+    """
+    CREATE TABLE IF NOT EXISTS monthly_allocation (
+        source_id INTEGER NOT NULL,
+        year INTEGER NOT NULL,
+        month INTEGER NOT NULL,
+        username TEXT,
+        project_code TEXT,
+        member_type TEXT,
+        ai_project TEXT,
+        calendar_effort REAL,
+        revenue REAL,
+        rev_eff REAL,
+        ai_rev REAL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_monthly_month "
+    "ON monthly_allocation (year, month)",
+    "CREATE INDEX IF NOT EXISTS idx_monthly_project "
+    "ON monthly_allocation (project_code, year, month)",
+    "CREATE INDEX IF NOT EXISTS idx_monthly_source "
+    "ON monthly_allocation (source_id)",
+]
+
+# Cột DataFrame → cột bảng (theo thứ tự insert)
+ASSIGNMENT_COLUMNS = {
+    "Username": "username",
+    "MAIL": "mail",
+    "Project Code": "project_code",
+    "Member Type": "member_type",
+    "Skill": "skill",
+    "AI Project": "ai_project",
+    "From Date": "from_date",
+    "To Date": "to_date",
+    "Calendar Effort": "calendar_effort",
+    "Revenue": "revenue",
+}
+
+MONTHLY_COLUMNS = {
+    "Year": "year",
+    "Month": "month",
+    "Username": "username",
+    "Project Code": "project_code",
+    "Member Type": "member_type",
+    "AI Project": "ai_project",
+    "Calendar Effort": "calendar_effort",
+    "Revenue": "revenue",
+    "REVxEFF": "rev_eff",
+    "AI-REV": "ai_rev",
+}
+
+
+def _connect(db_path):
+    """Mở kết nối SQLite (mỗi thread/process dùng kết nối riêng)"""
+    connection = sqlite3.connect(db_path, timeout=30)
+    connection.execute("PRAGMA journal_mode=WAL")
+    # WAL + NORMAL không fsync mỗi transaction nhưng file vẫn không bị hỏng
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+def _column_values(df, column):
+    """
+    Giá trị một cột để bind vào SQLite (NaN được SQLite lưu thành NULL)
+
+    Args:
+        df: DataFrame
+        column: Tên cột, thiếu cột thì trả về NULL
+
+    Returns:
+        list giá trị Python
+    """
+    if column not in df.columns:
+        return [None] * len(df)
+    values = df[column]
+    if pd.api.types.is_datetime64_any_dtype(values):
+        values = values.dt.strftime("%Y-%m-%d")
+    return values.astype(object).tolist()
+
+
+def _get_month_filter(month_list):
+    """
+    Điều kiện WHERE lọc theo danh sách (year, month), điều kiện khoảng năm
+    để SQLite dùng được index (year, month)
+    """
+    keys = sorted({int(year) * 12 + int(month) - 1 for year, month in month_list})
+    placeholders = ", ".join("?" * len(keys))
+    return (
+        f"year BETWEEN ? AND ? AND (year * 12 + month - 1) IN ({placeholders})",
+        [keys[0] // 12, keys[-1] // 12] + keys,
+    )
+
+
+def _get_source_filter(source_hashes):
+    """Điều kiện WHERE lọc theo danh sách file nguồn (None là tất cả)"""
+    if source_hashes is None:
+        return "1 = 1", []
+    placeholders = ", ".join("?" * len(source_hashes))
+    return (
+        "source_id IN (SELECT source_id FROM sources "
+        f"WHERE source_hash IN ({placeholders}))",
+        list(source_hashes),
+    )
+
+
+class AnalyticsStore:
+    """Class nạp dữ liệu của DataProcessor vào SQLite và tính metrics bằng SQL"""
+
+    def __init__(self, db_path=ANALYTICS_DB_PATH):
+        """
+        Khởi tạo Analytics Store, tạo bảng và index nếu chưa có
+
+        Args:
+            db_path: Đường dẫn file SQLite
+        """
+        self.db_path = db_path
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with contextlib.closing(_connect(db_path)) as connection, connection:
+            for statement in SCHEMA:
+                connection.execute(statement)
+
+    def load_ratecard(self, ratecard_hash, df_project_code):
+        """
+        Lưu ratecard (bỏ qua nếu ratecard này đã được lưu)
+
+        Args:
+            ratecard_hash: SHA-256 của file project_code.xlsx
+            df_project_code: DataFrame có cột Project Code và Ratecard
+        """
+        with contextlib.closing(_connect(self.db_path)) as connection, connection:
+            exists = connection.execute(
+                "SELECT 1 FROM ratecards WHERE ratecard_hash = ? LIMIT 1",
+                [ratecard_hash],
+            ).fetchone()
+            if exists:
+                return
+            connection.executemany(
+                "INSERT OR REPLACE INTO ratecards "
+                "(ratecard_hash, project_code, ratecard) VALUES (?, ?, ?)",
+                [
+                    (ratecard_hash, project_code, ratecard)
+                    for project_code, ratecard in build_revenue_mapping(
+                        df_project_code
+                    ).items()
+                ],
+            )
+
+    def load_source(
+        self, source_hash, source_file, ratecard_hash, df_input, df_monthly
+    ):
+        """
+        Nạp dữ liệu của một file input (ghi đè lần nạp trước của cùng file)
+
+        Toàn bộ được ghi bằng executemany trong một transaction, các dòng
+        tham chiếu file nguồn bằng source_id (số nguyên) thay vì hash.
+
+        Args:
+            source_hash: SHA-256 của file input
+            source_file: Đường dẫn file input (chỉ để tham khảo)
+            ratecard_hash: SHA-256 của ratecard dùng để tính Revenue
+            df_input: DataFrame input đã có Revenue, MAIL, AI Project
+            df_monthly: DataFrame đã phân bổ theo tháng, có REVxEFF và AI-REV
+        """
+        assignment_columns = ", ".join(ASSIGNMENT_COLUMNS.values())
+        monthly_columns = ", ".join(MONTHLY_COLUMNS.values())
+
+        with contextlib.closing(_connect(self.db_path)) as connection, connection:
+            row = connection.execute(
+                "SELECT source_id FROM sources WHERE source_hash = ?", [source_hash]
+            ).fetchone()
+            if row is not None:
+                for table in ["assignments", "monthly_allocation", "sources"]:
+                    connection.execute(
+                        f"DELETE FROM {table} WHERE source_id = ?", [row[0]]
+                    )
+
+            source_id = connection.execute(
+                "INSERT INTO sources (source_hash, source_file, ratecard_hash, rows, "
+                "loaded_at) VALUES (?, ?, ?, ?, ?)",
+                [
+                    source_hash,
+                    os.path.basename(source_file) if source_file else None,
+                    ratecard_hash,
+                    len(df_input),
+                    datetime.now().isoformat(timespec="seconds"),
+                ],
+            ).lastrowid
+
+            connection.executemany(
+                f"INSERT INTO assignments (source_id, row_no, {assignment_columns}) "
+                f"VALUES ({', '.join('?' * (len(ASSIGNMENT_COLUMNS) + 2))})",
+                zip(
+                    [source_id] * len(df_input),
+                    range(1, len(df_input) + 1),
+                    *(
+                        _column_values(df_input, column)
+                        for column in ASSIGNMENT_COLUMNS
+                    ),
+                ),
+            )
+            connection.executemany(
+                f"INSERT INTO monthly_allocation (source_id, {monthly_columns}) "
+                f"VALUES ({', '.join('?' * (len(MONTHLY_COLUMNS) + 1))})",
+                zip(
+                    [source_id] * len(df_monthly),
+                    *(_column_values(df_monthly, column) for column in MONTHLY_COLUMNS),
+                ),
+            )
+
+    def get_monthly_metrics(self, month_list, source_hashes=None):
+        """
+        Tính các metrics theo tháng cho sheet Summary bằng SQL
+
+        Kết quả giống RevenueCalculator.get_monthly_metrics.
+
+        Args:
+            month_list: Danh sách (year, month) theo thứ tự cột
+            source_hashes: Chỉ tính trên các file nguồn này (None là tất cả)
+
+        Returns:
+            DataFrame index (Year, Month) theo month_list, các cột là
+            MONTHLY_METRICS. Revenue là NaN nếu tháng không có dòng dữ liệu
+            tương ứng, số member là 0.
+        """
+        month_index = pd.MultiIndex.from_tuples(
+            [(int(year), int(month)) for year, month in month_list],
+            names=["Year", "Month"],
+        )
+        if month_index.empty:
+            # Input không có ngày hợp lệ thì không có tháng nào để tính
+            return pd.DataFrame(
+                {
+                    "Total Revenue": np.array([], dtype="float64"),
+                    "AI Revenue": np.array([], dtype="float64"),
+                    "Actual Member": np.array([], dtype=np.int64),
+                    "Actual Member (AI)": np.array([], dtype=np.int64),
+                    "X-Job Member": np.array([], dtype=np.int64),
+                },
+                index=month_index,
+            )
+
+        month_filter, month_params = _get_month_filter(month_list)
+        source_filter, source_params = _get_source_filter(source_hashes)
+
+        with contextlib.closing(_connect(self.db_path)) as connection:
+            grouped = pd.read_sql_query(
+                f"""
+                SELECT
+                    year AS "Year",
+                    month AS "Month",
+                    SUM(ROUND(COALESCE(rev_eff, 0) * 100)) / 100.0
+                        AS "Total Revenue",
+                    SUM(
+                        CASE WHEN ai_project = 'AI'
+                        THEN ROUND(COALESCE(rev_eff, 0) * 100) END
+                    ) / 100.0 AS "AI Revenue",
+                    COUNT(DISTINCT username) AS "Actual Member",
+                    COUNT(DISTINCT CASE WHEN ai_project = 'AI' THEN username END)
+                        AS "Actual Member (AI)",
+                    COUNT(DISTINCT CASE WHEN member_type = 'X-Jobs' THEN username END)
+                        AS "X-Job Member"
+                FROM monthly_allocation
+                WHERE {month_filter} AND {source_filter}
+                GROUP BY year, month
+                """,
+                connection,
+                params=month_params + source_params,
+            )
+
+        grouped = grouped.set_index(["Year", "Month"]).reindex(month_index)
+
+        metrics = pd.DataFrame(index=month_index)
+        metrics["Total Revenue"] = grouped["Total Revenue"].astype("float64")
+        metrics["AI Revenue"] = grouped["AI Revenue"].astype("float64")
+        for column in ["Actual Member", "Actual Member (AI)", "X-Job Member"]:
+            metrics[column] = grouped[column].fillna(0).astype(np.int64)
+
+        return metrics
+
+    def get_revenue_by_project(self, date_range=None, source_hashes=None):
+        """
+        Revenue và effort theo project và tháng
+
+        Args:
+            date_range: ((start_year, start_month), (end_year, end_month))
+                hoặc None để lấy toàn bộ lịch sử
+            source_hashes: Chỉ tính trên các file nguồn này (None là tất cả)
+
+        Returns:
+            DataFrame: Project Code, Year, Month, Calendar Effort, Revenue,
+            AI Revenue
+        """
+        conditions, params = [], []
+        if date_range is not None:
+            (start_year, start_month), (end_year, end_month) = date_range
+            conditions.append(
+                "year BETWEEN ? AND ? AND year * 12 + month BETWEEN ? AND ?"
+            )
+            params += [
+                start_year,
+                end_year,
+                start_year * 12 + start_month,
+                end_year * 12 + end_month,
+            ]
+        source_filter, source_params = _get_source_filter(source_hashes)
+        conditions.append(source_filter)
+        params += source_params
+
+        with contextlib.closing(_connect(self.db_path)) as connection:
+            return pd.read_sql_query(
+                f"""
+                SELECT
+                    project_code AS "Project Code",
+                    year AS "Year",
+                    month AS "Month",
+                    ROUND(TOTAL(calendar_effort), 2) AS "Calendar Effort",
+                    ROUND(TOTAL(rev_eff), 2) AS "Revenue",
+                    ROUND(TOTAL(ai_rev), 2) AS "AI Revenue"
+                FROM monthly_allocation
+                WHERE {" AND ".join(conditions)}
+                GROUP BY project_code, year, month
+                ORDER BY project_code, year, month
+                """,
+                connection,
+                params=params,
+            )
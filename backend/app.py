@@ -2,12 +2,15 @@
 Flask API Server cho Project Report Tool
 """
 
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file, stream_with_context
 from flask_cors import CORS
+import json
 import os
+import time
 from werkzeug.utils import secure_filename
 import tempfile
 import shutil
+import uuid
 
 from data_processor import DataProcessor
 from ai_detector import AIDetector
@@ -15,6 +18,10 @@ from calculator import RevenueCalculator
 from report_generator import ReportGenerator
 from main import ProjectReportTool
 from main_multi_files import MultiFileProjectReportTool
+from job_queue import JobQueue, JOB_QUEUED, JOB_RUNNING, JOB_DONE, JOB_FAILED
+from result_cache import ResultCache
+from ratecard_cache import ratecard_cache
+from config import JOB_EVENT_POLL_SECONDS, SSE_KEEPALIVE_SECONDS
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS cho React
@@ -31,70 +38,215 @@ app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
 app.config["OUTPUT_FOLDER"] = OUTPUT_FOLDER
 app.config["MAX_CONTENT_LENGTH"] = 50 * 1024 * 1024  # 50MB max
 
+# Job xử lý báo cáo chạy nền, API trả về job_id ngay
+# Job dở dang của process server đã dừng được đánh dấu lỗi ngay khi nạp app
+# (kể cả khi chạy bằng gunicorn hoặc flask run), job của worker khác còn chạy
+# thì giữ nguyên
+job_queue = JobQueue()
+job_queue.recover()
+
+# Báo cáo theo nội dung upload: yêu cầu trùng dùng lại file đã tạo
+result_cache = ResultCache(OUTPUT_FOLDER)
+
 
 def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def save_upload(file, job_id):
+    """Lưu file upload với tên riêng theo job (tránh trùng giữa các job)"""
+    filename = f"{job_id}_{secure_filename(file.filename)}"
+    file_path = os.path.abspath(os.path.join(app.config["UPLOAD_FOLDER"], filename))
+    file.save(file_path)
+    return file_path
+
+
+def get_project_code_source():
+    """
+    Lấy ratecard của request: file upload (project_code) hoặc ratecard đã
+    đăng ký qua /api/ratecards (ratecard_id)
+
+    Returns:
+        tuple: (FileStorage hoặc None, đường dẫn ratecard đã đăng ký hoặc None,
+        thông báo lỗi hoặc None)
+    """
+    ratecard_id = request.form.get("ratecard_id")
+    if ratecard_id:
+        ratecard_path = ratecard_cache.get_registered_path(ratecard_id)
+        if ratecard_path is None:
+            return None, None, "Ratecard not found"
+        return None, ratecard_path, None
+
+    if "project_code" not in request.files:
+        return None, None, "Missing project_code file or ratecard_id"
+
+    project_code_file = request.files["project_code"]
+    if not allowed_file(project_code_file.filename):
+        return None, None, "Invalid project_code file format"
+    return project_code_file, None, None
+
+
+def remove_files(file_paths):
+    for file_path in file_paths:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+
+def cached_response(kind, output_filename, **extra):
+    """Response cho yêu cầu trùng với báo cáo đã có trong outputs"""
+    job_id = job_queue.add_completed(kind, output_filename)
+    return jsonify(
+        {
+            "success": True,
+            "job_id": job_id,
+            "status": JOB_DONE,
+            "status_url": f"/api/jobs/{job_id}",
+            "output_file": output_filename,
+            "cached": True,
+            "message": "Report loaded from cache",
+            **extra,
+        }
+    )
+
+
+def submit_job(job_id, kind, params, output_filename, **extra):
+    """Đưa job vào hàng đợi và trả về response 202 với job_id"""
+    # Dọn thư mục outputs (TTL/dung lượng) trước khi tạo báo cáo mới
+    result_cache.evict()
+
+    try:
+        submitted_job_id = job_queue.submit(
+            kind, params, output_file=output_filename, job_id=job_id
+        )
+    except Exception as e:
+        remove_files(params["cleanup_files"])
+        return jsonify({"error": str(e)}), 503
+
+    # Đã có job giống hệt đang chạy: dùng job đó, bỏ file vừa upload
+    if submitted_job_id != job_id:
+        remove_files(params["cleanup_files"])
+        job_id = submitted_job_id
+
+    return (
+        jsonify(
+            {
+                "success": True,
+                "job_id": job_id,
+                "status": job_queue.get(job_id)["status"],
+                "status_url": f"/api/jobs/{job_id}",
+                "output_file": output_filename,
+                "cached": False,
+                "message": "Job submitted",
+                **extra,
+            }
+        ),
+        202,
+    )
+
+
 @app.route("/api/health", methods=["GET"])
 def health_check():
     """Health check endpoint"""
     return jsonify({"status": "ok", "message": "Server is running"})
 
 
-@app.route("/api/process/single", methods=["POST"])
-def process_single_file():
+@app.route("/api/ratecards", methods=["POST"])
+def register_ratecard():
     """
-    Xử lý single file mode
+    Đăng ký file ratecard một lần, các request xử lý sau chỉ cần gửi
+    ratecard_id thay vì upload lại project_code.xlsx
 
     Form data:
     - project_code: file project_code.xlsx
-    - input_file: file input data
     """
     try:
-        # Validate files
         if "project_code" not in request.files:
             return jsonify({"error": "Missing project_code file"}), 400
-        if "input_file" not in request.files:
-            return jsonify({"error": "Missing input_file"}), 400
 
         project_code_file = request.files["project_code"]
-        input_file = request.files["input_file"]
-
         if not allowed_file(project_code_file.filename):
             return jsonify({"error": "Invalid project_code file format"}), 400
-        if not allowed_file(input_file.filename):
-            return jsonify({"error": "Invalid input file format"}), 400
 
-        # Save files
-        pc_filename = secure_filename(project_code_file.filename)
-        input_filename = secure_filename(input_file.filename)
+        pc_path = save_upload(project_code_file, uuid.uuid4().hex)
+        try:
+            # Kiểm tra file đọc được (đồng thời nạp sẵn vào cache của process)
+            tool = ProjectReportTool()
+            _, revenue_mapping = tool.load_project_code_file(pc_path)
+            file_hash = tool.data_processor.ingest_cache.hash_file(pc_path)
+            ratecard_id = ratecard_cache.register(pc_path, file_hash)
+        except Exception as e:
+            return jsonify({"error": str(e)}), 400
+        finally:
+            os.remove(pc_path)
+
+        return jsonify(
+            {
+                "success": True,
+                "ratecard_id": ratecard_id,
+                "project_codes": len(revenue_mapping),
+            }
+        )
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        pc_path = os.path.join(app.config["UPLOAD_FOLDER"], pc_filename)
-        input_path = os.path.join(app.config["UPLOAD_FOLDER"], input_filename)
 
-        project_code_file.save(pc_path)
-        input_file.save(input_path)
+@app.route("/api/process/single", methods=["POST"])
+def process_single_file():
+    """
+    Xử lý single file mode (chạy nền, theo dõi qua /api/jobs/<job_id>)
 
-        # Process
-        tool = ProjectReportTool()
-        output_filename = f"report_{os.urandom(8).hex()}.xlsx"
-        output_path = os.path.join(app.config["OUTPUT_FOLDER"], output_filename)
+    Form data:
+    - project_code: file project_code.xlsx (hoặc ratecard_id đã đăng ký)
+    - input_file: file input data
+    """
+    try:
+        # Validate files
+        project_code_file, ratecard_path, error = get_project_code_source()
+        if error:
+            return jsonify({"error": error}), 400
+        if "input_file" not in request.files:
+            return jsonify({"error": "Missing input_file"}), 400
 
-        tool.run(input_path, pc_path, output_path)
+        input_file = request.files["input_file"]
 
-        # Cleanup uploaded files
-        os.remove(pc_path)
-        os.remove(input_path)
+        if not allowed_file(input_file.filename):
+            return jsonify({"error": "Invalid input file format"}), 400
 
-        return jsonify(
-            {
-                "success": True,
-                "output_file": output_filename,
-                "message": "Processing completed successfully",
-            }
+        # Báo cáo của cùng nội dung file đã có thì trả lại ngay
+        key = result_cache.make_key(
+            [
+                ("project_code", ratecard_path or project_code_file.stream),
+                ("input_file", input_file.stream),
+            ],
+            {"mode": "single"},
+        )
+        output_filename = result_cache.get_output_filename("report", key)
+        if result_cache.lookup(output_filename):
+            return cached_response("single", output_filename)
+
+        # Save files (ratecard đã đăng ký thì dùng luôn file đã lưu)
+        job_id = uuid.uuid4().hex
+        cleanup_files = []
+        pc_path = ratecard_path
+        if pc_path is None:
+            pc_path = save_upload(project_code_file, job_id)
+            cleanup_files.append(pc_path)
+        input_path = save_upload(input_file, job_id)
+
+        # Process (chạy nền)
+        output_path = os.path.abspath(
+            os.path.join(app.config["OUTPUT_FOLDER"], output_filename)
         )
 
+        params = {
+            "input_file": input_path,
+            "project_code_file": pc_path,
+            "output_path": output_path,
+            "cleanup_files": cleanup_files + [input_path],
+        }
+        return submit_job(job_id, "single", params, output_filename)
+
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -102,19 +254,18 @@ def process_single_file():
 @app.route("/api/process/multi", methods=["POST"])
 def process_multi_files():
     """
-    Xử lý multi files mode
+    Xử lý multi files mode (chạy nền, theo dõi qua /api/jobs/<job_id>)
 
     Form data:
-    - project_code: file project_code.xlsx
+    - project_code: file project_code.xlsx (hoặc ratecard_id đã đăng ký)
     - files[]: array of input files
     - metadata: JSON string với [{"filename": "...", "year": 2024, "month": 1}, ...]
     """
     try:
         # Validate
-        if "project_code" not in request.files:
-            return jsonify({"error": "Missing project_code file"}), 400
-
-        project_code_file = request.files["project_code"]
+        project_code_file, ratecard_path, error = get_project_code_source()
+        if error:
+            return jsonify({"error": error}), 400
 
         # Get files
         files = request.files.getlist("files[]")
@@ -122,56 +273,186 @@ def process_multi_files():
             return jsonify({"error": "No input files provided"}), 400
 
         # Get metadata
-        import json
-
         metadata = json.loads(request.form.get("metadata", "[]"))
 
         if len(files) != len(metadata):
             return jsonify({"error": "Files and metadata count mismatch"}), 400
 
-        # Save project code
-        pc_filename = secure_filename(project_code_file.filename)
-        pc_path = os.path.join(app.config["UPLOAD_FOLDER"], pc_filename)
-        project_code_file.save(pc_path)
+        input_files = [
+            (file, int(meta.get("year", 2024)), int(meta.get("month", 1)))
+            for file, meta in zip(files, metadata)
+            if allowed_file(file.filename)
+        ]
+
+        # Báo cáo của cùng nội dung file (và cùng tháng) đã có thì trả lại ngay
+        key = result_cache.make_key(
+            [("project_code", ratecard_path or project_code_file.stream)]
+            + [
+                (f"input_file:{year}-{month}", file.stream)
+                for file, year, month in input_files
+            ],
+            {"mode": "multi"},
+        )
+        output_filename = result_cache.get_output_filename("merged_report", key)
+        if result_cache.lookup(output_filename):
+            return cached_response(
+                "multi", output_filename, files_processed=len(input_files)
+            )
 
-        # Save all input files
-        file_list = []
-        for file, meta in zip(files, metadata):
-            if not allowed_file(file.filename):
-                continue
+        # Save project code (ratecard đã đăng ký thì dùng luôn file đã lưu)
+        job_id = uuid.uuid4().hex
+        cleanup_files = []
+        pc_path = ratecard_path
+        if pc_path is None:
+            pc_path = save_upload(project_code_file, job_id)
+            cleanup_files.append(pc_path)
 
-            filename = secure_filename(file.filename)
-            file_path = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-            file.save(file_path)
+        # Save all input files
+        file_list = [
+            (save_upload(file, job_id), year, month)
+            for file, year, month in input_files
+        ]
+
+        # Process (chạy nền)
+        output_path = os.path.abspath(
+            os.path.join(app.config["OUTPUT_FOLDER"], output_filename)
+        )
 
-            file_list.append(
-                (file_path, int(meta.get("year", 2024)), int(meta.get("month", 1)))
-            )
+        params = {
+            "file_list": file_list,
+            "project_code_file": pc_path,
+            "output_path": output_path,
+            "cleanup_files": cleanup_files
+            + [file_path for file_path, _, _ in file_list],
+        }
+        return submit_job(
+            job_id, "multi", params, output_filename, files_processed=len(file_list)
+        )
 
-        # Process
-        tool = MultiFileProjectReportTool()
-        output_filename = f"merged_report_{os.urandom(8).hex()}.xlsx"
-        output_path = os.path.join(app.config["OUTPUT_FOLDER"], output_filename)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        tool.run_multi_files(file_list, pc_path, output_path)
 
-        # Cleanup
-        os.remove(pc_path)
-        for file_path, _, _ in file_list:
-            if os.path.exists(file_path):
-                os.remove(file_path)
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def get_job_status(job_id):
+    """
+    Trạng thái job: queued, running, done, failed hoặc expired (báo cáo đã
+    bị xóa khỏi outputs)
 
-        return jsonify(
-            {
-                "success": True,
-                "output_file": output_filename,
-                "message": "Processing completed successfully",
-                "files_processed": len(file_list),
-            }
+    Khi status là done, tải báo cáo qua /api/download/<output_file>
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    # Báo cáo đã bị xóa khỏi outputs (hết TTL/vượt dung lượng)
+    output_path = os.path.join(app.config["OUTPUT_FOLDER"], job["output_file"] or "")
+    if job["status"] == JOB_DONE and not os.path.exists(output_path):
+        job["status"] = "expired"
+
+    return jsonify(job)
+
+
+# (tên metric, loại, mô tả, cột trong stage_metrics, hệ số đổi đơn vị)
+STAGE_PROMETHEUS_METRICS = [
+    ("report_stage_runs_total", "counter", "Số lần chạy bước", "runs", 1),
+    (
+        "report_stage_wall_seconds_total",
+        "counter",
+        "Tổng wall time của bước",
+        "wall_seconds",
+        1,
+    ),
+    (
+        "report_stage_cpu_seconds_total",
+        "counter",
+        "Tổng CPU time của bước",
+        "cpu_seconds",
+        1,
+    ),
+    ("report_stage_rows_total", "counter", "Tổng số dòng đã xử lý", "rows", 1),
+    (
+        "report_stage_rss_bytes",
+        "gauge",
+        "RSS lớn nhất của worker lúc kết thúc bước",
+        "rss_mb",
+        1024 * 1024,
+    ),
+]
+
+
+@app.route("/api/metrics", methods=["GET"])
+def get_metrics():
+    """Số liệu job và thời gian từng bước xử lý (Prometheus text format)"""
+    metrics = job_queue.get_metrics()
+
+    lines = [
+        "# HELP report_jobs Số job theo trạng thái",
+        "# TYPE report_jobs gauge",
+    ]
+    for status in [JOB_QUEUED, JOB_RUNNING, JOB_DONE, JOB_FAILED]:
+        lines.append(
+            f'report_jobs{{status="{status}"}} {metrics["jobs"].get(status, 0)}'
         )
 
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    for name, metric_type, description, column, scale in STAGE_PROMETHEUS_METRICS:
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for stage in metrics["stages"]:
+            value = stage[column] * scale
+            if scale != 1:
+                value = int(value)
+            lines.append(f'{name}{{stage="{stage["stage"]}"}} {value:.10g}')
+
+    return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/api/jobs/<job_id>/events", methods=["GET"])
+def stream_job_events(job_id):
+    """
+    Stream sự kiện tiến độ của job (Server-Sent Events)
+
+    Mỗi sự kiện "progress" có id là số thứ tự, client kết nối lại với header
+    Last-Event-ID sẽ nhận tiếp các sự kiện sau đó. Stream kết thúc bằng sự
+    kiện "done" hoặc "failed" chứa trạng thái cuối của job.
+    """
+    if job_queue.get(job_id) is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    try:
+        last_seq = int(request.headers.get("Last-Event-ID") or 0)
+    except ValueError:
+        last_seq = 0
+
+    def generate(last_seq):
+        last_sent = time.monotonic()
+        while True:
+            # Đọc trạng thái trước: job đã xong thì mọi sự kiện đã được lưu
+            job = job_queue.get(job_id)
+
+            for seq, event in job_queue.get_events(job_id, last_seq):
+                last_seq = seq
+                last_sent = time.monotonic()
+                data = json.dumps(event, ensure_ascii=False)
+                yield f"id: {seq}\nevent: progress\ndata: {data}\n\n"
+
+            if job["status"] in (JOB_DONE, JOB_FAILED):
+                data = json.dumps(job, ensure_ascii=False)
+                yield f"event: {job['status']}\ndata: {data}\n\n"
+                return
+
+            # Comment giữ kết nối khi bước xử lý chạy lâu
+            if time.monotonic() - last_sent >= SSE_KEEPALIVE_SECONDS:
+                last_sent = time.monotonic()
+                yield ": keep-alive\n\n"
+
+            time.sleep(JOB_EVENT_POLL_SECONDS)
+
+    return Response(
+        stream_with_context(generate(last_seq)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.route("/api/download/<filename>", methods=["GET"])
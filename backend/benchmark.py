@@ -0,0 +1,503 @@
+"""
+Benchmark toàn bộ quy trình tạo báo cáo trên dữ liệu giả lập (có seed)
+
+Sinh file input + project_code với 1k/10k/100k/1M dòng, đo thời gian từng
+bước của ProjectReportTool.run và từng sheet báo cáo, ghi kết quả ra JSON và
+so sánh với kết quả baseline (lệch quá ngưỡng thì trả exit code 1)
+
+Ví dụ:
+    python benchmark.py --sizes 1k,10k --output bench.json
+    python benchmark.py --sizes 1k,10k --baseline bench.json --tolerance 0.25
+    python benchmark.py --sizes 10k,100k --compare-writers
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+from config import BENCHMARK_DATA_DIR, REPORT_WRITER, REPORT_WRITERS
+
+# Kích thước dữ liệu có sẵn (tên: số dòng)
+BENCHMARK_SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+DEFAULT_SIZES = ["1k", "10k", "100k"]
+
+# Phân bố lấy theo dữ liệu thật (uploads/input_t8.xls)
+MEMBER_TYPES = {"Internal": 0.72, "X-Jobs": 0.28}
+SKILLS = {
+    "DevOps & CI/CD Engineering": 0.56,
+    "AWS": 0.13,
+    "Artificial Intelligence (AI)": 0.09,
+    "Low-Code & No-Code Development": 0.05,
+    "Python Platform": 0.05,
+    "Java Framework": 0.04,
+    "Machine Learning": 0.02,
+    ".NET Framework": 0.02,
+    "Azure Cloud": 0.02,
+    "ReactJS Framework": 0.02,
+}
+JOBS = {"DEV": 0.86, "PM": 0.05, "BA": 0.03, "QA": 0.03, "COMTOR": 0.02, "SA": 0.01}
+SENIORITIES = {"Middle": 0.45, "Senior": 0.3, "Junior": 0.2, "Expert": 0.05}
+
+# Dữ liệu trải trong 2 năm, độ dài assignment trung vị ~2 tháng
+DATE_START = pd.Timestamp("2024-01-01")
+DATE_SPAN_DAYS = 730
+MAX_ASSIGNMENT_DAYS = 730
+
+# Chênh lệch nhỏ hơn mức này (giây) coi là nhiễu, không tính là chậm đi
+MIN_REGRESSION_SECONDS = 0.05
+
+# Các bước phụ thuộc backend ghi báo cáo (so sánh bằng --compare-writers)
+WRITE_STAGES = ["project_code_sheet", "project_report_sheet", "summary_sheet", "save"]
+
+
+def _choice(rng, distribution, size):
+    """Chọn ngẫu nhiên theo phân bố {giá trị: xác suất}"""
+    values = list(distribution)
+    weights = np.array(list(distribution.values()))
+    return rng.choice(values, size=size, p=weights / weights.sum())
+
+
+def generate_input_data(rows, seed=0):
+    """
+    Sinh dữ liệu input giả lập cùng cấu trúc với file export thật
+
+    Args:
+        rows: Số dòng
+        seed: Seed của bộ sinh số ngẫu nhiên
+
+    Returns:
+        tuple: (DataFrame input, list Project Code)
+    """
+    rng = np.random.default_rng(seed)
+
+    project_count = int(min(5000, max(50, rows // 200)))
+    user_count = int(max(20, rows // 2))
+    project_codes = [f"PRJ_{i:05d}" for i in range(project_count)]
+    # Một số project lớn chiếm nhiều dòng hơn (phân bố Zipf)
+    project_weights = 1 / np.arange(1, project_count + 1) ** 0.8
+    project_idx = rng.choice(
+        project_count, size=rows, p=project_weights / project_weights.sum()
+    )
+
+    from_date = DATE_START + pd.to_timedelta(
+        rng.integers(0, DATE_SPAN_DAYS, size=rows), unit="D"
+    )
+    duration = np.clip(rng.lognormal(4.1, 1.0, size=rows), 1, MAX_ASSIGNMENT_DAYS)
+    to_date = from_date + pd.to_timedelta(duration.astype(int), unit="D")
+
+    member_type = _choice(rng, MEMBER_TYPES, rows)
+    is_internal = member_type == "Internal"
+
+    # ~30% dòng có effort 0, phần còn lại phần lớn là full-time
+    effort = np.where(
+        rng.random(rows) < 0.3,
+        0.0,
+        np.where(rng.random(rows) < 0.6, 1.0, rng.uniform(0.05, 1.0, rows)),
+    )
+
+    df = pd.DataFrame(
+        {
+            "Project Group": [f"FHN G{i % 21}" for i in project_idx],
+            "Customer Code": [f"CUS_{i % 40:02d}" for i in project_idx],
+            "Project Code": np.array(project_codes)[project_idx],
+            "Project Status": np.where(rng.random(rows) < 0.9, "On-going", "Closed"),
+            "Username": [f"user{i}" for i in rng.integers(0, user_count, rows)],
+            "User Group": "FHN NGT",
+            "From Date": from_date,
+            "To Date": to_date,
+            "Hours / Day": np.round(effort * 8, 2),
+            "Member Type": member_type,
+            "Calendar Effort": effort,
+            "Job": _choice(rng, JOBS, rows),
+            # Dữ liệu thật: X-Jobs không có Skill/Seniority
+            "Skill": np.where(is_internal, _choice(rng, SKILLS, rows), None),
+            "Seniority": np.where(is_internal, _choice(rng, SENIORITIES, rows), None),
+            "Location": "HAN",
+        }
+    )
+    return df, project_codes
+
+
+def generate_project_code_data(project_codes, seed=0):
+    """
+    Sinh bảng project code (thiếu ~5% code để đi qua nhánh Ratecard = 0)
+
+    Returns:
+        DataFrame: Project Code, BU, Contact Point, Ratecard
+    """
+    rng = np.random.default_rng(seed + 1)
+    keep = rng.random(len(project_codes)) >= 0.05
+    codes = [code for code, kept in zip(project_codes, keep) if kept]
+    return pd.DataFrame(
+        {
+            "Project Code": codes,
+            "BU": None,
+            "Contact Point": None,
+            "Ratecard": rng.integers(20, 60, len(codes)) * 100.0,
+        }
+    )
+
+
+def write_workbook(df, path):
+    """
+    Ghi DataFrame ra .xlsx theo từng dòng (XlsxWriter constant_memory, không
+    giữ cả bảng trong bộ nhớ), ghi file tạm rồi đổi tên
+    """
+    tmp_path = f"{path}.tmp.xlsx"
+    workbook = xlsxwriter.Workbook(
+        tmp_path, {"constant_memory": True, "default_date_format": "yyyy-mm-dd"}
+    )
+    ws = workbook.add_worksheet()
+    ws.write_row(0, 0, df.columns.tolist())
+
+    # Ô trống (NaN/NaT) ghi thành None để XlsxWriter bỏ qua
+    columns = [
+        df[column].astype(object).where(df[column].notna(), None).tolist()
+        for column in df.columns
+    ]
+    for row_idx, values in enumerate(zip(*columns), start=1):
+        ws.write_row(row_idx, 0, values)
+
+    workbook.close()
+    os.replace(tmp_path, path)
+
+
+def prepare_data(size, seed, data_dir=BENCHMARK_DATA_DIR):
+    """
+    Tạo (hoặc dùng lại) file input và project_code cho một kích thước
+
+    Returns:
+        tuple: (đường dẫn input, đường dẫn project_code)
+    """
+    rows = BENCHMARK_SIZES[size]
+    os.makedirs(data_dir, exist_ok=True)
+    input_path = os.path.join(data_dir, f"input_{size}_s{seed}.xlsx")
+    project_code_path = os.path.join(data_dir, f"project_code_{size}_s{seed}.xlsx")
+
+    if not (os.path.exists(input_path) and os.path.exists(project_code_path)):
+        print(f"  Sinh dữ liệu {size} ({rows:,} dòng)...")
+        df_input, project_codes = generate_input_data(rows, seed)
+        write_workbook(df_input, input_path)
+        write_workbook(
+            generate_project_code_data(project_codes, seed), project_code_path
+        )
+
+    return input_path, project_code_path
+
+
+def run_once(input_path, project_code_path, writer):
+    """
+    Chạy toàn bộ quy trình một lần với cache rỗng (chạy trong process riêng)
+
+    Returns:
+        dict: Số liệu đo trả về từ ProjectReportTool.run
+    """
+    from ingest_cache import IngestCache
+    from main import ProjectReportTool
+    from ratecard_cache import RatecardCache
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tool = ProjectReportTool(writer=writer, ratecard_cache=RatecardCache())
+        # Cache rỗng để đo cả thời gian parse Excel
+        tool.data_processor.ingest_cache = IngestCache(
+            cache_dir=os.path.join(tmp_dir, "ingest")
+        )
+        log = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(log):
+                metrics = tool.run(
+                    input_path, project_code_path, os.path.join(tmp_dir, "report.xlsx")
+                )
+        except SystemExit:
+            # run() gọi sys.exit khi lỗi, đổi thành Exception để trả về process cha
+            raise Exception(f"Chạy benchmark thất bại:\n{log.getvalue()[-2000:]}")
+    metrics["output_file"] = None
+    return metrics
+
+
+def summarize_runs(runs):
+    """
+    Gộp kết quả nhiều lần chạy (lấy median thời gian, max bộ nhớ)
+
+    Returns:
+        dict: rows, wall_time, cpu_time, peak_rss_mb, stages {tên bước: số liệu}
+    """
+    stages = {}
+    for stage in runs[0]["stages"]:
+        name = stage["stage"]
+        stage_runs = [
+            next(s for s in run["stages"] if s["stage"] == name) for run in runs
+        ]
+        stages[name] = {
+            "rows": stage["rows"],
+            "wall_time": round(
+                statistics.median(s["wall_time"] for s in stage_runs), 4
+            ),
+            "cpu_time": round(statistics.median(s["cpu_time"] for s in stage_runs), 4),
+        }
+
+    # Mỗi lần chạy dùng process riêng nên RSS cao nhất của process là của lần chạy
+    peak_rss = [
+        run["process_peak_rss_mb"]
+        for run in runs
+        if run["process_peak_rss_mb"] is not None
+    ]
+    return {
+        "rows": runs[0]["rows"],
+        "wall_time": round(statistics.median(run["wall_time"] for run in runs), 4),
+        "cpu_time": round(statistics.median(run["cpu_time"] for run in runs), 4),
+        "peak_rss_mb": max(peak_rss) if peak_rss else None,
+        "stages": stages,
+    }
+
+
+def run_benchmark(sizes, seed=0, writer=REPORT_WRITER, repeat=3):
+    """
+    Chạy benchmark cho các kích thước dữ liệu
+
+    Mỗi lần chạy dùng một process mới (spawn) để bộ nhớ và cache không bị
+    ảnh hưởng bởi lần chạy trước
+
+    Returns:
+        dict: meta (môi trường chạy) và results {kích thước: số liệu}
+    """
+    results = {}
+    context = multiprocessing.get_context("spawn")
+
+    for size in sizes:
+        input_path, project_code_path = prepare_data(size, seed)
+        print(f"  Chạy {size} x{repeat} ({writer})...")
+
+        with context.Pool(processes=1, maxtasksperchild=1) as pool:
+            runs = [
+                pool.apply(run_once, (input_path, project_code_path, writer))
+                for _ in range(repeat)
+            ]
+        results[size] = summarize_runs(runs)
+        print(f"  ✓ {size}: {results[size]['wall_time']:.3f}s")
+
+    return {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "writer": writer,
+            "seed": seed,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def compare_with_baseline(current, baseline, tolerance):
+    """
+    So sánh thời gian (wall) của từng bước với baseline
+
+    Một bước bị coi là chậm đi khi chậm hơn baseline quá tolerance (tỉ lệ)
+    và quá MIN_REGRESSION_SECONDS
+
+    Returns:
+        list: (kích thước, bước, baseline, hiện tại, tỉ lệ, chậm đi?)
+    """
+    rows = []
+    for size, result in current["results"].items():
+        base = baseline["results"].get(size)
+        if base is None:
+            continue
+
+        timings = [("total", base["wall_time"], result["wall_time"])]
+        for stage, metrics in result["stages"].items():
+            if stage in base["stages"]:
+                timings.append(
+                    (stage, base["stages"][stage]["wall_time"], metrics["wall_time"])
+                )
+
+        for stage, base_time, current_time in timings:
+            if base_time:
+                ratio = current_time / base_time
+            else:
+                ratio = 1.0 if not current_time else float("inf")
+            regressed = (
+                current_time > base_time * (1 + tolerance)
+                and current_time - base_time > MIN_REGRESSION_SECONDS
+            )
+            rows.append((size, stage, base_time, current_time, ratio, regressed))
+    return rows
+
+
+def compare_writers(sizes, seed=0, repeat=3):
+    """
+    Chạy benchmark với từng backend ghi báo cáo trên cùng dữ liệu (cùng seed)
+
+    Returns:
+        dict: {tên writer: kết quả run_benchmark}
+    """
+    return {
+        writer: run_benchmark(sizes, seed, writer, repeat) for writer in REPORT_WRITERS
+    }
+
+
+def print_writer_comparison(results_by_writer):
+    """In thời gian các bước ghi báo cáo của từng writer, tỉ lệ so với writer đầu"""
+    writers = list(results_by_writer)
+    base_writer = writers[0]
+    sizes = list(results_by_writer[base_writer]["results"])
+
+    print(f"\nSo sánh writer, wall time (s), median (tỉ lệ so với {base_writer}):")
+    print(f"{'Size':<8}{'Bước':<22}" + "".join(f"{writer:>20}" for writer in writers))
+    for size in sizes:
+        for stage in WRITE_STAGES + ["total"]:
+            values = []
+            for writer in writers:
+                result = results_by_writer[writer]["results"][size]
+                if stage == "total":
+                    values.append(result["wall_time"])
+                else:
+                    values.append(result["stages"].get(stage, {}).get("wall_time"))
+
+            line = f"{size:<8}{stage:<22}"
+            for value in values:
+                if value is None:
+                    line += f"{'':>20}"
+                elif values[0]:
+                    line += f"{value:>12.3f} ({value / values[0]:.2f}x)"
+                else:
+                    line += f"{value:>20.3f}"
+            print(line)
+        peak_rss = [
+            results_by_writer[writer]["results"][size]["peak_rss_mb"]
+            for writer in writers
+        ]
+        print(
+            f"{size:<8}{'RSS max (MB)':<22}"
+            + "".join(f"{value or '':>20}" for value in peak_rss)
+        )
+
+
+def print_results(results):
+    """In bảng thời gian từng bước theo kích thước dữ liệu"""
+    sizes = list(results["results"])
+    stages = list(results["results"][sizes[0]]["stages"]) + ["total"]
+
+    print("\nWall time (s), median:")
+    print(f"{'Bước':<22}" + "".join(f"{size:>12}" for size in sizes))
+    for stage in stages:
+        line = f"{stage:<22}"
+        for size in sizes:
+            result = results["results"][size]
+            if stage == "total":
+                value = result["wall_time"]
+            else:
+                value = result["stages"].get(stage, {}).get("wall_time")
+            line += f"{value:>12.3f}" if value is not None else f"{'':>12}"
+        print(line)
+    print(
+        f"{'RSS max (MB)':<22}"
+        + "".join(
+            f"{results['results'][size]['peak_rss_mb'] or '':>12}" for size in sizes
+        )
+    )
+
+
+def parse_sizes(value):
+    sizes = [size.strip().lower() for size in value.split(",") if size.strip()]
+    invalid = [size for size in sizes if size not in BENCHMARK_SIZES]
+    if invalid:
+        raise argparse.ArgumentTypeError(
+            f"Kích thước không hợp lệ: {', '.join(invalid)} "
+            f"(chọn trong {', '.join(BENCHMARK_SIZES)})"
+        )
+    return sizes
+
+
+def main():
+    """Hàm main để chạy benchmark từ command line"""
+    parser = argparse.ArgumentParser(
+        description="Benchmark quy trình tạo báo cáo trên dữ liệu giả lập"
+    )
+    parser.add_argument(
+        "--sizes",
+        type=parse_sizes,
+        default=DEFAULT_SIZES,
+        help=f"Các kích thước, ví dụ 1k,10k (có: {', '.join(BENCHMARK_SIZES)})",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--writer", choices=REPORT_WRITERS, default=REPORT_WRITER)
+    parser.add_argument(
+        "--compare-writers",
+        action="store_true",
+        help="Chạy với tất cả writer trên cùng dữ liệu và in bảng so sánh",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Số lần chạy mỗi size")
+    parser.add_argument("--output", help="File JSON lưu kết quả")
+    parser.add_argument("--baseline", help="File JSON kết quả baseline để so sánh")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Tỉ lệ chậm hơn baseline cho phép (mặc định 0.25 = 25%%)",
+    )
+    args = parser.parse_args()
+    if args.compare_writers and args.baseline:
+        parser.error("--compare-writers không dùng cùng --baseline")
+
+    print("=" * 70)
+    print("BENCHMARK PROJECT REPORT TOOL")
+    print("=" * 70)
+
+    if args.compare_writers:
+        results_by_writer = compare_writers(args.sizes, args.seed, args.repeat)
+        print_writer_comparison(results_by_writer)
+
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(results_by_writer, f, ensure_ascii=False, indent=2)
+            print(f"\n✓ Đã lưu kết quả: {args.output}")
+        return
+
+    results = run_benchmark(args.sizes, args.seed, args.writer, args.repeat)
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n✓ Đã lưu kết quả: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+        comparison = compare_with_baseline(results, baseline, args.tolerance)
+        regressions = [row for row in comparison if row[-1]]
+
+        print(
+            f"\nSo sánh với baseline {args.baseline} (tolerance {args.tolerance:.0%}):"
+        )
+        for size, stage, base_time, current_time, ratio, regressed in comparison:
+            mark = "✖" if regressed else " "
+            print(
+                f"  {mark} {size:<6}{stage:<22}{base_time:>9.3f}s → "
+                f"{current_time:>9.3f}s  ({ratio:.2f}x)"
+            )
+
+        if regressions:
+            print(f"\n✖ {len(regressions)} bước chậm hơn baseline quá ngưỡng")
+            sys.exit(1)
+        print("\n✓ Không có bước nào chậm hơn baseline quá ngưỡng")
+
+
+if __name__ == "__main__":
+    main()
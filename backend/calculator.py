@@ -1,3 +1,7 @@
+import numpy as np
+import pandas as pd
+
+
 class RevenueCalculator:
     """Class tính toán revenue"""
 
@@ -33,9 +37,50 @@ class RevenueCalculator:
             return self.calculate_rev_eff(revenue, effort)
         return 0.0
 
+    def to_numeric(self, values):
+        """
+        Chuyển Series sang số thực theo cùng quy tắc với calculate_rev_eff
+
+        Args:
+            values: Series giá trị cần chuyển
+
+        Returns:
+            numpy array float64: ô trống giữ NaN, giá trị không hợp lệ bị
+            đánh dấu là NaN trong mask invalid
+        """
+        numeric = pd.to_numeric(values, errors="coerce").to_numpy(dtype="float64")
+        invalid = np.isnan(numeric) & values.notna().to_numpy()
+        return numeric, invalid
+
+    def round_values(self, values, decimals=2):
+        """
+        Làm tròn mảng số giống hàm round() của Python
+
+        np.round nhân 10^decimals trước khi làm tròn nên có thể lệch 0.01 với
+        các giá trị sát .5 (vd 3733 * 0.975); các giá trị này được làm tròn
+        lại bằng round() theo từng giá trị duy nhất.
+
+        Args:
+            values: numpy array float64
+            decimals: Số chữ số thập phân
+
+        Returns:
+            numpy array float64 đã làm tròn
+        """
+        rounded = np.round(values, decimals)
+
+        scaled = values * 10**decimals
+        near_half = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+        if near_half.any():
+            uniques, inverse = np.unique(values[near_half], return_inverse=True)
+            exact = np.array([round(float(value), decimals) for value in uniques])
+            rounded[near_half] = exact[inverse]
+
+        return rounded
+
     def add_calculations(self, df):
         """
-        Thêm các cột tính toán vào DataFrame
+        Thêm các cột tính toán vào DataFrame (vectorized)
 
         Args:
             df: DataFrame với dữ liệu monthly
@@ -43,22 +88,21 @@ class RevenueCalculator:
         Returns:
             DataFrame với các cột tính toán mới
         """
-        # Tính REVxEFF (cho tất cả projects)
-        df["REVxEFF"] = df.apply(
-            lambda row: self.calculate_rev_eff(row["Revenue"], row["Calendar Effort"]),
-            axis=1,
-        )
+        revenue, revenue_invalid = self.to_numeric(df["Revenue"])
+        effort, effort_invalid = self.to_numeric(df["Calendar Effort"])
+
+        # Tính REVxEFF (cho tất cả projects), giá trị không hợp lệ → 0.0
+        rev_eff = self.round_values(revenue * effort, 2)
+        rev_eff[revenue_invalid | effort_invalid] = 0.0
+        df["REVxEFF"] = rev_eff
 
         # Tính AI-REV (chỉ cho AI projects)
         # Kiểm tra cột AI Project == "AI" (không phải "Non-AI" nữa)
-        df["AI-REV"] = df.apply(
-            lambda row: self.calculate_ai_rev(
-                row["Revenue"],
-                row["Calendar Effort"],
-                row.get("AI Project", "") == "AI",
-            ),
-            axis=1,
-        )
+        if "AI Project" in df.columns:
+            is_ai = (df["AI Project"] == "AI").to_numpy()
+        else:
+            is_ai = np.zeros(len(df), dtype=bool)
+        df["AI-REV"] = np.where(is_ai, rev_eff, 0.0)
 
         return df
 
@@ -85,7 +129,10 @@ class RevenueCalculator:
 
         agg_dict = {"Calendar Effort": "sum", "REVxEFF": "sum", "AI-REV": "sum"}
 
-        result = df.groupby(group_cols, as_index=False).agg(agg_dict)
+        # observed=True để không sinh tổ hợp rỗng với các cột categorical
+        result = df.groupby(
+            group_cols, as_index=False, observed=True, dropna=False
+        ).agg(agg_dict)
 
         # Làm tròn các giá trị
         result["Calendar Effort"] = result["Calendar Effort"].round(2)
@@ -94,6 +141,62 @@ class RevenueCalculator:
 
         return result
 
+    def get_monthly_metrics(self, df, month_list):
+        """
+        Tính các metrics theo tháng cho sheet Summary bằng một lần groupby
+
+        Args:
+            df: DataFrame monthly đã có REVxEFF và AI Project
+            month_list: Danh sách (year, month) theo thứ tự cột
+
+        Returns:
+            DataFrame index (Year, Month) theo month_list, các cột là
+            MONTHLY_METRICS. Revenue là NaN nếu tháng không có dòng dữ liệu
+            tương ứng, số member là 0.
+        """
+        is_ai = (df["AI Project"] == "AI").to_numpy()
+        is_xjobs = (df["Member Type"] == "X-Jobs").to_numpy()
+
+        work = pd.DataFrame(
+            {
+                "Year": df["Year"].to_numpy(),
+                "Month": df["Month"].to_numpy(),
+                "rows": 1,
+                "revenue": df["REVxEFF"].to_numpy(),
+                "user": df["Username"].to_numpy(),
+                "ai_rows": is_ai.astype(np.int64),
+                "ai_revenue": df["REVxEFF"].where(is_ai).to_numpy(),
+                "ai_user": df["Username"].where(is_ai).to_numpy(),
+                "xjobs_user": df["Username"].where(is_xjobs).to_numpy(),
+            }
+        )
+
+        grouped = work.groupby(["Year", "Month"]).agg(
+            rows=("rows", "sum"),
+            revenue=("revenue", "sum"),
+            user=("user", "nunique"),
+            ai_rows=("ai_rows", "sum"),
+            ai_revenue=("ai_revenue", "sum"),
+            ai_user=("ai_user", "nunique"),
+            xjobs_user=("xjobs_user", "nunique"),
+        )
+
+        month_index = pd.MultiIndex.from_tuples(
+            [(int(year), int(month)) for year, month in month_list],
+            names=["Year", "Month"],
+        )
+        grouped = grouped.reindex(month_index)
+
+        # Revenue để trống nếu tháng không có dòng dữ liệu (khớp với sheet cũ)
+        metrics = pd.DataFrame(index=month_index)
+        metrics["Total Revenue"] = grouped["revenue"].where(grouped["rows"] > 0)
+        metrics["AI Revenue"] = grouped["ai_revenue"].where(grouped["ai_rows"] > 0)
+        metrics["Actual Member"] = grouped["user"].fillna(0).astype(np.int64)
+        metrics["Actual Member (AI)"] = grouped["ai_user"].fillna(0).astype(np.int64)
+        metrics["X-Job Member"] = grouped["xjobs_user"].fillna(0).astype(np.int64)
+
+        return metrics
+
     def get_summary_statistics(self, df):
         """
         Tính toán thống kê tổng hợp
@@ -2,6 +2,8 @@
 Cấu hình chung cho Project Report Tool
 """
 
+import os
+
 # Các skill được coi là AI Project
 AI_SKILLS = [
     "AI",
@@ -19,6 +21,9 @@ AI_SKILLS = [
     "Data Scientist",
 ]
 
+# Số giá trị skill tối đa được nhớ kết quả nhận diện AI
+AI_SKILL_CACHE_SIZE = 4096
+
 # Mapping Member Type
 MEMBER_TYPE_MAPPING = {
     "Internal": "Internal",
@@ -27,6 +32,28 @@ MEMBER_TYPE_MAPPING = {
     "X-Job": "X-Jobs",
 }
 
+# Các cột bắt buộc của file đầu vào và kiểu dữ liệu tương ứng
+# (chỉ đọc các cột này từ file Excel)
+INPUT_SCHEMA = {
+    "Username": "object",
+    "Project Code": "category",
+    "From Date": "datetime",
+    "To Date": "datetime",
+    "Member Type": "category",
+    "Calendar Effort": "float64",
+    "Skill": "object",
+}
+
+# Engine đọc Excel: "auto" (tự chọn engine nhanh nhất), "calamine", "xlrd"
+# hoặc "openpyxl". Có thể ghi đè bằng biến môi trường EXCEL_READER_ENGINE
+EXCEL_READER_ENGINE = os.environ.get("EXCEL_READER_ENGINE", "auto")
+
+# Backend ghi báo cáo: "openpyxl" hoặc "xlsxwriter" (constant_memory). Mặc định
+# xlsxwriter vì chỉ backend này lưu sẵn kết quả công thức (mở file không cần
+# tính lại, pandas đọc được giá trị)
+REPORT_WRITERS = ["openpyxl", "xlsxwriter"]
+REPORT_WRITER = os.environ.get("REPORT_WRITER", "xlsxwriter")
+
 # Màu sắc cho định dạng có điều kiện
 COLORS = {
     "internal": "C5E0B4",
@@ -43,3 +70,49 @@ COLORS = {
 NUMBER_FORMAT = "#,##0.00"
 CURRENCY_FORMAT = "$#,##0.00"
 INTEGER_FORMAT = "#,##0"
+
+# Cache dữ liệu đầu vào dạng cột (Arrow IPC)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+INGEST_CACHE_DIR = os.path.join(BASE_DIR, "cache", "ingest")
+INGEST_CACHE_MAX_BYTES = 512 * 1024 * 1024  # 512MB
+# Tăng giá trị này khi thay đổi cách chuẩn hóa dữ liệu đầu vào
+INGEST_SCHEMA_VERSION = 2
+
+# Hàng đợi job xử lý báo cáo của API (SQLite, không cần broker ngoài)
+JOB_DB_PATH = os.path.join(BASE_DIR, "cache", "jobs.sqlite3")
+JOB_MAX_WORKERS = int(os.environ.get("JOB_MAX_WORKERS", min(4, os.cpu_count() or 1)))
+# Số job tối đa đang chờ/đang chạy, vượt quá thì API từ chối nhận thêm
+JOB_MAX_PENDING = 32
+
+# Cache kết quả báo cáo theo nội dung file upload + tùy chọn xử lý
+RESULT_CACHE_MAX_BYTES = 1024 * 1024 * 1024  # 1GB cho thư mục outputs
+RESULT_CACHE_TTL_SECONDS = 7 * 24 * 3600  # 7 ngày
+# Tăng giá trị này khi thay đổi nội dung/định dạng báo cáo để bỏ kết quả cũ
+RESULT_CACHE_VERSION = 1
+
+# Cache ratecard (project_code.xlsx) dùng chung trong process theo SHA-256
+RATECARD_DIR = os.path.join(BASE_DIR, "cache", "ratecards")
+# Số ratecard đã parse giữ trong bộ nhớ mỗi process
+RATECARD_CACHE_MAX_ENTRIES = 16
+
+# Stream tiến độ job (Server-Sent Events)
+JOB_EVENT_POLL_SECONDS = 0.5
+# Gửi comment giữ kết nối nếu không có sự kiện trong khoảng này
+SSE_KEEPALIVE_SECONDS = 15
+
+# Dữ liệu giả lập của benchmark (benchmark.py), sinh một lần rồi dùng lại
+BENCHMARK_DATA_DIR = os.path.join(BASE_DIR, "cache", "benchmark")
+
+# Số process đọc song song các file input của multi-file mode
+MULTI_FILE_MAX_WORKERS = int(
+    os.environ.get("MULTI_FILE_MAX_WORKERS", min(4, os.cpu_count() or 1))
+)
+
+# Kho dữ liệu theo tháng (input đã chuẩn hóa + tổng hợp) cho chế độ cập nhật
+# từng tháng, đây là dữ liệu lâu dài nên không để trong thư mục cache
+MONTHLY_STORE_DIR = os.path.join(BASE_DIR, "data", "monthly")
+# Tăng giá trị này khi thay đổi cách chuẩn hóa/tổng hợp để nạp lại các tháng
+MONTHLY_STORE_VERSION = 1
+
+# Kho phân tích SQLite (tùy chọn --analytics-db), lưu lịch sử lâu dài
+ANALYTICS_DB_PATH = os.path.join(BASE_DIR, "data", "analytics.sqlite3")
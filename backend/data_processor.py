@@ -1,19 +1,66 @@
+import numpy as np
 import pandas as pd
 
 # from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
-from config import MEMBER_TYPE_MAPPING
+from config import INPUT_SCHEMA, MEMBER_TYPE_MAPPING
+from excel_reader import read_excel_schema
+from ingest_cache import IngestCache
+
+# Các cột được giữ lại khi phân bổ theo tháng (Year/Month được chèn thêm)
+ALLOCATION_SOURCE_COLUMNS = [
+    "Username",
+    "MAIL",
+    "Project Code",
+    "Member Type",
+    "Revenue",
+    "Skill",
+    "Calendar Effort",
+]
+
+
+def concat_aligned(frames):
+    """
+    Nối các DataFrame, cột category được đưa về cùng một tập category để
+    kết quả vẫn là category (pd.concat chuyển sang object nếu category khác nhau)
+
+    Args:
+        frames: Danh sách DataFrame cùng cột
+
+    Returns:
+        DataFrame đã nối (index đánh lại từ 0)
+    """
+    categorical_columns = {
+        column
+        for df in frames
+        for column in df.columns
+        if isinstance(df[column].dtype, pd.CategoricalDtype)
+    }
+
+    for column in categorical_columns:
+        categories = set()
+        for df in frames:
+            if isinstance(df[column].dtype, pd.CategoricalDtype):
+                categories.update(df[column].cat.categories)
+            else:
+                categories.update(df[column].dropna().unique())
+        dtype = pd.CategoricalDtype(sorted(categories, key=str))
+        frames = [df.assign(**{column: df[column].astype(dtype)}) for df in frames]
+
+    return pd.concat(frames, ignore_index=True)
 
 
 class DataProcessor:
     """Class xử lý và phân bổ dữ liệu"""
 
-    def __init__(self):
+    def __init__(self, ingest_cache=None, excel_engine=None):
         self.month_columns = []
+        self.ingest_cache = ingest_cache if ingest_cache else IngestCache()
+        self.excel_engine = excel_engine
 
     def load_data(self, file_path):
         """
-        Đọc file Excel đầu vào (.xls hoặc .xlsx)
+        Đọc file Excel đầu vào (.xls hoặc .xlsx), dùng cache nếu đã đọc trước đó
 
         Args:
             file_path: Đường dẫn file Excel
@@ -21,16 +68,21 @@ class DataProcessor:
         Returns:
             DataFrame chứa dữ liệu
         """
-        try:
-            # Xác định engine dựa trên extension
-            if file_path.endswith(".xls"):
-                df = pd.read_excel(file_path, engine="xlrd")
-            else:
-                df = pd.read_excel(file_path, engine="openpyxl")
+        return self.ingest_cache.load(file_path, self._read_input_file, "input")
+
+    def _read_input_file(self, file_path):
+        """
+        Parse file Excel đầu vào (không qua cache), chỉ đọc các cột trong
+        INPUT_SCHEMA với kiểu dữ liệu cố định
+
+        Args:
+            file_path: Đường dẫn file Excel
 
-            # Chuẩn hóa tên cột
-            df.columns = df.columns.str.strip()
-            return df
+        Returns:
+            DataFrame chứa dữ liệu
+        """
+        try:
+            return read_excel_schema(file_path, INPUT_SCHEMA, self.excel_engine)
         except Exception as e:
             raise Exception(f"Lỗi đọc file: {str(e)}")
 
@@ -58,7 +110,8 @@ class DataProcessor:
         Returns:
             DataFrame với cột Revenue
         """
-        df["Revenue"] = df["Project Code"].map(revenue_mapping)
+        # Project Code là categorical, chuyển về object để map ra số thực
+        df["Revenue"] = df["Project Code"].astype(object).map(revenue_mapping)
         return df
 
     def normalize_member_type(self, member_type):
@@ -98,26 +151,104 @@ class DataProcessor:
 
         return months
 
-    def allocate_by_month(self, df):
+    def _prepare_allocation_input(self, df):
         """
-        Phân bổ dữ liệu theo từng tháng
+        Chuẩn hóa các cột cần thiết trước khi phân bổ theo tháng
 
         Args:
-            df: DataFrame đầu vào
+            df: DataFrame đầu vào (được sửa trực tiếp)
 
         Returns:
-            DataFrame đã được phân bổ theo tháng
+            DataFrame đã chuẩn hóa
         """
         # Chuyển đổi cột ngày tháng
         df["From Date"] = pd.to_datetime(df["From Date"])
         df["To Date"] = pd.to_datetime(df["To Date"])
 
         # Chuẩn hóa Member Type
-        df["Member Type"] = df["Member Type"].apply(self.normalize_member_type)
+        df["Member Type"] = (
+            df["Member Type"].astype(object).apply(self.normalize_member_type)
+        )
 
         # Tạo MAIL từ Username
         df["MAIL"] = df["Username"].apply(lambda x: f"{x}@fpt.com")
 
+        return df
+
+    def get_month_keys(self, dates):
+        """
+        Chuyển cột ngày thành month key dạng số nguyên (year * 12 + month - 1)
+
+        Args:
+            dates: Series datetime
+
+        Returns:
+            numpy array float64 (NaN với ngày trống)
+        """
+        dates = pd.to_datetime(dates)
+        keys = dates.dt.year * 12 + dates.dt.month - 1
+        return keys.to_numpy(dtype="float64", na_value=np.nan)
+
+    def allocate_by_month(self, df, date_range=None):
+        """
+        Phân bổ dữ liệu theo từng tháng (vectorized)
+
+        Mỗi dòng được lặp lại theo số tháng giữa From Date và To Date bằng
+        np.repeat, sau đó dựng DataFrame theo cột thay vì từng dòng.
+        Nếu có date_range, khoảng tháng của mỗi dòng được cắt theo cửa sổ
+        trước khi phân bổ nên không sinh ra các tháng nằm ngoài khoảng xuất.
+
+        Args:
+            df: DataFrame đầu vào
+            date_range: ((start_year, start_month), (end_year, end_month))
+                hoặc None để phân bổ toàn bộ
+
+        Returns:
+            DataFrame đã được phân bổ theo tháng
+        """
+        df = self._prepare_allocation_input(df)
+
+        start_keys = self.get_month_keys(df["From Date"])
+        end_keys = self.get_month_keys(df["To Date"])
+
+        if date_range is not None:
+            (start_year, start_month), (end_year, end_month) = date_range
+            start_keys = np.maximum(start_keys, start_year * 12 + start_month - 1)
+            end_keys = np.minimum(end_keys, end_year * 12 + end_month - 1)
+
+        # Số tháng của mỗi dòng (0 nếu thiếu ngày hoặc To Date < From Date)
+        spans = np.nan_to_num(end_keys - start_keys + 1, nan=0)
+        spans = np.clip(spans, 0, None).astype(np.int64)
+        start_keys = np.nan_to_num(start_keys, nan=0).astype(np.int64)
+
+        row_idx = np.repeat(np.arange(len(df)), spans)
+        first_pos = np.repeat(np.cumsum(spans) - spans, spans)
+        month_keys = np.repeat(start_keys, spans) + (
+            np.arange(len(row_idx)) - first_pos
+        )
+
+        result = df[ALLOCATION_SOURCE_COLUMNS].iloc[row_idx].reset_index(drop=True)
+        # LẤY TRỰC TIẾP Calendar Effort từ input, KHÔNG tính toán lại
+        result.insert(6, "Year", month_keys // 12)
+        result.insert(7, "Month", month_keys % 12 + 1)
+
+        return result
+
+    def allocate_by_month_reference(self, df):
+        """
+        Phân bổ dữ liệu theo từng tháng bằng vòng lặp từng dòng
+
+        Chỉ giữ lại làm bản tham chiếu để đối chiếu kết quả với
+        allocate_by_month, không dùng trong pipeline.
+
+        Args:
+            df: DataFrame đầu vào
+
+        Returns:
+            DataFrame đã được phân bổ theo tháng
+        """
+        df = self._prepare_allocation_input(df)
+
         # Phân bổ theo tháng
         monthly_data = []
 
@@ -156,10 +287,10 @@ class DataProcessor:
         Returns:
             DataFrame đã lọc
         """
-        mask = (
-            ((df["Year"] == start_year) & (df["Month"] >= start_month))
-            | ((df["Year"] > start_year) & (df["Year"] < end_year))
-            | ((df["Year"] == end_year) & (df["Month"] <= end_month))
+        # So sánh theo month key để khoảng nằm trong cùng một năm cũng đúng
+        month_keys = df["Year"] * 12 + df["Month"]
+        mask = month_keys.between(
+            start_year * 12 + start_month, end_year * 12 + end_month
         )
         return df[mask].copy()
 
@@ -180,14 +311,60 @@ class DataProcessor:
         ]
         return self.month_columns
 
-    def get_available_months(self, df):
+    def get_available_months(self, df, date_range=None):
         """
         Lấy danh sách tháng có sẵn trong dữ liệu (để user chọn)
 
+        Với DataFrame gốc (chưa phân bổ), các tháng được tính trực tiếp từ
+        From Date/To Date mà không cần phân bổ toàn bộ dữ liệu.
+
         Args:
-            df: DataFrame đã phân bổ theo tháng
+            df: DataFrame đã phân bổ theo tháng hoặc DataFrame gốc
+            date_range: ((start_year, start_month), (end_year, end_month))
+                để giới hạn kết quả, hoặc None
 
         Returns:
             list: Danh sách (year, month) đã sắp xếp
         """
-        return self.get_unique_months(df)
+        if "Year" in df.columns and "Month" in df.columns:
+            months = self.get_unique_months(df)
+        else:
+            months = self._get_covered_months(df)
+
+        if date_range is not None:
+            start, end = (tuple(m) for m in date_range)
+            months = [m for m in months if start <= m <= end]
+
+        self.month_columns = months
+        return months
+
+    def _get_covered_months(self, df):
+        """
+        Tính các tháng được phủ bởi ít nhất một dòng (From Date → To Date)
+
+        Dùng mảng hiệu (difference array) trên khoảng min/max month key, chi
+        phí tỉ lệ với số dòng cộng số tháng thay vì số dòng × số tháng.
+
+        Args:
+            df: DataFrame gốc có cột From Date và To Date
+
+        Returns:
+            list: Danh sách (year, month) đã sắp xếp
+        """
+        start_keys = self.get_month_keys(df["From Date"])
+        end_keys = self.get_month_keys(df["To Date"])
+
+        valid = ~np.isnan(start_keys) & ~np.isnan(end_keys) & (end_keys >= start_keys)
+        if not valid.any():
+            return []
+
+        start_keys = start_keys[valid].astype(np.int64)
+        end_keys = end_keys[valid].astype(np.int64)
+
+        first_key = start_keys.min()
+        diff = np.zeros(end_keys.max() - first_key + 2, dtype=np.int64)
+        np.add.at(diff, start_keys - first_key, 1)
+        np.add.at(diff, end_keys - first_key + 1, -1)
+        covered = np.flatnonzero(np.cumsum(diff)[:-1] > 0) + first_key
+
+        return [(int(key // 12), int(key % 12 + 1)) for key in covered]
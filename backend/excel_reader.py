@@ -0,0 +1,159 @@
+"""
+Đọc file Excel theo schema khai báo sẵn (chỉ đọc các cột cần thiết)
+và chọn engine đọc nhanh nhất đang có
+"""
+
+import importlib.util
+import os
+
+import pandas as pd
+
+from config import EXCEL_READER_ENGINE
+
+# Các engine đọc Excel theo thứ tự ưu tiên (nhanh nhất trước)
+# calamine (Rust) cần python-calamine và pandas >= 2.2
+READER_ENGINES = {
+    "calamine": {"module": "python_calamine", "extensions": {".xls", ".xlsx"}},
+    "xlrd": {"module": "xlrd", "extensions": {".xls"}},
+    "openpyxl": {"module": "openpyxl", "extensions": {".xlsx"}},
+}
+
+
+def _pandas_supports(engine):
+    """Kiểm tra phiên bản pandas có hỗ trợ engine không"""
+    if engine != "calamine":
+        return True
+    major, minor = (int(part) for part in pd.__version__.split(".")[:2])
+    return (major, minor) >= (2, 2)
+
+
+def get_available_engines():
+    """
+    Lấy danh sách engine đã được cài đặt
+
+    Returns:
+        list: Tên các engine theo thứ tự ưu tiên
+    """
+    return [
+        name
+        for name, spec in READER_ENGINES.items()
+        if importlib.util.find_spec(spec["module"]) is not None
+        and _pandas_supports(name)
+    ]
+
+
+def get_excel_engine(file_path, engine=None):
+    """
+    Xác định engine đọc file
+
+    Args:
+        file_path: Đường dẫn file Excel
+        engine: Tên engine bắt buộc dùng, None để tự chọn
+            (mặc định lấy từ config EXCEL_READER_ENGINE). Nếu engine không
+            đọc được định dạng của file thì dùng engine mặc định (xlrd cho
+            .xls, openpyxl cho .xlsx)
+
+    Returns:
+        str: Tên engine cho pd.read_excel
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+    legacy_engine = "xlrd" if extension == ".xls" else "openpyxl"
+    engine = engine or EXCEL_READER_ENGINE
+
+    if engine and engine != "auto":
+        if engine not in READER_ENGINES:
+            raise Exception(
+                f"Engine '{engine}' không hợp lệ, chọn một trong: "
+                f"{', '.join(READER_ENGINES)}"
+            )
+        if extension in READER_ENGINES[engine]["extensions"]:
+            return engine
+        return legacy_engine
+
+    for name in get_available_engines():
+        if extension in READER_ENGINES[name]["extensions"]:
+            return name
+
+    return legacy_engine
+
+
+def apply_schema(df, schema):
+    """
+    Ép kiểu các cột theo schema
+
+    Args:
+        df: DataFrame đã có đủ các cột trong schema
+        schema: Dict {tên cột: kiểu dữ liệu}
+
+    Cột số không làm hỏng cả file vì một ô sai: ô trống giữ NaN, ô không phải
+    số được tính là 0 (giống RevenueCalculator.calculate_rev_eff)
+
+    Returns:
+        DataFrame chỉ gồm các cột trong schema, đúng thứ tự khai báo
+    """
+    df = df[list(schema)].copy()
+
+    for column, dtype in schema.items():
+        try:
+            if dtype == "datetime":
+                df[column] = pd.to_datetime(df[column])
+            elif pd.api.types.is_numeric_dtype(dtype):
+                numeric = pd.to_numeric(df[column], errors="coerce")
+                numeric[numeric.isna() & df[column].notna()] = 0
+                df[column] = numeric.astype(dtype)
+            else:
+                df[column] = df[column].astype(dtype)
+        except (ValueError, TypeError) as e:
+            raise Exception(f"Cột '{column}' không đúng kiểu {dtype}: {str(e)}")
+
+    return df
+
+
+def read_excel(file_path, engine=None, **kwargs):
+    """
+    Đọc file Excel bằng engine được chọn qua get_excel_engine
+
+    Args:
+        file_path: Đường dẫn file Excel (.xls hoặc .xlsx)
+        engine: Tên engine bắt buộc dùng, None để tự chọn
+        **kwargs: Tham số khác truyền cho pd.read_excel
+
+    Returns:
+        DataFrame
+    """
+    return pd.read_excel(
+        file_path, engine=get_excel_engine(file_path, engine), **kwargs
+    )
+
+
+def read_excel_schema(file_path, schema, engine=None):
+    """
+    Đọc file Excel, chỉ lấy các cột trong schema với kiểu dữ liệu cố định
+
+    Args:
+        file_path: Đường dẫn file Excel (.xls hoặc .xlsx)
+        schema: Dict {tên cột: kiểu dữ liệu}
+        engine: Tên engine bắt buộc dùng, None để tự chọn
+
+    Returns:
+        DataFrame đã ép kiểu
+
+    Raises:
+        Exception: Nếu file thiếu cột bắt buộc
+    """
+    wanted_columns = set(schema)
+
+    df = read_excel(
+        file_path,
+        engine=engine,
+        usecols=lambda column: str(column).strip() in wanted_columns,
+    )
+
+    # Chuẩn hóa tên cột
+    df.columns = df.columns.str.strip()
+
+    missing_columns = [column for column in schema if column not in df.columns]
+    if missing_columns:
+        raise Exception(f"Thiếu các cột bắt buộc: {', '.join(missing_columns)}")
+
+    return apply_schema(df, schema)
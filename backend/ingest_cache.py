@@ -0,0 +1,164 @@
+"""
+Cache dữ liệu đầu vào dạng cột (Arrow IPC) để không phải parse lại Excel
+"""
+
+import hashlib
+import os
+import tempfile
+
+from config import INGEST_CACHE_DIR, INGEST_CACHE_MAX_BYTES, INGEST_SCHEMA_VERSION
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow là optional, thiếu thì cache bị tắt
+    pa = None
+    feather = None
+
+
+CACHE_FILE_EXTENSION = ".arrow"
+
+
+def _remove(path):
+    """Xóa file, bỏ qua nếu process khác đã xóa trước"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class IngestCache:
+    """Class lưu DataFrame đã chuẩn hóa theo SHA-256 của file gốc"""
+
+    def __init__(
+        self,
+        cache_dir=INGEST_CACHE_DIR,
+        max_bytes=INGEST_CACHE_MAX_BYTES,
+        schema_version=INGEST_SCHEMA_VERSION,
+    ):
+        """
+        Khởi tạo Ingest Cache
+
+        Args:
+            cache_dir: Thư mục chứa các file cache
+            max_bytes: Tổng dung lượng tối đa, vượt quá sẽ xóa file ít dùng nhất
+            schema_version: Phiên bản chuẩn hóa, đổi giá trị để bỏ cache cũ
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.schema_version = schema_version
+
+    @property
+    def enabled(self):
+        """Cache chỉ hoạt động khi có pyarrow"""
+        return feather is not None
+
+    def hash_file(self, file_path):
+        """
+        Tính SHA-256 nội dung file
+
+        Args:
+            file_path: Đường dẫn file
+
+        Returns:
+            str: Chuỗi hex digest
+        """
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def get_cache_path(self, file_hash, namespace):
+        """Đường dẫn file cache cho một file gốc"""
+        filename = (
+            f"{namespace}_v{self.schema_version}_{file_hash}{CACHE_FILE_EXTENSION}"
+        )
+        return os.path.join(self.cache_dir, filename)
+
+    def load(self, file_path, loader, namespace="input"):
+        """
+        Đọc DataFrame từ cache, nếu chưa có thì gọi loader rồi lưu lại
+
+        Khi có cache, file Arrow được đọc toàn bộ (không memory-map vì
+        to_pandas vẫn copy từng cột), chỉ bỏ qua bước parse Excel.
+
+        Args:
+            file_path: Đường dẫn file Excel gốc
+            loader: Hàm loader(file_path) trả về DataFrame đã chuẩn hóa
+            namespace: Tên nhóm dữ liệu (input, project_code, ...)
+
+        Returns:
+            DataFrame
+        """
+        if not self.enabled:
+            return loader(file_path)
+
+        cache_path = self.get_cache_path(self.hash_file(file_path), namespace)
+
+        if os.path.exists(cache_path):
+            try:
+                # Đọc file Arrow thay vì parse lại Excel
+                df = feather.read_table(cache_path).to_pandas()
+            except (OSError, pa.ArrowException):
+                # File hỏng hoặc vừa bị process khác evict
+                _remove(cache_path)
+            else:
+                try:
+                    os.utime(cache_path)  # Đánh dấu vừa dùng (cho evict)
+                except FileNotFoundError:
+                    pass
+                return df
+
+        df = loader(file_path)
+        self._store(df, cache_path)
+        return df
+
+    def _store(self, df, cache_path):
+        """Ghi DataFrame ra file Arrow (bỏ qua nếu dữ liệu không chuyển được)"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        os.close(fd)
+
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            # Không nén: đọc lại nhanh hơn, không tốn CPU giải nén
+            feather.write_feather(table, tmp_path, compression="uncompressed")
+            os.replace(tmp_path, cache_path)
+        except (OSError, ValueError, pa.ArrowException):
+            _remove(tmp_path)
+            return
+
+        self.evict()
+
+    def evict(self):
+        """Xóa các file cache ít được dùng nhất cho tới khi dưới max_bytes"""
+        if not os.path.isdir(self.cache_dir):
+            return
+
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(CACHE_FILE_EXTENSION):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                # Process khác vừa evict file này
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            _remove(path)
+            total_bytes -= size
+
+    def clear(self):
+        """Xóa toàn bộ cache"""
+        if not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(CACHE_FILE_EXTENSION):
+                _remove(os.path.join(self.cache_dir, name))
@@ -0,0 +1,518 @@
+"""
+Hàng đợi job xử lý báo cáo chạy nền cho Flask API
+Trạng thái job lưu trong SQLite, job chạy trong process pool (không cần broker)
+"""
+
+import contextlib
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+from config import JOB_DB_PATH, JOB_MAX_WORKERS, JOB_MAX_PENDING
+
+# Trạng thái của job
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+JOB_COLUMNS = [
+    "job_id",
+    "kind",
+    "status",
+    "output_file",
+    "error",
+    "created_at",
+    "started_at",
+    "finished_at",
+]
+
+STAGE_METRIC_COLUMNS = [
+    "stage",
+    "runs",
+    "wall_seconds",
+    "cpu_seconds",
+    "rows",
+    "rss_mb",
+]
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def _connect(db_path):
+    """Mở kết nối SQLite (mỗi thread/process dùng kết nối riêng)"""
+    connection = sqlite3.connect(db_path, timeout=30)
+    connection.execute("PRAGMA journal_mode=WAL")
+    return connection
+
+
+def _is_process_alive(pid):
+    """Kiểm tra process còn chạy không (pid trên cùng máy)"""
+    if os.name == "nt":
+        # os.kill trên Windows sẽ kết thúc process, chỉ có một server trên
+        # Windows (flask run) nên coi như process chủ đã dừng
+        return pid == os.getpid()
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _update_job(db_path, job_id, **fields):
+    """Cập nhật các cột của một job"""
+    assignments = ", ".join(f"{name} = ?" for name in fields)
+    with contextlib.closing(_connect(db_path)) as connection, connection:
+        connection.execute(
+            f"UPDATE jobs SET {assignments} WHERE job_id = ?",
+            [*fields.values(), job_id],
+        )
+
+
+def _add_event(db_path, job_id, seq, event):
+    """Lưu một sự kiện tiến độ của job"""
+    with contextlib.closing(_connect(db_path)) as connection, connection:
+        connection.execute(
+            "INSERT INTO job_events (job_id, seq, event, created_at) "
+            "VALUES (?, ?, ?, ?)",
+            [job_id, seq, json.dumps(event, ensure_ascii=False), _now()],
+        )
+
+
+def _record_metrics(db_path, metrics):
+    """
+    Cộng dồn số liệu đo từng bước của một job vào bảng stage_metrics
+    (rss_mb là RSS lớn nhất lúc kết thúc bước qua các job, không phải mức cao
+    nhất trong lúc chạy bước)
+    """
+    stages = [{**stage, "rows": stage["rows"] or 0} for stage in metrics["stages"]] + [
+        {**metrics, "stage": "total"}
+    ]
+
+    with contextlib.closing(_connect(db_path)) as connection, connection:
+        connection.executemany(
+            "INSERT INTO stage_metrics (stage, runs, wall_seconds, cpu_seconds, "
+            "rows, rss_mb) VALUES (?, 1, ?, ?, ?, ?) "
+            "ON CONFLICT (stage) DO UPDATE SET runs = runs + 1, "
+            "wall_seconds = wall_seconds + excluded.wall_seconds, "
+            "cpu_seconds = cpu_seconds + excluded.cpu_seconds, "
+            "rows = rows + excluded.rows, "
+            "rss_mb = MAX(rss_mb, excluded.rss_mb)",
+            [
+                (
+                    stage["stage"],
+                    stage["wall_time"],
+                    stage["cpu_time"],
+                    stage["rows"],
+                    stage["rss_mb"] or 0,
+                )
+                for stage in stages
+            ],
+        )
+
+
+def _get_error_message(log):
+    """Lấy dòng lỗi cuối cùng mà tool in ra (dòng bắt đầu bằng ✖)"""
+    for line in reversed(log.splitlines()):
+        if line.strip().startswith("✖"):
+            return line.strip().lstrip("✖").strip()
+    return "Xử lý thất bại"
+
+
+def run_job(db_path, job_id, kind, params):
+    """
+    Chạy một job trong worker process
+
+    Args:
+        db_path: Đường dẫn SQLite lưu trạng thái job
+        job_id: Mã job
+        kind: "single" hoặc "multi"
+        params: Tham số của job (đường dẫn file input, project code, output)
+    """
+    _update_job(db_path, job_id, status=JOB_RUNNING, started_at=_now())
+
+    # Sự kiện tiến độ được lưu vào SQLite để API stream cho client (SSE)
+    event_seq = itertools.count(1)
+
+    def on_progress(event):
+        _add_event(db_path, job_id, next(event_seq), event)
+
+    # Ghi ra file tạm rồi đổi tên, file báo cáo chỉ xuất hiện khi đã hoàn chỉnh
+    output_path = params["output_path"]
+    tmp_path = f"{output_path}.{job_id}.tmp"
+
+    log = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(log):
+            if kind == "single":
+                from main import ProjectReportTool
+
+                metrics = ProjectReportTool(progress_callback=on_progress).run(
+                    params["input_file"], params["project_code_file"], tmp_path
+                )
+            elif kind == "multi":
+                from main_multi_files import MultiFileProjectReportTool
+
+                file_list = [tuple(item) for item in params["file_list"]]
+                metrics = MultiFileProjectReportTool(
+                    progress_callback=on_progress
+                ).run_multi_files(file_list, params["project_code_file"], tmp_path)
+            else:
+                raise Exception(f"Loại job không hợp lệ: {kind}")
+        os.replace(tmp_path, output_path)
+    except SystemExit:
+        # ProjectReportTool.run gọi sys.exit khi lỗi, lỗi đã được in ra log
+        _update_job(
+            db_path,
+            job_id,
+            status=JOB_FAILED,
+            error=_get_error_message(log.getvalue()),
+            finished_at=_now(),
+        )
+    except Exception as e:
+        _update_job(
+            db_path, job_id, status=JOB_FAILED, error=str(e), finished_at=_now()
+        )
+    else:
+        _update_job(db_path, job_id, status=JOB_DONE, finished_at=_now())
+        # Metrics chỉ để theo dõi, lỗi ghi metrics không làm hỏng job đã xong
+        try:
+            _record_metrics(db_path, metrics)
+        except Exception as e:
+            print(f"⚠ Không ghi được metrics của job {job_id}: {str(e)}")
+    finally:
+        _cleanup_files(params)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _cleanup_files(params):
+    """Xóa file upload của job sau khi xử lý xong"""
+    for file_path in params.get("cleanup_files", []):
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+
+class JobQueue:
+    """Class quản lý job chạy nền (SQLite + process pool)"""
+
+    def __init__(
+        self,
+        db_path=JOB_DB_PATH,
+        max_workers=JOB_MAX_WORKERS,
+        max_pending=JOB_MAX_PENDING,
+    ):
+        """
+        Khởi tạo Job Queue
+
+        Args:
+            db_path: Đường dẫn file SQLite lưu trạng thái job
+            max_workers: Số worker process xử lý song song
+            max_pending: Số job tối đa đang chờ/đang chạy
+        """
+        self.db_path = db_path
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with contextlib.closing(_connect(db_path)) as connection, connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    output_file TEXT,
+                    error TEXT,
+                    created_at TEXT NOT NULL,
+                    started_at TEXT,
+                    finished_at TEXT,
+                    owner_pid INTEGER
+                )
+                """)
+            # DB tạo trước khi có cột owner_pid
+            columns = [row[1] for row in connection.execute("PRAGMA table_info(jobs)")]
+            if "owner_pid" not in columns:
+                connection.execute("ALTER TABLE jobs ADD COLUMN owner_pid INTEGER")
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS job_events (
+                    job_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    event TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    PRIMARY KEY (job_id, seq)
+                )
+                """)
+            # Số liệu đo cộng dồn theo bước xử lý (cho /api/metrics)
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS stage_metrics (
+                    stage TEXT PRIMARY KEY,
+                    runs INTEGER NOT NULL,
+                    wall_seconds REAL NOT NULL,
+                    cpu_seconds REAL NOT NULL,
+                    rows INTEGER NOT NULL,
+                    rss_mb REAL NOT NULL
+                )
+                """)
+            # DB tạo khi cột còn tên peak_rss_mb
+            columns = [
+                row[1] for row in connection.execute("PRAGMA table_info(stage_metrics)")
+            ]
+            if "peak_rss_mb" in columns:
+                connection.execute(
+                    "ALTER TABLE stage_metrics RENAME COLUMN peak_rss_mb TO rss_mb"
+                )
+
+    def _get_executor(self, replace=False):
+        """
+        Tạo process pool khi có job đầu tiên
+
+        Args:
+            replace: True để bỏ pool hiện tại (bị hỏng do worker chết bất
+                thường) và tạo pool mới
+        """
+        if replace and self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._executor is None:
+            # spawn để worker không kế thừa trạng thái thread của Flask
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def _submit_to_pool(self, fn, *args):
+        """Gửi việc cho process pool, tạo pool mới nếu pool cũ đã hỏng"""
+        try:
+            return self._get_executor().submit(fn, *args)
+        except BrokenProcessPool:
+            # Một worker chết bất thường (hết bộ nhớ, bị kill...) làm hỏng cả
+            # pool, mọi lần submit sau đó đều lỗi nếu không tạo lại
+            return self._get_executor(replace=True).submit(fn, *args)
+
+    def recover(self):
+        """
+        Đánh dấu lỗi các job dở dang mà process tạo ra chúng đã dừng
+
+        Nhiều server (vd các worker gunicorn) dùng chung SQLite, job của
+        process khác còn chạy thì không bị đụng tới.
+        """
+        with contextlib.closing(_connect(self.db_path)) as connection, connection:
+            rows = connection.execute(
+                "SELECT job_id, owner_pid FROM jobs WHERE status IN (?, ?)",
+                [JOB_QUEUED, JOB_RUNNING],
+            ).fetchall()
+            orphaned = [
+                (job_id,)
+                for job_id, owner_pid in rows
+                if owner_pid is None or not _is_process_alive(owner_pid)
+            ]
+            connection.executemany(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? "
+                "WHERE job_id = ? AND status IN (?, ?)",
+                [
+                    (
+                        JOB_FAILED,
+                        "Server đã khởi động lại khi job chưa xong",
+                        _now(),
+                        job_id,
+                        JOB_QUEUED,
+                        JOB_RUNNING,
+                    )
+                    for (job_id,) in orphaned
+                ],
+            )
+
+    def count_pending(self):
+        """Số job đang chờ hoặc đang chạy"""
+        with contextlib.closing(_connect(self.db_path)) as connection:
+            (count,) = connection.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)",
+                [JOB_QUEUED, JOB_RUNNING],
+            ).fetchone()
+        return count
+
+    def submit(self, kind, params, output_file=None, job_id=None):
+        """
+        Đưa job vào hàng đợi, trả về ngay mà không chờ xử lý
+
+        Args:
+            kind: "single" hoặc "multi"
+            params: Tham số của job (phải serialize được thành JSON)
+            output_file: Tên file báo cáo sẽ được tạo
+            job_id: Mã job (None để tự sinh)
+
+        Returns:
+            str: Mã job, là mã của job đang chạy nếu đã có job cùng
+            output_file (yêu cầu trùng) thì không tạo job mới
+        """
+        with self._lock:
+            if output_file is not None:
+                active_job = self.find_active(output_file)
+                if active_job is not None:
+                    return active_job["job_id"]
+
+            if self.count_pending() >= self.max_pending:
+                raise Exception(
+                    f"Hàng đợi đã đầy ({self.max_pending} job), vui lòng thử lại sau"
+                )
+
+            job_id = job_id or uuid.uuid4().hex
+            with contextlib.closing(_connect(self.db_path)) as connection, connection:
+                connection.execute(
+                    "INSERT INTO jobs (job_id, kind, status, params, output_file, "
+                    "created_at, owner_pid) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        job_id,
+                        kind,
+                        JOB_QUEUED,
+                        json.dumps(params),
+                        output_file,
+                        _now(),
+                        os.getpid(),
+                    ],
+                )
+
+            try:
+                future = self._submit_to_pool(
+                    run_job, self.db_path, job_id, kind, params
+                )
+            except Exception as e:
+                # Job đã ghi vào SQLite nhưng không chạy được, không để treo
+                # ở trạng thái queued (tính vào max_pending)
+                _update_job(
+                    self.db_path,
+                    job_id,
+                    status=JOB_FAILED,
+                    error=str(e) or type(e).__name__,
+                    finished_at=_now(),
+                )
+                _cleanup_files(params)
+                raise
+
+        def on_done(future):
+            # Worker chết bất thường (hết bộ nhớ, bị kill...) thì job không tự
+            # cập nhật được trạng thái
+            error = future.exception()
+            if error is not None:
+                _update_job(
+                    self.db_path,
+                    job_id,
+                    status=JOB_FAILED,
+                    error=str(error) or type(error).__name__,
+                    finished_at=_now(),
+                )
+                _cleanup_files(params)
+
+        future.add_done_callback(on_done)
+        return job_id
+
+    def find_active(self, output_file):
+        """Job đang chờ/đang chạy tạo ra output_file (None nếu không có)"""
+        with contextlib.closing(_connect(self.db_path)) as connection:
+            row = connection.execute(
+                f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs "
+                "WHERE output_file = ? AND status IN (?, ?) "
+                "ORDER BY created_at DESC LIMIT 1",
+                [output_file, JOB_QUEUED, JOB_RUNNING],
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(JOB_COLUMNS, row))
+
+    def add_completed(self, kind, output_file):
+        """
+        Ghi nhận job đã xong ngay (báo cáo lấy từ cache kết quả)
+
+        Returns:
+            str: Mã job
+        """
+        job_id = uuid.uuid4().hex
+        now = _now()
+        with contextlib.closing(_connect(self.db_path)) as connection, connection:
+            connection.execute(
+                "INSERT INTO jobs (job_id, kind, status, params, output_file, "
+                "created_at, started_at, finished_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [job_id, kind, JOB_DONE, "{}", output_file, now, now, now],
+            )
+        return job_id
+
+    def get(self, job_id):
+        """
+        Lấy trạng thái job
+
+        Returns:
+            dict hoặc None nếu không có job
+        """
+        with contextlib.closing(_connect(self.db_path)) as connection:
+            row = connection.execute(
+                f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE job_id = ?",
+                [job_id],
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(JOB_COLUMNS, row))
+
+    def get_events(self, job_id, after_seq=0):
+        """
+        Lấy các sự kiện tiến độ của job
+
+        Args:
+            job_id: Mã job
+            after_seq: Chỉ lấy các sự kiện có số thứ tự lớn hơn giá trị này
+
+        Returns:
+            list: (số thứ tự, dict sự kiện) theo thứ tự phát
+        """
+        with contextlib.closing(_connect(self.db_path)) as connection:
+            rows = connection.execute(
+                "SELECT seq, event FROM job_events WHERE job_id = ? AND seq > ? "
+                "ORDER BY seq",
+                [job_id, after_seq],
+            ).fetchall()
+        return [(seq, json.loads(event)) for seq, event in rows]
+
+    def get_metrics(self):
+        """
+        Số liệu tổng hợp của hàng đợi
+
+        Returns:
+            dict: jobs ({trạng thái: số job}) và stages (list dict số liệu
+            cộng dồn theo bước, bước "total" là cả job)
+        """
+        with contextlib.closing(_connect(self.db_path)) as connection:
+            jobs = dict(
+                connection.execute(
+                    "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+                ).fetchall()
+            )
+            stages = [
+                dict(zip(STAGE_METRIC_COLUMNS, row))
+                for row in connection.execute(
+                    f"SELECT {', '.join(STAGE_METRIC_COLUMNS)} FROM stage_metrics "
+                    "ORDER BY stage"
+                ).fetchall()
+            ]
+        return {"jobs": jobs, "stages": stages}
+
+    def shutdown(self, wait=True):
+        """Dừng process pool"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
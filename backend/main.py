@@ -2,24 +2,93 @@
 Module chính để chạy Project Report Tool
 """
 
+import argparse
+import contextlib
+import cProfile
+import glob
+import json
+import multiprocessing
 import os
+import pstats
 import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 from data_processor import DataProcessor
 from ai_detector import AIDetector
 from calculator import RevenueCalculator
 from report_generator import ReportGenerator
-import pandas as pd
+from xlsx_report_generator import XlsxWriterReportGenerator
+from excel_reader import read_excel, READER_ENGINES
+from ratecard_cache import ratecard_cache as shared_ratecard_cache
+from progress import ProgressReporter
+from analytics_store import AnalyticsStore
+from config import REPORT_WRITER, REPORT_WRITERS
+
+try:
+    import yaml
+except ImportError:  # PyYAML là optional, chỉ cần khi dùng job spec YAML
+    yaml = None
+
+# Số bước xử lý của ProjectReportTool.run (không tính bước ghi báo cáo)
+RUN_STEPS = 8
+
+# Key trong job spec khác tên option của argparse
+JOB_SPEC_ALIASES = {
+    "from": "date_from",
+    "to": "date_to",
+    "conditional_format": "conditional_formatting",
+}
 
 
 class ProjectReportTool:
     """Class chính điều phối toàn bộ quy trình"""
 
-    def __init__(self):
-        self.data_processor = DataProcessor()
+    def __init__(
+        self,
+        excel_engine=None,
+        write_only=False,
+        writer=REPORT_WRITER,
+        conditional_formatting=False,
+        ratecard_cache=None,
+        progress_callback=None,
+        analytics_db=None,
+    ):
+        """
+        Khởi tạo tool
+
+        Args:
+            excel_engine: Engine đọc Excel bắt buộc dùng (calamine, xlrd,
+                openpyxl), None để tự chọn engine nhanh nhất
+            write_only: True để ghi báo cáo dạng streaming (ít tốn bộ nhớ)
+            writer: Backend ghi báo cáo, "openpyxl" hoặc "xlsxwriter"
+                (constant_memory)
+            conditional_formatting: True để tô màu dòng và highlight AI bằng
+                rule conditional formatting thay vì fill từng cell
+            ratecard_cache: Cache ratecard, None để dùng cache chung của process
+            progress_callback: Hàm callback(event) nhận sự kiện tiến độ của
+                từng bước (xem progress.ProgressReporter)
+            analytics_db: File SQLite của kho phân tích, nếu có thì dữ liệu
+                được nạp vào kho và metrics Summary tính bằng SQL
+        """
+        self.data_processor = DataProcessor(excel_engine=excel_engine)
         self.ai_detector = AIDetector()
         self.calculator = RevenueCalculator()
-        self.report_generator = ReportGenerator()
+        self.ratecard_cache = (
+            ratecard_cache if ratecard_cache else shared_ratecard_cache
+        )
+        if writer == "xlsxwriter":
+            self.report_generator = XlsxWriterReportGenerator(
+                conditional_formatting=conditional_formatting
+            )
+        else:
+            self.report_generator = ReportGenerator(
+                write_only=write_only, conditional_formatting=conditional_formatting
+            )
+        self.progress = ProgressReporter(progress_callback)
+        self.report_generator.progress = self.progress
+        self.analytics_store = AnalyticsStore(analytics_db) if analytics_db else None
 
     def load_project_code_file(self, file_path):
         """
@@ -32,41 +101,40 @@ class ProjectReportTool:
             tuple: (DataFrame gốc, dict mapping {Project Code: Ratecard})
         """
         try:
-            # Đọc file Excel
-            if file_path.endswith(".xls"):
-                df = pd.read_excel(file_path, engine="xlrd")
-            else:
-                df = pd.read_excel(file_path, engine="openpyxl")
+            # Ratecard đã parse trong process này thì dùng lại (theo SHA-256 file)
+            file_hash = self.data_processor.ingest_cache.hash_file(file_path)
+            df, revenue_mapping = self.ratecard_cache.load(
+                file_path, file_hash, self._read_project_code_file
+            )
 
-            # Chuẩn hóa tên cột
-            df.columns = df.columns.str.strip()
+            print(f"✓ Đã load {len(revenue_mapping)} project codes từ file")
 
-            # Kiểm tra các cột bắt buộc
-            if "Project Code" not in df.columns:
-                raise Exception("File project_code.xlsx thiếu cột 'Project Code'")
-            if "Ratecard" not in df.columns:
-                raise Exception("File project_code.xlsx thiếu cột 'Ratecard'")
+            return df, revenue_mapping
 
-            # Tạo mapping dictionary
-            revenue_mapping = {}
-            for _, row in df.iterrows():
-                project_code = str(row["Project Code"]).strip()
-                ratecard = row["Ratecard"]
+        except Exception as e:
+            raise Exception(f"Lỗi đọc file project_code.xlsx: {str(e)}")
 
-                # Xử lý giá trị ratecard
-                try:
-                    ratecard_value = float(ratecard) if pd.notna(ratecard) else 0
-                except (ValueError, TypeError):
-                    ratecard_value = 0
+    def _read_project_code_file(self, file_path):
+        """Đọc file project_code.xlsx (qua ingest cache) và kiểm tra các cột"""
+        df = self.data_processor.ingest_cache.load(
+            file_path, self._parse_project_code_file, "project_code"
+        )
 
-                revenue_mapping[project_code] = ratecard_value
+        # Kiểm tra các cột bắt buộc
+        if "Project Code" not in df.columns:
+            raise Exception("File project_code.xlsx thiếu cột 'Project Code'")
+        if "Ratecard" not in df.columns:
+            raise Exception("File project_code.xlsx thiếu cột 'Ratecard'")
 
-            print(f"✓ Đã load {len(revenue_mapping)} project codes từ file")
+        return df
 
-            return df, revenue_mapping
+    def _parse_project_code_file(self, file_path):
+        """Parse file project_code.xlsx (không qua cache)"""
+        df = read_excel(file_path, self.data_processor.excel_engine)
 
-        except Exception as e:
-            raise Exception(f"Lỗi đọc file project_code.xlsx: {str(e)}")
+        # Chuẩn hóa tên cột
+        df.columns = df.columns.str.strip()
+        return df
 
     def select_date_range(self, available_months):
         """
@@ -174,7 +242,7 @@ class ProjectReportTool:
             print("  ✖ Giá trị không hợp lệ! Bỏ qua Revenue_By_Account sheet.")
             return None
 
-    def run(self, input_file, project_code_file, output_file=None):
+    def run(self, input_file, project_code_file, output_file=None, date_range=None):
         """
         Chạy toàn bộ quy trình tạo báo cáo
 
@@ -182,8 +250,16 @@ class ProjectReportTool:
             input_file: Đường dẫn file Excel đầu vào (data)
             project_code_file: Đường dẫn file project_code.xlsx
             output_file: Đường dẫn file Excel đầu ra (optional)
+            date_range: ((start_year, start_month), (end_year, end_month)) để
+                chỉ phân bổ các tháng trong khoảng xuất (optional)
+
+        Returns:
+            dict: output_file, rows (số dòng input), wall_time, cpu_time,
+            rss_mb, process_peak_rss_mb và stages (số liệu đo từng bước, xem
+            progress.ProgressReporter.get_metrics)
         """
         try:
+            self.progress.start()
             print("=" * 70)
             print("PROJECT REPORT TOOL")
             print("=" * 70)
@@ -193,11 +269,21 @@ class ProjectReportTool:
             df_project_code, revenue_mapping = self.load_project_code_file(
                 project_code_file
             )
+            self.progress.emit(
+                "load_project_code",
+                "Đã đọc file project_code.xlsx",
+                1,
+                RUN_STEPS,
+                len(df_project_code),
+            )
 
             # 2. Đọc dữ liệu đầu vào
             print("\n[2/8] Đang đọc file đầu vào...")
             df_input = self.data_processor.load_data(input_file)
             print(f"✓ Đã đọc {len(df_input)} dòng dữ liệu")
+            self.progress.emit(
+                "load_input", "Đã đọc file đầu vào", 2, RUN_STEPS, len(df_input)
+            )
 
             # 3. Lấy danh sách Project Code duy nhất
             print("\n[3/8] Phát hiện Project Codes...")
@@ -215,6 +301,13 @@ class ProjectReportTool:
                 )
                 for pc in missing_codes:
                     print(f"  - {pc} (sẽ dùng revenue = 0)")
+            self.progress.emit(
+                "project_codes",
+                f"Tìm thấy {len(project_codes)} project codes",
+                3,
+                RUN_STEPS,
+                len(project_codes),
+            )
 
             # 4. Thêm Revenue vào DataFrame
             print("\n[4/8] Đang áp dụng Revenue vào dữ liệu...")
@@ -222,12 +315,24 @@ class ProjectReportTool:
                 df_input, revenue_mapping
             )
             print("✓ Đã thêm Revenue cho tất cả dòng dữ liệu")
+            self.progress.emit(
+                "revenue", "Đã áp dụng Revenue", 4, RUN_STEPS, len(df_input)
+            )
 
             # 5. Phân bổ dữ liệu theo tháng (chỉ để tính Summary)
             print("\n[5/8] Đang phân bổ dữ liệu theo tháng...")
-            df_monthly = self.data_processor.allocate_by_month(df_input)
-            available_months = self.data_processor.get_available_months(df_monthly)
+            available_months = self.data_processor.get_available_months(
+                df_input, date_range
+            )
+            df_monthly = self.data_processor.allocate_by_month(df_input, date_range)
             print(f"✓ Đã phân bổ dữ liệu cho {len(available_months)} tháng")
+            self.progress.emit(
+                "allocate",
+                f"Đã phân bổ dữ liệu cho {len(available_months)} tháng",
+                5,
+                RUN_STEPS,
+                len(df_monthly),
+            )
 
             # 6. Đánh dấu AI projects
             print("\n[6/8] Đang nhận diện AI projects...")
@@ -237,14 +342,44 @@ class ProjectReportTool:
             ai_count_monthly = len(df_monthly[df_monthly["AI Project"] == "AI"])
             print(f"✓ Input: {ai_count_input} dòng AI projects")
             print(f"✓ Monthly: {ai_count_monthly} dòng AI projects")
+            self.progress.emit(
+                "ai_detect",
+                "Đã nhận diện AI projects",
+                6,
+                RUN_STEPS,
+                len(df_input) + len(df_monthly),
+            )
 
             # 7. Thêm MAIL column vào input
             print("\n[7/8] Chuẩn bị dữ liệu...")
             df_input["MAIL"] = df_input["Username"].apply(lambda x: f"{x}@fpt.com")
+            self.progress.emit(
+                "prepare", "Đã chuẩn bị dữ liệu", 7, RUN_STEPS, len(df_input)
+            )
 
             # 8. Tính toán cho Summary sheet (từ df_monthly)
             print("\n[8/8] Tính toán metrics cho Summary sheet...")
             df_monthly = self.calculator.add_calculations(df_monthly)
+            if self.analytics_store is None:
+                monthly_metrics = self.calculator.get_monthly_metrics(
+                    df_monthly, available_months
+                )
+            else:
+                monthly_metrics = self.load_analytics_store(
+                    input_file,
+                    project_code_file,
+                    df_project_code,
+                    df_input,
+                    df_monthly,
+                    available_months,
+                )
+            self.progress.emit(
+                "metrics",
+                "Đã tính metrics cho Summary sheet",
+                8,
+                RUN_STEPS,
+                len(df_monthly),
+            )
 
             # Hiển thị thống kê
             stats = self.calculator.get_summary_statistics(df_monthly)
@@ -274,9 +409,11 @@ class ProjectReportTool:
                 month_list=available_months,
                 output_path=output_file,
                 df_project_code=df_project_code,
+                monthly_metrics=monthly_metrics,
             )
 
             print(f"\n✓ Báo cáo đã được lưu tại: {output_file}")
+            self.progress.emit("done", "Hoàn thành", rows=len(df_input))
             print(f"  - Sheet 1 (Project Report): {len(df_input)} rows")
             print("  - Sheet 2 (Summary): Monthly metrics")
 
@@ -284,15 +421,11 @@ class ProjectReportTool:
             print("HOÀN THÀNH!")
             print("=" * 70)
 
-            return output_file
-            print("HOÀN THÀNH!")
-            print("=" * 70)
-            print(
-                "\n💡 Lưu ý: Bạn có thể sửa giá trị Ratecard trong sheet 'Project_Code'"
-            )
-            print("   và các sheet khác sẽ tự động cập nhật theo!")
-
-            return output_file
+            return {
+                "output_file": output_file,
+                "rows": len(df_input),
+                **self.progress.get_metrics(),
+            }
 
         except Exception as e:
             print(f"\n✖ LỖI: {str(e)}")
@@ -301,9 +434,36 @@ class ProjectReportTool:
             traceback.print_exc()
             sys.exit(1)
 
+    def load_analytics_store(
+        self,
+        input_file,
+        project_code_file,
+        df_project_code,
+        df_input,
+        df_monthly,
+        available_months,
+    ):
+        """
+        Nạp ratecard, input và dữ liệu phân bổ vào kho phân tích rồi tính
+        metrics Summary bằng SQL (chỉ trên dữ liệu của file input này)
+
+        Returns:
+            DataFrame metrics giống RevenueCalculator.get_monthly_metrics
+        """
+        hash_file = self.data_processor.ingest_cache.hash_file
+        source_hash = hash_file(input_file)
+        ratecard_hash = hash_file(project_code_file)
+
+        self.analytics_store.load_ratecard(ratecard_hash, df_project_code)
+        self.analytics_store.load_source(
+            source_hash, input_file, ratecard_hash, df_input, df_monthly
+        )
+        print(f"✓ Đã nạp {len(df_monthly)} dòng vào kho phân tích")
+        return self.analytics_store.get_monthly_metrics(available_months, [source_hash])
+
     def validate_input_file(self, file_path):
         """
-        Kiểm tra tính hợp lệ của file đầu vào
+        Kiểm tra tính hợp lệ của file đầu vào (tồn tại và đúng định dạng)
 
         Args:
             file_path: Đường dẫn file cần kiểm tra
@@ -321,73 +481,460 @@ class ProjectReportTool:
             print("✖ File phải có định dạng .xls hoặc .xlsx")
             return False
 
-        # Kiểm tra các cột bắt buộc
-        try:
-            if file_path.endswith(".xls"):
-                df = pd.read_excel(file_path, nrows=1, engine="xlrd")
-            else:
-                df = pd.read_excel(file_path, nrows=1, engine="openpyxl")
+        # Các cột bắt buộc được kiểm tra khi đọc dữ liệu (DataProcessor.load_data)
+        # để không phải đọc file Excel hai lần
+        return True
+
+
+def print_profile(metrics, profiler, profile_path):
+    """
+    In số liệu đo từng bước và kết quả cProfile, lưu cProfile ra file
+
+    Args:
+        metrics: dict trả về từ ProjectReportTool.run
+        profiler: cProfile.Profile đã chạy
+        profile_path: Đường dẫn file lưu cProfile (xem bằng pstats/snakeviz)
+    """
+    print("\n" + "=" * 70)
+    print("PROFILE (thời gian bị cProfile làm chậm hơn bình thường)")
+    print("=" * 70)
+    print(
+        f"{'Bước':<22}{'Dòng':>9}{'Wall (s)':>11}{'CPU (s)':>10}"
+        f"{'RSS (MB)':>14}{'Python peak (MB)':>18}"
+    )
+    for stage in metrics["stages"]:
+        rows = "" if stage["rows"] is None else stage["rows"]
+        print(
+            f"{stage['stage']:<22}{rows:>9}{stage['wall_time']:>11.3f}"
+            f"{stage['cpu_time']:>10.3f}{stage['rss_mb'] or '':>14}"
+            f"{stage.get('traced_peak_mb', ''):>18}"
+        )
+    print(
+        f"{'TỔNG':<22}{metrics['rows']:>9}{metrics['wall_time']:>11.3f}"
+        f"{metrics['cpu_time']:>10.3f}{metrics['rss_mb'] or '':>14}"
+    )
+    print(f"RSS cao nhất của process: {metrics['process_peak_rss_mb'] or '-'} MB")
+
+    profiler.dump_stats(profile_path)
+    print(f"\n✓ Đã lưu cProfile: {profile_path}")
+    pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+
+
+def parse_month(value):
+    """Đọc tháng dạng YYYY-MM (dùng làm type của argparse)"""
+    try:
+        year, month = (int(part) for part in str(value).split("-"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"Tháng '{value}' không hợp lệ, dùng dạng YYYY-MM"
+        )
+    if not 1 <= month <= 12:
+        raise argparse.ArgumentTypeError(f"Tháng '{value}' không hợp lệ")
+    return year, month
+
+
+def load_job_spec(file_path):
+    """
+    Đọc job spec (JSON hoặc YAML), các key trùng tên với option của CLI
+
+    Ví dụ (YAML):
+        input_file: data/input/t8.xls
+        project_code_file: data/input/project_code.xlsx
+        from: 2025-01
+        to: 2025-06
+        writer: xlsxwriter
+
+    Args:
+        file_path: Đường dẫn file .json, .yaml hoặc .yml
+
+    Returns:
+        dict: {tên option: giá trị}
+    """
+    with open(file_path, encoding="utf-8") as f:
+        if file_path.lower().endswith((".yaml", ".yml")):
+            if yaml is None:
+                raise Exception("Cần cài PyYAML để đọc job spec YAML")
+            spec = yaml.safe_load(f)
+        else:
+            spec = json.load(f)
+
+    if not isinstance(spec, dict):
+        raise Exception(f"Job spec phải là object/mapping: {file_path}")
+
+    options = {}
+    for key, value in spec.items():
+        key = key.replace("-", "_")
+        options[JOB_SPEC_ALIASES.get(key, key)] = value
+    return options
+
+
+def add_report_options(parser):
+    """Thêm các option xử lý báo cáo dùng chung cho chạy đơn và batch"""
+    parser.add_argument(
+        "--from",
+        dest="date_from",
+        metavar="YYYY-MM",
+        type=parse_month,
+        help="Tháng đầu tiên được phân bổ (YYYY-MM)",
+    )
+    parser.add_argument(
+        "--to",
+        dest="date_to",
+        metavar="YYYY-MM",
+        type=parse_month,
+        help="Tháng cuối cùng được phân bổ (YYYY-MM)",
+    )
+    parser.add_argument(
+        "--excel-engine",
+        choices=list(READER_ENGINES),
+        help="Ép dùng một engine đọc Excel (mặc định tự chọn)",
+    )
+    parser.add_argument(
+        "--writer",
+        choices=REPORT_WRITERS,
+        default=REPORT_WRITER,
+        help="Backend ghi báo cáo",
+    )
+    parser.add_argument(
+        "--write-only",
+        action="store_true",
+        help="Ghi báo cáo dạng streaming (openpyxl write_only, cần --writer openpyxl)",
+    )
+    parser.add_argument(
+        "--conditional-format",
+        dest="conditional_formatting",
+        action="store_true",
+        help="Tô màu dòng bằng conditional formatting",
+    )
+    parser.add_argument(
+        "--analytics-db",
+        metavar="SQLITE_FILE",
+        help="Nạp dữ liệu vào kho phân tích SQLite và tính metrics Summary bằng SQL",
+    )
+    parser.add_argument(
+        "--spec",
+        help="Job spec JSON/YAML, option trên command line ghi đè giá trị trong spec",
+    )
+
+
+def build_parser(batch=False):
+    """Tạo parser cho chạy đơn (mặc định) hoặc subcommand batch"""
+    if batch:
+        parser = argparse.ArgumentParser(
+            prog="main.py batch",
+            description="Tạo báo cáo cho tất cả file input trong một thư mục "
+            "(song song, project_code chỉ đọc một lần)",
+        )
+        parser.add_argument("input_dir", nargs="?", help="Thư mục chứa file input")
+        parser.add_argument(
+            "project_code_file", nargs="?", help="File project_code.xlsx dùng chung"
+        )
+        parser.add_argument(
+            "--output-dir",
+            default="backend/output",
+            help="Thư mục ghi báo cáo, log và batch_summary.json",
+        )
+        parser.add_argument(
+            "--pattern",
+            default="*.xls*",
+            help="Mẫu tên file input trong thư mục (mặc định *.xls*)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Số process xử lý song song",
+        )
+    else:
+        parser = argparse.ArgumentParser(
+            prog="main.py",
+            description="Tạo báo cáo Project Report (dùng 'main.py batch -h' "
+            "để xem chế độ batch)",
+            epilog="Ví dụ: python main.py data/input/sample_input.xls "
+            "data/input/project_code.xlsx backend/output/my_report.xlsx "
+            "--from 2025-01 --to 2025-06",
+        )
+        parser.add_argument("input_file", nargs="?", help="File Excel đầu vào")
+        parser.add_argument(
+            "project_code_file", nargs="?", help="File project_code.xlsx"
+        )
+        parser.add_argument("output_file", nargs="?", help="File báo cáo (optional)")
+        parser.add_argument(
+            "--profile",
+            action="store_true",
+            help="In số liệu đo từng bước và kết quả cProfile",
+        )
 
-            required_columns = [
-                "Username",
-                "Project Code",
-                "From Date",
-                "To Date",
-                "Member Type",
-                "Calendar Effort",
-                "Skill",
-            ]
+    add_report_options(parser)
+    return parser
 
-            missing_columns = []
-            for col in required_columns:
-                if col not in df.columns:
-                    missing_columns.append(col)
 
-            if missing_columns:
-                print(f"✖ Thiếu các cột bắt buộc: {', '.join(missing_columns)}")
-                return False
+def parse_args(argv):
+    """
+    Đọc tham số command line, giá trị trong job spec (--spec) làm mặc định
 
-            return True
+    Returns:
+        tuple: (is_batch, argparse.Namespace)
+    """
+    is_batch = bool(argv) and argv[0] == "batch"
+    if is_batch:
+        argv = argv[1:]
+    parser = build_parser(batch=is_batch)
 
+    args = parser.parse_args(argv)
+    if args.spec:
+        try:
+            spec = load_job_spec(args.spec)
         except Exception as e:
-            print(f"✖ Lỗi khi đọc file: {str(e)}")
-            return False
+            parser.error(str(e))
+
+        # Option hợp lệ là các thuộc tính của Namespace (trừ chính --spec)
+        known_options = set(vars(args)) - {"spec"}
+        unknown = sorted(set(spec) - known_options)
+        if unknown:
+            parser.error(f"Job spec có option không hợp lệ: {', '.join(unknown)}")
+
+        # argparse áp dụng type cho giá trị mặc định dạng chuỗi (from/to)
+        parser.set_defaults(
+            **{
+                key: str(value) if key in ("date_from", "date_to") else value
+                for key, value in spec.items()
+            }
+        )
+        args = parser.parse_args(argv)
 
+    # Positional có thể lấy từ job spec nên kiểm tra sau khi gộp
+    required = ["input_dir" if is_batch else "input_file", "project_code_file"]
+    missing = [name for name in required if not getattr(args, name)]
+    if missing:
+        parser.error(f"Thiếu tham số: {', '.join(missing)}")
 
-def main():
-    """Hàm main để chạy từ command line"""
+    if args.date_from and args.date_to and args.date_from > args.date_to:
+        parser.error("--from phải trước hoặc bằng --to")
 
-    if len(sys.argv) < 3:
-        print("Cách sử dụng:")
-        print(
-            "  python main.py <input_file.xls> <project_code.xlsx> [output_file.xlsx]"
-        )
-        print("\nVí dụ:")
-        print(
-            "  python main.py data/input/sample_input.xls data/input/project_code.xlsx"
+    # xlsxwriter luôn ghi streaming (constant_memory), write_only là của openpyxl
+    if args.write_only and args.writer != "openpyxl":
+        parser.error("--write-only chỉ dùng với --writer openpyxl")
+
+    return is_batch, args
+
+
+def get_date_range(args):
+    """Khoảng tháng xuất từ --from/--to (thiếu một đầu thì không giới hạn đầu đó)"""
+    if args.date_from is None and args.date_to is None:
+        return None
+    return (args.date_from or (1, 1), args.date_to or (9999, 12))
+
+
+def get_tool_options(args):
+    """Tham số khởi tạo ProjectReportTool từ command line"""
+    return {
+        "excel_engine": args.excel_engine,
+        "write_only": args.write_only,
+        "writer": args.writer,
+        "conditional_formatting": args.conditional_formatting,
+        "analytics_db": args.analytics_db,
+    }
+
+
+def get_error_message(log):
+    """Lấy dòng lỗi cuối cùng mà tool in ra (dòng bắt đầu bằng ✖)"""
+    for line in reversed(log.splitlines()):
+        if line.strip().startswith("✖"):
+            return line.strip().lstrip("✖").strip()
+    return None
+
+
+def _init_batch_worker(file_hash, df_project_code, revenue_mapping):
+    """Nạp sẵn project_code đã parse ở process cha vào cache của worker"""
+    shared_ratecard_cache.put(file_hash, df_project_code, revenue_mapping)
+
+
+def run_batch_item(
+    tool_options, input_file, project_code_file, output_file, date_range
+):
+    """
+    Tạo báo cáo cho một file input của batch (chạy trong worker process)
+
+    Log của lần chạy được ghi vào file .log cạnh file báo cáo
+
+    Returns:
+        dict: input_file, output_file, log_file, exit_code, error, wall_time
+    """
+    log_file = os.path.splitext(output_file)[0] + ".log"
+    started_at = time.perf_counter()
+    exit_code = 0
+    error = None
+
+    with open(log_file, "w", encoding="utf-8") as log:
+        with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+            try:
+                tool = ProjectReportTool(**tool_options)
+                if not tool.validate_input_file(input_file):
+                    exit_code = 1
+                else:
+                    tool.run(input_file, project_code_file, output_file, date_range)
+            except SystemExit as e:
+                # run() gọi sys.exit khi lỗi, lỗi đã được in ra log
+                exit_code = e.code if isinstance(e.code, int) else 1
+            except Exception as e:
+                print(f"✖ LỖI: {str(e)}")
+                exit_code = 1
+
+    if exit_code != 0:
+        with open(log_file, encoding="utf-8") as log:
+            error = get_error_message(log.read()) or "Xử lý thất bại"
+
+    return {
+        "input_file": input_file,
+        "output_file": output_file if exit_code == 0 else None,
+        "log_file": log_file,
+        "exit_code": exit_code,
+        "error": error,
+        "wall_time": round(time.perf_counter() - started_at, 3),
+    }
+
+
+def run_batch(args):
+    """
+    Chạy batch: mỗi file input trong thư mục là một lần chạy, song song trên
+    process pool, project_code chỉ đọc một lần ở process cha
+
+    Returns:
+        int: Exit code (0 nếu tất cả thành công, 1 nếu có file lỗi)
+    """
+    input_files = sorted(
+        path
+        for path in glob.glob(os.path.join(args.input_dir, args.pattern))
+        # Bỏ file khóa tạm của Excel (~$...)
+        if os.path.isfile(path) and not os.path.basename(path).startswith("~$")
+    )
+    if not input_files:
+        print(f"✖ Không có file input nào khớp {args.pattern} trong {args.input_dir}")
+        return 1
+
+    if not os.path.exists(args.project_code_file):
+        print(f"✖ File project_code.xlsx không tồn tại: {args.project_code_file}")
+        return 1
+
+    print("=" * 70)
+    print(f"BATCH: {len(input_files)} file, {args.workers} worker")
+    print("=" * 70)
+
+    tool_options = get_tool_options(args)
+    date_range = get_date_range(args)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    # Đọc project_code một lần, các worker nhận bản đã parse
+    tool = ProjectReportTool(**tool_options)
+    try:
+        df_project_code, revenue_mapping = tool.load_project_code_file(
+            args.project_code_file
         )
-        print(
-            "  python main.py data/input/sample_input.xls data/input/project_code.xlsx backend/output/my_report.xlsx"
+    except Exception as e:
+        print(f"✖ {str(e)}")
+        return 1
+    file_hash = tool.data_processor.ingest_cache.hash_file(args.project_code_file)
+
+    results = []
+    with ProcessPoolExecutor(
+        max_workers=max(1, min(args.workers, len(input_files))),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_batch_worker,
+        initargs=(file_hash, df_project_code, revenue_mapping),
+    ) as executor:
+        futures = {}
+        for input_file in input_files:
+            stem = os.path.splitext(os.path.basename(input_file))[0]
+            output_file = os.path.join(args.output_dir, f"{stem}_report.xlsx")
+            future = executor.submit(
+                run_batch_item,
+                tool_options,
+                input_file,
+                args.project_code_file,
+                output_file,
+                date_range,
+            )
+            futures[future] = input_file
+
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                # Worker chết bất thường (hết bộ nhớ, bị kill...)
+                result = {
+                    "input_file": futures[future],
+                    "output_file": None,
+                    "log_file": None,
+                    "exit_code": 1,
+                    "error": str(e) or type(e).__name__,
+                    "wall_time": None,
+                }
+            results.append(result)
+
+            if result["exit_code"] == 0:
+                print(
+                    f"  ✓ {result['input_file']} → {result['output_file']}"
+                    f" ({result['wall_time']}s)"
+                )
+            else:
+                print(f"  ✖ {result['input_file']}: {result['error']}")
+
+    results.sort(key=lambda result: result["input_file"])
+    failed = [result for result in results if result["exit_code"] != 0]
+
+    summary_file = os.path.join(args.output_dir, "batch_summary.json")
+    with open(summary_file, "w", encoding="utf-8") as f:
+        json.dump(
+            {"total": len(results), "failed": len(failed), "runs": results},
+            f,
+            ensure_ascii=False,
+            indent=2,
         )
-        sys.exit(1)
 
-    input_file = sys.argv[1]
-    project_code_file = sys.argv[2]
-    output_file = sys.argv[3] if len(sys.argv) > 3 else None
+    print(f"\n✓ Thành công: {len(results) - len(failed)}/{len(results)} file")
+    print(f"✓ Kết quả từng file: {summary_file}")
+    return 1 if failed else 0
+
+
+def main():
+    """Hàm main để chạy từ command line (không cần nhập tay)"""
+    is_batch, args = parse_args(sys.argv[1:])
+
+    if is_batch:
+        sys.exit(run_batch(args))
 
     # Khởi tạo tool
-    tool = ProjectReportTool()
+    tool = ProjectReportTool(**get_tool_options(args))
 
     # Validate input files
-    if not tool.validate_input_file(input_file):
+    if not tool.validate_input_file(args.input_file):
         sys.exit(1)
 
-    if not os.path.exists(project_code_file):
-        print(f"File project_code.xlsx không tồn tại: {project_code_file}")
+    if not os.path.exists(args.project_code_file):
+        print(f"File project_code.xlsx không tồn tại: {args.project_code_file}")
         sys.exit(1)
 
+    run_args = (
+        args.input_file,
+        args.project_code_file,
+        args.output_file,
+        get_date_range(args),
+    )
+
     # Chạy tool
-    tool.run(input_file, project_code_file, output_file)
+    if not args.profile:
+        tool.run(*run_args)
+        return
+
+    tracemalloc.start()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    metrics = tool.run(*run_args)
+    profiler.disable()
+    tracemalloc.stop()
+
+    print_profile(metrics, profiler, f"{metrics['output_file']}.prof")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,602 @@
+"""
+Module chạy Project Report Tool cho nhiều file input (mỗi file là một tháng)
+Các file được đọc, chuẩn hóa và nhận diện AI song song trên process pool
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from data_processor import DataProcessor, concat_aligned
+from ai_detector import AIDetector
+from main import ProjectReportTool, get_date_range, parse_month
+from excel_reader import READER_ENGINES
+from monthly_store import MonthlyStore
+from config import MULTI_FILE_MAX_WORKERS, REPORT_WRITER, REPORT_WRITERS
+
+# Số bước xử lý của MultiFileProjectReportTool.run_multi_files
+MULTI_RUN_STEPS = 4
+
+# Số bước xử lý của MultiFileProjectReportTool.run_incremental
+INCREMENTAL_RUN_STEPS = 4
+
+# Mapping Revenue của worker process, nạp một lần khi khởi tạo worker
+_worker_revenue_mapping = {}
+
+
+def _init_month_worker(revenue_mapping):
+    """Nạp sẵn mapping Revenue đã đọc ở process cha vào worker"""
+    global _worker_revenue_mapping
+    _worker_revenue_mapping = revenue_mapping
+
+
+def allocate_month(df_input, year, month, revenue_mapping):
+    """
+    Thêm Revenue, phân bổ vào đúng tháng của file và nhận diện AI
+
+    Args:
+        df_input: Các dòng input của tháng (được sửa trực tiếp)
+        year: Năm của file
+        month: Tháng của file
+        revenue_mapping: Mapping Project Code → Revenue
+
+    Returns:
+        tuple: (df_input, df_monthly) đã có Revenue, MAIL và AI Project
+    """
+    data_processor = DataProcessor()
+    ai_detector = AIDetector()
+
+    df_input = data_processor.add_revenue_to_data(df_input, revenue_mapping)
+    df_monthly = data_processor.allocate_by_month(
+        df_input, ((year, month), (year, month))
+    )
+    df_input = ai_detector.mark_ai_projects(df_input)
+    df_monthly = ai_detector.mark_ai_projects(df_monthly)
+    return df_input, df_monthly
+
+
+def process_month_file(file_path, year, month, month_label, excel_engine=None):
+    """
+    Đọc và chuẩn hóa một file input của tháng (chạy trong worker process)
+
+    Dữ liệu chỉ được phân bổ vào đúng tháng của file.
+
+    Args:
+        file_path: Đường dẫn file Excel đầu vào
+        year: Năm của file
+        month: Tháng của file
+        month_label: Nhãn tháng ghi vào cột MONTH (ví dụ "Aug 2025")
+        excel_engine: Engine đọc Excel, None để tự chọn
+
+    Returns:
+        tuple: (df_input, df_monthly) đã có Revenue, MAIL và AI Project
+    """
+    try:
+        df_input = DataProcessor(excel_engine=excel_engine).load_data(file_path)
+        df_input, df_monthly = allocate_month(
+            df_input, year, month, _worker_revenue_mapping
+        )
+    except Exception as e:
+        raise Exception(f"{os.path.basename(file_path)}: {str(e)}")
+
+    df_input.insert(0, "Month_Label", month_label)
+    return df_input, df_monthly
+
+
+class MultiFileProjectReportTool(ProjectReportTool):
+    """Class điều phối quy trình tạo báo cáo gộp từ nhiều file theo tháng"""
+
+    def __init__(
+        self, max_workers=MULTI_FILE_MAX_WORKERS, monthly_store=None, **kwargs
+    ):
+        """
+        Khởi tạo tool
+
+        Args:
+            max_workers: Số process đọc file song song (1 để đọc tuần tự
+                trong process hiện tại)
+            monthly_store: Kho dữ liệu theo tháng của run_incremental, None
+                để dùng kho mặc định (MONTHLY_STORE_DIR, chỉ tạo khi cần)
+            **kwargs: Các tùy chọn của ProjectReportTool
+        """
+        super().__init__(**kwargs)
+        self.max_workers = max_workers
+        self._monthly_store = monthly_store
+
+    @property
+    def monthly_store(self):
+        """Kho dữ liệu theo tháng, kho mặc định chỉ tạo khi run_incremental cần"""
+        if self._monthly_store is None:
+            self._monthly_store = MonthlyStore()
+        return self._monthly_store
+
+    def get_month_label(self, year, month):
+        """Nhãn tháng của file, ví dụ "Aug 2025" """
+        return f"{self.report_generator.get_month_name(month)} {year}"
+
+    def load_month_files(self, file_list, revenue_mapping):
+        """
+        Đọc, chuẩn hóa và nhận diện AI cho từng file, song song trên process
+        pool khi có nhiều file
+
+        Args:
+            file_list: Danh sách (file_path, year, month) đã sắp xếp theo tháng
+            revenue_mapping: Mapping Project Code → Revenue
+
+        Returns:
+            list: (df_input, df_monthly) theo thứ tự của file_list
+        """
+        tasks = [
+            (
+                file_path,
+                year,
+                month,
+                self.get_month_label(year, month),
+                self.data_processor.excel_engine,
+            )
+            for file_path, year, month in file_list
+        ]
+        results = [None] * len(tasks)
+
+        def on_loaded(idx):
+            df_input = results[idx][0]
+            print(f"✓ {tasks[idx][3]}: {len(df_input)} dòng ({tasks[idx][0]})")
+            self.progress.emit(
+                "load_input",
+                f"Đã đọc file {os.path.basename(tasks[idx][0])}",
+                2,
+                MULTI_RUN_STEPS,
+                len(df_input),
+            )
+
+        max_workers = max(1, min(self.max_workers, len(tasks)))
+        if max_workers == 1:
+            _init_month_worker(revenue_mapping)
+            for idx, task in enumerate(tasks):
+                results[idx] = process_month_file(*task)
+                on_loaded(idx)
+            return results
+
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_month_worker,
+            initargs=(revenue_mapping,),
+        ) as executor:
+            futures = {
+                executor.submit(process_month_file, *task): idx
+                for idx, task in enumerate(tasks)
+            }
+            for future in as_completed(futures):
+                idx = futures[future]
+                results[idx] = future.result()
+                on_loaded(idx)
+
+        return results
+
+    def print_missing_codes(self, df_input, revenue_mapping):
+        """In cảnh báo các project code không có trong file project_code.xlsx"""
+        missing_codes = [
+            pc
+            for pc in self.data_processor.get_unique_project_codes(df_input)
+            if pc not in revenue_mapping
+        ]
+        if missing_codes:
+            print(
+                "\n⚠ Cảnh báo: Các project code sau không có trong file project_code.xlsx:"
+            )
+            for pc in missing_codes:
+                print(f"  - {pc} (sẽ dùng revenue = 0)")
+
+    def write_report(
+        self,
+        df_input,
+        df_monthly,
+        available_months,
+        output_file,
+        df_project_code,
+        monthly_metrics,
+    ):
+        """
+        Tạo file báo cáo gộp (Project Report có cột MONTH và Summary)
+
+        Returns:
+            dict: output_file, rows, wall_time, cpu_time, rss_mb,
+            process_peak_rss_mb và stages
+        """
+        if output_file is None:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            output_file = f"backend/output/merged_report_{timestamp}.xlsx"
+
+        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+
+        print("\nTạo báo cáo Excel...")
+        self.report_generator.generate_report_two_sheets(
+            df_input=df_input,
+            df_monthly=df_monthly,
+            month_list=available_months,
+            output_path=output_file,
+            df_project_code=df_project_code,
+            monthly_metrics=monthly_metrics,
+        )
+
+        print(f"\n✓ Báo cáo đã được lưu tại: {output_file}")
+        self.progress.emit("done", "Hoàn thành", rows=len(df_input))
+        print(f"  - Sheet 1 (Project Report): {len(df_input)} rows")
+        print("  - Sheet 2 (Summary): Monthly metrics")
+
+        print("\n" + "=" * 70)
+        print("HOÀN THÀNH!")
+        print("=" * 70)
+
+        return {
+            "output_file": output_file,
+            "rows": len(df_input),
+            **self.progress.get_metrics(),
+        }
+
+    def run_multi_files(self, file_list, project_code_file, output_file=None):
+        """
+        Chạy toàn bộ quy trình tạo báo cáo gộp từ nhiều file
+
+        Args:
+            file_list: Danh sách (file_path, year, month), mỗi file là dữ liệu
+                của một tháng
+            project_code_file: Đường dẫn file project_code.xlsx
+            output_file: Đường dẫn file Excel đầu ra (optional)
+
+        Returns:
+            dict: output_file, rows (tổng số dòng input), wall_time, cpu_time,
+            rss_mb, process_peak_rss_mb và stages (xem
+            progress.ProgressReporter.get_metrics)
+        """
+        try:
+            self.progress.start()
+            print("=" * 70)
+            print("PROJECT REPORT TOOL - MULTI FILES")
+            print("=" * 70)
+
+            if not file_list:
+                raise Exception("Không có file input")
+            file_list = sorted(
+                (tuple(item) for item in file_list), key=lambda item: item[1:]
+            )
+
+            # 1. Đọc file project_code.xlsx (một lần cho tất cả các file)
+            print("\n[1/4] Đang đọc file project_code.xlsx...")
+            df_project_code, revenue_mapping = self.load_project_code_file(
+                project_code_file
+            )
+            self.progress.emit(
+                "load_project_code",
+                "Đã đọc file project_code.xlsx",
+                1,
+                MULTI_RUN_STEPS,
+                len(df_project_code),
+            )
+
+            # 2. Đọc, chuẩn hóa, phân bổ và nhận diện AI từng file
+            print(f"\n[2/4] Đang xử lý {len(file_list)} file đầu vào...")
+            results = self.load_month_files(file_list, revenue_mapping)
+
+            # 3. Gộp dữ liệu các tháng
+            print("\n[3/4] Đang gộp dữ liệu các tháng...")
+            df_input = concat_aligned([df for df, _ in results])
+            df_monthly = concat_aligned([df for _, df in results])
+            df_input["MAIL"] = df_input["Username"].apply(lambda x: f"{x}@fpt.com")
+            available_months = sorted({(year, month) for _, year, month in file_list})
+            self.print_missing_codes(df_input, revenue_mapping)
+            print(
+                f"✓ Input: {len(df_input)} dòng, monthly: {len(df_monthly)} dòng, "
+                f"{len(available_months)} tháng"
+            )
+            self.progress.emit(
+                "merge",
+                f"Đã gộp dữ liệu {len(available_months)} tháng",
+                3,
+                MULTI_RUN_STEPS,
+                len(df_input) + len(df_monthly),
+            )
+
+            # 4. Tính toán cho Summary sheet (từ df_monthly)
+            print("\n[4/4] Tính toán metrics cho Summary sheet...")
+            df_monthly = self.calculator.add_calculations(df_monthly)
+            monthly_metrics = self.calculator.get_monthly_metrics(
+                df_monthly, available_months
+            )
+            self.progress.emit(
+                "metrics",
+                "Đã tính metrics cho Summary sheet",
+                4,
+                MULTI_RUN_STEPS,
+                len(df_monthly),
+            )
+
+            return self.write_report(
+                df_input,
+                df_monthly,
+                available_months,
+                output_file,
+                df_project_code,
+                monthly_metrics,
+            )
+
+        except Exception as e:
+            print(f"\n✖ LỖI: {str(e)}")
+            import traceback
+
+            traceback.print_exc()
+            sys.exit(1)
+
+    def update_monthly_store(
+        self, file_list, revenue_mapping, ratecard_hash, date_range=None
+    ):
+        """
+        Cập nhật kho dữ liệu theo tháng, chỉ xử lý các tháng bị ảnh hưởng:
+        tháng có file mới/thay đổi (đọc file) và tháng trong khoảng xuất đã
+        tính với ratecard khác (tính lại từ dòng input đã lưu, không đọc Excel)
+
+        Args:
+            file_list: Danh sách (file_path, year, month) đã sắp xếp theo tháng
+            revenue_mapping: Mapping Project Code → Revenue
+            ratecard_hash: SHA-256 của file project_code.xlsx
+            date_range: Khoảng tháng xuất báo cáo hoặc None
+
+        Returns:
+            int: Số dòng input đã xử lý
+        """
+        store = self.monthly_store
+        changed = []
+        for file_path, year, month in file_list:
+            source_hash = self.data_processor.ingest_cache.hash_file(file_path)
+            if store.is_current(year, month, source_hash, ratecard_hash):
+                print(f"  {self.get_month_label(year, month)}: không thay đổi")
+            else:
+                changed.append((file_path, year, month, source_hash))
+
+        processed_rows = 0
+        results = self.load_month_files(
+            [(file_path, year, month) for file_path, year, month, _ in changed],
+            revenue_mapping,
+        )
+        for (file_path, year, month, source_hash), (df_input, df_monthly) in zip(
+            changed, results
+        ):
+            store.put_month(
+                year,
+                month,
+                df_input,
+                self.get_month_aggregates(df_monthly),
+                source_hash,
+                ratecard_hash,
+                file_path,
+            )
+            processed_rows += len(df_input)
+
+        for year, month in store.get_months(date_range):
+            entry = store.get_entry(year, month)
+            if entry["ratecard_hash"] == ratecard_hash:
+                continue
+            df_input, df_monthly = allocate_month(
+                store.load_month(year, month), year, month, revenue_mapping
+            )
+            store.put_month(
+                year,
+                month,
+                df_input,
+                self.get_month_aggregates(df_monthly),
+                entry["source_hash"],
+                ratecard_hash,
+                entry["source_file"],
+            )
+            processed_rows += len(df_input)
+            print(f"✓ {self.get_month_label(year, month)}: tính lại theo ratecard mới")
+
+        return processed_rows
+
+    def get_month_aggregates(self, df_monthly):
+        """Bảng tổng hợp theo (user, project, tháng) của dữ liệu đã phân bổ"""
+        df_monthly = self.calculator.add_calculations(df_monthly)
+        return self.calculator.aggregate_by_user_project_month(df_monthly)
+
+    def run_incremental(
+        self, file_list, project_code_file, output_file=None, date_range=None
+    ):
+        """
+        Thêm các file mới vào kho dữ liệu theo tháng rồi tạo báo cáo gộp từ
+        kho, các tháng đã có trong kho không phải đọc và xử lý lại
+
+        Args:
+            file_list: Danh sách (file_path, year, month) của các tháng mới
+                hoặc cần cập nhật (có thể rỗng để chỉ tạo lại báo cáo)
+            project_code_file: Đường dẫn file project_code.xlsx
+            output_file: Đường dẫn file Excel đầu ra (optional)
+            date_range: ((start_year, start_month), (end_year, end_month)) để
+                chỉ xuất các tháng trong khoảng (optional)
+
+        Returns:
+            dict: output_file, rows (tổng số dòng input), wall_time, cpu_time,
+            rss_mb, process_peak_rss_mb và stages (xem
+            progress.ProgressReporter.get_metrics)
+        """
+        try:
+            self.progress.start()
+            print("=" * 70)
+            print("PROJECT REPORT TOOL - INCREMENTAL")
+            print("=" * 70)
+
+            file_list = sorted(
+                (tuple(item) for item in file_list), key=lambda item: item[1:]
+            )
+
+            # 1. Đọc file project_code.xlsx
+            print("\n[1/4] Đang đọc file project_code.xlsx...")
+            df_project_code, revenue_mapping = self.load_project_code_file(
+                project_code_file
+            )
+            ratecard_hash = self.data_processor.ingest_cache.hash_file(
+                project_code_file
+            )
+            self.progress.emit(
+                "load_project_code",
+                "Đã đọc file project_code.xlsx",
+                1,
+                INCREMENTAL_RUN_STEPS,
+                len(df_project_code),
+            )
+
+            # 2. Cập nhật kho với các tháng bị ảnh hưởng
+            print(f"\n[2/4] Đang cập nhật kho dữ liệu ({len(file_list)} file)...")
+            processed_rows = self.update_monthly_store(
+                file_list, revenue_mapping, ratecard_hash, date_range
+            )
+            self.progress.emit(
+                "update_store",
+                "Đã cập nhật kho dữ liệu theo tháng",
+                2,
+                INCREMENTAL_RUN_STEPS,
+                processed_rows,
+            )
+
+            # 3. Đọc dữ liệu các tháng từ kho
+            print("\n[3/4] Đang đọc dữ liệu từ kho...")
+            available_months = self.monthly_store.get_months(date_range)
+            df_input = self.monthly_store.load(available_months, "input")
+            df_aggregates = self.monthly_store.load(available_months, "aggregates")
+            self.print_missing_codes(df_input, revenue_mapping)
+            print(
+                f"✓ Input: {len(df_input)} dòng, tổng hợp: {len(df_aggregates)} "
+                f"dòng, {len(available_months)} tháng"
+            )
+            self.progress.emit(
+                "load_store",
+                f"Đã đọc dữ liệu {len(available_months)} tháng từ kho",
+                3,
+                INCREMENTAL_RUN_STEPS,
+                len(df_input) + len(df_aggregates),
+            )
+
+            # 4. Tính metrics cho Summary sheet từ bảng tổng hợp
+            print("\n[4/4] Tính toán metrics cho Summary sheet...")
+            monthly_metrics = self.calculator.get_monthly_metrics(
+                df_aggregates, available_months
+            )
+            self.progress.emit(
+                "metrics",
+                "Đã tính metrics cho Summary sheet",
+                4,
+                INCREMENTAL_RUN_STEPS,
+                len(df_aggregates),
+            )
+
+            return self.write_report(
+                df_input,
+                df_aggregates,
+                available_months,
+                output_file,
+                df_project_code,
+                monthly_metrics,
+            )
+
+        except Exception as e:
+            print(f"\n✖ LỖI: {str(e)}")
+            import traceback
+
+            traceback.print_exc()
+            sys.exit(1)
+
+
+def parse_month_file(value):
+    """Parse tham số FILE:YYYY-MM thành (file_path, year, month)"""
+    file_path, sep, month = value.rpartition(":")
+    if not sep or not file_path:
+        raise argparse.ArgumentTypeError(
+            f"File không hợp lệ: {value} (cần dạng FILE:YYYY-MM)"
+        )
+    return (file_path, *parse_month(month))
+
+
+def main():
+    """
+    Thêm file của các tháng mới vào kho dữ liệu theo tháng và tạo báo cáo
+    gộp từ kho (chạy từ command line)
+    """
+    parser = argparse.ArgumentParser(
+        prog="main_multi_files.py",
+        description="Thêm tháng mới vào kho dữ liệu theo tháng và tạo báo cáo "
+        "gộp (các tháng đã có trong kho không xử lý lại)",
+        epilog="Ví dụ: python main_multi_files.py data/input/project_code.xlsx "
+        "backend/output/merged_report.xlsx data/input/input_t9.xls:2025-09",
+    )
+    parser.add_argument("project_code_file", help="File project_code.xlsx")
+    parser.add_argument("output_file", help="File báo cáo (.xlsx)")
+    parser.add_argument(
+        "input_files",
+        nargs="*",
+        type=parse_month_file,
+        metavar="FILE:YYYY-MM",
+        help="File input của tháng mới hoặc cần cập nhật",
+    )
+    parser.add_argument(
+        "--store",
+        help="Thư mục kho dữ liệu theo tháng (mặc định MONTHLY_STORE_DIR)",
+    )
+    parser.add_argument(
+        "--from",
+        dest="date_from",
+        metavar="YYYY-MM",
+        type=parse_month,
+        help="Tháng đầu tiên được xuất (YYYY-MM)",
+    )
+    parser.add_argument(
+        "--to",
+        dest="date_to",
+        metavar="YYYY-MM",
+        type=parse_month,
+        help="Tháng cuối cùng được xuất (YYYY-MM)",
+    )
+    parser.add_argument(
+        "--excel-engine",
+        choices=list(READER_ENGINES),
+        help="Ép dùng một engine đọc Excel (mặc định tự chọn)",
+    )
+    parser.add_argument(
+        "--writer",
+        choices=REPORT_WRITERS,
+        default=REPORT_WRITER,
+        help="Backend ghi báo cáo",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=MULTI_FILE_MAX_WORKERS,
+        help="Số process đọc file song song",
+    )
+    args = parser.parse_args()
+
+    tool = MultiFileProjectReportTool(
+        max_workers=args.workers,
+        monthly_store=MonthlyStore(args.store) if args.store else None,
+        excel_engine=args.excel_engine,
+        writer=args.writer,
+    )
+    for file_path, _, _ in args.input_files:
+        if not tool.validate_input_file(file_path):
+            sys.exit(1)
+
+    if not os.path.exists(args.project_code_file):
+        print(f"File project_code.xlsx không tồn tại: {args.project_code_file}")
+        sys.exit(1)
+
+    tool.run_incremental(
+        args.input_files,
+        args.project_code_file,
+        args.output_file,
+        get_date_range(args),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Kho dữ liệu theo tháng (Arrow IPC) để thêm tháng mới mà không xử lý lại lịch sử
+Mỗi tháng là một thư mục chứa các dòng input đã chuẩn hóa, bảng tổng hợp theo
+(user, project, tháng) và meta.json (hash file nguồn, hash ratecard)
+"""
+
+import json
+import os
+import re
+import shutil
+import tempfile
+from datetime import datetime
+
+from config import MONTHLY_STORE_DIR, MONTHLY_STORE_VERSION
+from data_processor import concat_aligned
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow là optional, thiếu thì không dùng được kho
+    pa = None
+    feather = None
+
+
+# Thư mục của một tháng, ví dụ 2025-08
+MONTH_DIR_PATTERN = re.compile(r"^(\d{4})-(\d{2})$")
+
+MONTH_TABLES = ["input", "aggregates"]
+MONTH_META_FILE = "meta.json"
+
+
+class MonthlyStore:
+    """Class lưu dữ liệu đã xử lý của từng tháng, mỗi tháng ghi độc lập"""
+
+    def __init__(self, store_dir=MONTHLY_STORE_DIR, version=MONTHLY_STORE_VERSION):
+        """
+        Khởi tạo Monthly Store
+
+        Args:
+            store_dir: Thư mục chứa dữ liệu các tháng
+            version: Phiên bản dữ liệu, tháng ghi với phiên bản khác được
+                coi như chưa có
+        """
+        self.store_dir = store_dir
+        self.version = version
+
+    @property
+    def enabled(self):
+        """Kho chỉ hoạt động khi có pyarrow"""
+        return feather is not None
+
+    def get_month_dir(self, year, month):
+        """Thư mục dữ liệu của một tháng"""
+        return os.path.join(self.store_dir, f"{int(year):04d}-{int(month):02d}")
+
+    def get_entry(self, year, month):
+        """
+        Thông tin của tháng trong kho
+
+        Returns:
+            dict: source_file, source_hash, ratecard_hash, rows, updated_at,
+            hoặc None nếu tháng chưa có (hoặc khác phiên bản)
+        """
+        meta_path = os.path.join(self.get_month_dir(year, month), MONTH_META_FILE)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if entry.get("version") != self.version:
+            return None
+        return entry
+
+    def get_months(self, date_range=None):
+        """
+        Danh sách tháng có trong kho
+
+        Args:
+            date_range: ((start_year, start_month), (end_year, end_month))
+                để giới hạn kết quả, hoặc None
+
+        Returns:
+            list: Danh sách (year, month) đã sắp xếp
+        """
+        if not os.path.isdir(self.store_dir):
+            return []
+
+        months = []
+        for name in os.listdir(self.store_dir):
+            match = MONTH_DIR_PATTERN.match(name)
+            if not match:
+                continue
+            year, month = int(match.group(1)), int(match.group(2))
+            if self.get_entry(year, month) is not None:
+                months.append((year, month))
+
+        if date_range is not None:
+            start, end = (tuple(m) for m in date_range)
+            months = [m for m in months if start <= m <= end]
+
+        return sorted(months)
+
+    def is_current(self, year, month, source_hash, ratecard_hash):
+        """Tháng đã có trong kho với cùng file nguồn và cùng ratecard"""
+        entry = self.get_entry(year, month)
+        return (
+            entry is not None
+            and entry["source_hash"] == source_hash
+            and entry["ratecard_hash"] == ratecard_hash
+        )
+
+    def put_month(
+        self,
+        year,
+        month,
+        df_input,
+        df_aggregates,
+        source_hash,
+        ratecard_hash,
+        source_file=None,
+    ):
+        """
+        Ghi (hoặc ghi đè) dữ liệu của một tháng, các tháng khác không bị đụng tới
+
+        Mỗi file được ghi ra file tạm rồi os.replace, meta.json ghi sau cùng.
+
+        Args:
+            year: Năm
+            month: Tháng
+            df_input: Các dòng input đã chuẩn hóa của tháng
+            df_aggregates: Bảng tổng hợp theo (user, project, tháng)
+            source_hash: SHA-256 của file input
+            ratecard_hash: SHA-256 của file project_code.xlsx dùng để tính
+            source_file: Tên file input (chỉ để tham khảo)
+        """
+        if not self.enabled:
+            raise Exception("Cần cài pyarrow để dùng kho dữ liệu theo tháng")
+
+        month_dir = self.get_month_dir(year, month)
+        os.makedirs(month_dir, exist_ok=True)
+
+        for name, df in zip(MONTH_TABLES, [df_input, df_aggregates]):
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            self._write_file(
+                month_dir,
+                f"{name}.arrow",
+                lambda path: feather.write_feather(
+                    table, path, compression="uncompressed"
+                ),
+            )
+
+        entry = {
+            "version": self.version,
+            "year": int(year),
+            "month": int(month),
+            "source_file": os.path.basename(source_file) if source_file else None,
+            "source_hash": source_hash,
+            "ratecard_hash": ratecard_hash,
+            "rows": len(df_input),
+            "updated_at": datetime.now().isoformat(timespec="seconds"),
+        }
+
+        def write_meta(path):
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False, indent=2)
+
+        self._write_file(month_dir, MONTH_META_FILE, write_meta)
+
+    def _write_file(self, month_dir, filename, writer):
+        """Ghi file qua file tạm rồi os.replace để không để lại file ghi dở"""
+        fd, tmp_path = tempfile.mkstemp(dir=month_dir, suffix=".tmp")
+        os.close(fd)
+        try:
+            writer(tmp_path)
+            os.replace(tmp_path, os.path.join(month_dir, filename))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def load_month(self, year, month, table="input"):
+        """
+        Đọc một bảng của tháng
+
+        Args:
+            year: Năm
+            month: Tháng
+            table: "input" hoặc "aggregates"
+
+        Returns:
+            DataFrame
+        """
+        if not self.enabled:
+            raise Exception("Cần cài pyarrow để dùng kho dữ liệu theo tháng")
+        path = os.path.join(self.get_month_dir(year, month), f"{table}.arrow")
+        return feather.read_table(path).to_pandas()
+
+    def load(self, months, table="input"):
+        """
+        Đọc và nối một bảng của nhiều tháng (category được đồng bộ)
+
+        Args:
+            months: Danh sách (year, month) theo thứ tự cần nối
+            table: "input" hoặc "aggregates"
+
+        Returns:
+            DataFrame
+        """
+        if not months:
+            raise Exception("Kho dữ liệu theo tháng chưa có tháng nào")
+        return concat_aligned(
+            [self.load_month(year, month, table) for year, month in months]
+        )
+
+    def remove_month(self, year, month):
+        """Xóa dữ liệu của một tháng khỏi kho"""
+        shutil.rmtree(self.get_month_dir(year, month), ignore_errors=True)
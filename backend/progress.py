@@ -0,0 +1,140 @@
+"""
+Sự kiện tiến độ (progress event) và số liệu đo theo từng bước của quy trình
+tạo báo cáo (wall time, CPU time, bộ nhớ, số dòng)
+Sự kiện chỉ phát ở ranh giới các bước, không phát trong vòng lặp theo dòng
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows không có module resource
+    resource = None
+
+
+def get_rss_mb():
+    """
+    Bộ nhớ RSS hiện tại của process (đọc /proc/self/statm)
+
+    Returns:
+        float (MB) hoặc None nếu hệ điều hành không hỗ trợ (chỉ có trên Linux)
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024, 1)
+
+
+def get_peak_rss_mb():
+    """
+    Bộ nhớ RSS cao nhất của process từ lúc khởi động
+
+    Worker dùng lại cho nhiều job thì giá trị này gồm cả các job trước, không
+    dùng để đo từng bước hay từng job.
+
+    Returns:
+        float (MB) hoặc None nếu hệ điều hành không hỗ trợ
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux trả về KB, macOS trả về bytes
+    if sys.platform == "darwin":
+        peak /= 1024
+    return round(peak / 1024, 1)
+
+
+class ProgressReporter:
+    """
+    Class gửi sự kiện tiến độ cho callback và ghi lại số liệu đo của từng bước
+
+    Mỗi bước tính từ sự kiện trước đó (hoặc từ start) tới sự kiện của bước.
+    rss_mb của bước là RSS lúc bước kết thúc (không phải mức cao nhất của
+    process). Bộ nhớ Python cấp phát (tracemalloc) chỉ được đo khi tracemalloc đang bật
+    (CLI --profile) vì tracemalloc làm chậm quy trình đáng kể.
+    """
+
+    def __init__(self, callback=None):
+        """
+        Khởi tạo Progress Reporter
+
+        Args:
+            callback: Hàm callback(event) nhận dict sự kiện, None để tắt
+        """
+        self.callback = callback
+        self.start()
+
+    def start(self):
+        """Bắt đầu tính thời gian và xóa số liệu đo của lần chạy trước"""
+        self.started_at = self._stage_started_at = time.perf_counter()
+        self._stage_cpu_started_at = time.process_time()
+        self.stages = []
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+
+    def emit(self, stage, message, step=None, total_steps=None, rows=None):
+        """
+        Ghi số liệu đo của bước vừa xong và gửi sự kiện tiến độ
+
+        Args:
+            stage: Mã bước (load_project_code, load_input, ..., done)
+            message: Mô tả bước vừa xong
+            step: Số thứ tự bước trong quy trình
+            total_steps: Tổng số bước
+            rows: Số dòng dữ liệu đã xử lý ở bước này
+        """
+        now = time.perf_counter()
+        cpu_now = time.process_time()
+
+        stage_metrics = {
+            "stage": stage,
+            "rows": rows,
+            "wall_time": round(now - self._stage_started_at, 4),
+            "cpu_time": round(cpu_now - self._stage_cpu_started_at, 4),
+            "rss_mb": get_rss_mb(),
+        }
+        if tracemalloc.is_tracing():
+            _, traced_peak = tracemalloc.get_traced_memory()
+            stage_metrics["traced_peak_mb"] = round(traced_peak / 1024 / 1024, 1)
+            tracemalloc.reset_peak()
+        self.stages.append(stage_metrics)
+
+        self._stage_started_at = now
+        self._stage_cpu_started_at = cpu_now
+
+        if self.callback is None:
+            return
+
+        self.callback(
+            {
+                "stage": stage,
+                "message": message,
+                "step": step,
+                "total_steps": total_steps,
+                "rows": rows,
+                "elapsed": round(now - self.started_at, 3),
+            }
+        )
+
+    def get_metrics(self):
+        """
+        Số liệu đo của lần chạy
+
+        Returns:
+            dict: wall_time, cpu_time (giây), rss_mb (RSS lớn nhất lúc kết thúc
+            các bước), process_peak_rss_mb (RSS cao nhất của process từ lúc
+            khởi động, xem get_peak_rss_mb) và list stages (số liệu từng bước)
+        """
+        stage_rss = [s["rss_mb"] for s in self.stages if s["rss_mb"] is not None]
+        return {
+            "wall_time": round(sum(s["wall_time"] for s in self.stages), 4),
+            "cpu_time": round(sum(s["cpu_time"] for s in self.stages), 4),
+            "rss_mb": max(stage_rss) if stage_rss else None,
+            "process_peak_rss_mb": get_peak_rss_mb(),
+            "stages": list(self.stages),
+        }
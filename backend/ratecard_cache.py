@@ -0,0 +1,146 @@
+"""
+Cache ratecard (project_code.xlsx) dùng chung trong process theo SHA-256 của file
+File ratecard ít thay đổi nên chỉ parse một lần, các request sau dùng lại
+"""
+
+import os
+import re
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from config import RATECARD_DIR, RATECARD_CACHE_MAX_ENTRIES
+
+RATECARD_EXTENSIONS = [".xlsx", ".xls"]
+
+# ratecard_id là SHA-256 (hex) của nội dung file
+RATECARD_ID_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+def build_revenue_mapping(df):
+    """
+    Tạo mapping {Project Code: Ratecard} từ bảng project code
+
+    Ratecard trống hoặc không phải số được tính là 0
+
+    Args:
+        df: DataFrame có cột Project Code và Ratecard
+
+    Returns:
+        dict: {Project Code: Ratecard}
+    """
+    # str() từng giá trị để Project Code trống thành "nan" như trước
+    project_codes = [str(code).strip() for code in df["Project Code"].tolist()]
+    ratecards = pd.to_numeric(df["Ratecard"], errors="coerce").fillna(0)
+    return dict(zip(project_codes, ratecards.astype(float).tolist()))
+
+
+class RatecardCache:
+    """Class giữ các ratecard đã parse (DataFrame + mapping) trong bộ nhớ"""
+
+    def __init__(
+        self, ratecard_dir=RATECARD_DIR, max_entries=RATECARD_CACHE_MAX_ENTRIES
+    ):
+        """
+        Khởi tạo Ratecard Cache
+
+        Args:
+            ratecard_dir: Thư mục lưu các file ratecard đã đăng ký
+            max_entries: Số ratecard tối đa giữ trong bộ nhớ (bỏ cái ít dùng nhất)
+        """
+        self.ratecard_dir = ratecard_dir
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, file_path, file_hash, loader):
+        """
+        Lấy ratecard từ cache, nếu chưa có thì gọi loader rồi lưu lại
+
+        Args:
+            file_path: Đường dẫn file project_code.xlsx
+            file_hash: SHA-256 nội dung file (key của cache)
+            loader: Hàm loader(file_path) trả về DataFrame đã chuẩn hóa
+
+        Returns:
+            tuple: (DataFrame, dict mapping {Project Code: Ratecard}), là bản
+            sao nên caller được phép sửa
+        """
+        with self._lock:
+            entry = self._entries.get(file_hash)
+            if entry is not None:
+                self._entries.move_to_end(file_hash)
+
+        if entry is None:
+            df = loader(file_path)
+            entry = (df, build_revenue_mapping(df))
+            self.put(file_hash, *entry)
+
+        df, revenue_mapping = entry
+        return df.copy(), dict(revenue_mapping)
+
+    def put(self, file_hash, df, revenue_mapping):
+        """
+        Đưa ratecard đã parse sẵn vào cache (ví dụ parse ở process cha rồi
+        chuyển cho các worker của batch)
+
+        Args:
+            file_hash: SHA-256 nội dung file
+            df: DataFrame đã chuẩn hóa
+            revenue_mapping: dict {Project Code: Ratecard}
+        """
+        with self._lock:
+            self._entries[file_hash] = (df, revenue_mapping)
+            self._entries.move_to_end(file_hash)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def register(self, file_path, file_hash):
+        """
+        Lưu file ratecard để các request sau chỉ cần gửi ratecard_id
+
+        Args:
+            file_path: Đường dẫn file project_code.xlsx đã upload
+            file_hash: SHA-256 nội dung file
+
+        Returns:
+            str: ratecard_id
+        """
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension not in RATECARD_EXTENSIONS:
+            raise Exception(
+                f"File ratecard phải có định dạng {', '.join(RATECARD_EXTENSIONS)}"
+            )
+
+        os.makedirs(self.ratecard_dir, exist_ok=True)
+        target_path = os.path.join(self.ratecard_dir, f"{file_hash}{extension}")
+        if not os.path.exists(target_path):
+            fd, tmp_path = tempfile.mkstemp(dir=self.ratecard_dir, suffix=".tmp")
+            os.close(fd)
+            shutil.copyfile(file_path, tmp_path)
+            os.replace(tmp_path, target_path)
+
+        return file_hash
+
+    def get_registered_path(self, ratecard_id):
+        """
+        Đường dẫn file của ratecard đã đăng ký
+
+        Returns:
+            str hoặc None nếu ratecard_id không hợp lệ/chưa đăng ký
+        """
+        if not RATECARD_ID_PATTERN.match(ratecard_id or ""):
+            return None
+
+        for extension in RATECARD_EXTENSIONS:
+            path = os.path.join(self.ratecard_dir, f"{ratecard_id}{extension}")
+            if os.path.exists(path):
+                return path
+        return None
+
+
+# Cache dùng chung cho mọi tool trong cùng process (API worker, multi mode...)
+ratecard_cache = RatecardCache()
@@ -4,29 +4,131 @@ PHIÊN BẢN CẬP NHẬT: Hỗ trợ multi-file mode với cột MONTH
 """
 
 from openpyxl import Workbook
-from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
+from openpyxl.cell import Cell
 from openpyxl.utils import get_column_letter
-from openpyxl.cell.cell import MergedCell
-from config import COLORS, NUMBER_FORMAT, INTEGER_FORMAT
+import pandas as pd
+from calculator import RevenueCalculator
+from config import NUMBER_FORMAT
+from report_styles import ReportStyles, get_member_row_role
+from progress import ProgressReporter
 
 
 class ReportGenerator:
     """Class tạo báo cáo Excel"""
 
-    def __init__(self):
+    def __init__(self, write_only=False, conditional_formatting=False):
+        """
+        Khởi tạo Report Generator
+
+        Args:
+            write_only: True để ghi workbook dạng streaming (openpyxl
+                write_only), các dòng được ghi tuần tự nên bộ nhớ không tăng
+                theo số dòng của báo cáo
+            conditional_formatting: True để tô màu dòng Internal/X-Jobs và
+                highlight AI PROJECT bằng vài rule conditional formatting
+                của sheet thay vì fill trên từng cell
+        """
         self.workbook = None
+        self.styles = None
         self.worksheet = None
         self.current_row = 1
         self.project_code_row_map = {}
         self.ratecard_col_letter = None
+        self.ratecard_map = {}
+        self.write_only = write_only
+        self.conditional_formatting = conditional_formatting
+        # Sự kiện tiến độ theo sheet (tool gán reporter có callback)
+        self.progress = ProgressReporter()
 
     def create_workbook(self):
         """Tạo workbook mới"""
-        self.workbook = Workbook()
+        self.workbook = Workbook(write_only=self.write_only)
+        # Style theo role dựng một lần cho cả workbook
+        self.styles = ReportStyles()
         # Xóa sheet mặc định để tránh thừa
         if self.workbook.active is not None:
             self.workbook.remove(self.workbook.active)
 
+    def make_cell(self, ws, value=None, role=None, number_format=None):
+        """
+        Tạo cell để ghi bằng ws.append (dùng được cho cả workbook thường và
+        write_only), style lấy từ registry theo role
+
+        Args:
+            ws: Worksheet
+            value: Giá trị của cell
+            role: Tên role trong report_styles.STYLE_ROLES
+            number_format: Định dạng số ghi đè định dạng mặc định của role
+        """
+        style_array = None
+        if role is not None:
+            style_array = self.styles.get_style_array(ws, role, number_format)
+        # Giống WriteOnlyCell, style được copy từ bản đã đăng ký
+        return Cell(ws, row=1, column=1, value=value, style_array=style_array)
+
+    def merge_cells(self, ws, start_row, start_column, end_row, end_column):
+        """Merge vùng cell (workbook write_only không có ws.merge_cells)"""
+        if self.write_only:
+            ws.merged_cells.add(
+                f"{get_column_letter(start_column)}{start_row}:"
+                f"{get_column_letter(end_column)}{end_row}"
+            )
+        else:
+            ws.merge_cells(
+                start_row=start_row,
+                start_column=start_column,
+                end_row=end_row,
+                end_column=end_column,
+            )
+
+    def get_row_role(self, member_type):
+        """Role của các cell được tô màu theo Member Type trong dòng data"""
+        if self.conditional_formatting:
+            return "data row"
+        return get_member_row_role(member_type)
+
+    def get_ai_role(self, ai_value):
+        """Role của cell AI PROJECT"""
+        if ai_value == "AI" and not self.conditional_formatting:
+            return "ai cell"
+        return "non ai cell"
+
+    def get_row_format_rules(self, has_month_label, data_start_row, data_end_row):
+        """
+        Các rule conditional formatting thay cho fill từng cell của dòng data
+
+        Returns:
+            list: (vùng áp dụng, formula điều kiện, role lấy fill/font)
+        """
+        if data_end_row < data_start_row:
+            return []
+
+        offset = 1 if has_month_label else 0
+        ai_col_letter = get_column_letter(5 + offset)
+        member_col_letter = get_column_letter(8 + offset)
+
+        def column_range(first_col, last_col):
+            return (
+                f"{get_column_letter(first_col)}{data_start_row}:"
+                f"{get_column_letter(last_col)}{data_end_row}"
+            )
+
+        # Tô màu các cột trừ AI PROJECT và REVENUE
+        row_ranges = (
+            f"{column_range(1, 4 + offset)} {column_range(7 + offset, 8 + offset)}"
+        )
+        member_cell = f"${member_col_letter}{data_start_row}"
+
+        return [
+            (row_ranges, f'{member_cell}="Internal"', "internal row"),
+            (row_ranges, f'{member_cell}<>"Internal"', "xjobs row"),
+            (
+                column_range(5 + offset, 5 + offset),
+                f'${ai_col_letter}{data_start_row}="AI"',
+                "ai cell",
+            ),
+        ]
+
     def get_month_name(self, month):
         """Chuyển số tháng thành tên viết tắt"""
         months = [
@@ -45,13 +147,13 @@ class ReportGenerator:
         ]
         return months[month - 1]
 
-    def create_project_code_sheet(self, df_project_code, all_project_codes):
-        """Tạo sheet Project_Code từ DataFrame và đảm bảo có đủ tất cả Project Codes"""
-        if self.workbook is None:
-            return
-
-        import pandas as pd
+    def prepare_project_code_table(self, df_project_code, all_project_codes):
+        """
+        Bổ sung các Project Code thiếu (Ratecard = 0) và xác định cột Ratecard
 
+        Returns:
+            tuple: (DataFrame Project_Code, vị trí cột Project Code (từ 1))
+        """
         # Lấy danh sách Project Code hiện có trong df (chuẩn hóa)
         existing_codes = set(
             df_project_code["Project Code"].astype(str).str.strip().tolist()
@@ -87,8 +189,6 @@ class ReportGenerator:
                 drop=True
             )
 
-        ws = self.workbook.create_sheet(title="Project_Code", index=0)
-
         ratecard_col_idx = None
         project_code_col_idx = None
 
@@ -101,58 +201,75 @@ class ReportGenerator:
 
         if ratecard_col_idx is None:
             self.ratecard_col_letter = "B"
+            ratecard_col_idx = 2
+
+        # Giá trị Ratecard theo Project Code (dùng làm kết quả cache của formula)
+        self.ratecard_map = {}
+        if ratecard_col_idx <= len(df_project_code.columns):
+            ratecards = pd.to_numeric(
+                df_project_code.iloc[:, ratecard_col_idx - 1], errors="coerce"
+            ).fillna(0)
+            self.ratecard_map = dict(
+                zip(
+                    df_project_code["Project Code"].astype(str).str.strip(),
+                    ratecards.tolist(),
+                )
+            )
 
-        header_fill = PatternFill(
-            start_color=COLORS["fixed_header"],
-            end_color=COLORS["fixed_header"],
-            fill_type="solid",
-        )
-        header_font = Font(bold=True, size=11, color="FFFFFF")
-        center_align = Alignment(horizontal="center", vertical="center")
-        thin_border = Border(
-            left=Side(style="thin"),
-            right=Side(style="thin"),
-            top=Side(style="thin"),
-            bottom=Side(style="thin"),
+        return df_project_code, project_code_col_idx
+
+    def get_project_code_column_width(self, column_name):
+        """Độ rộng cột trong sheet Project_Code"""
+        if column_name == "Project Code":
+            return 25
+        elif column_name == "Ratecard":
+            return 15
+        return 20
+
+    def create_project_code_sheet(self, df_project_code, all_project_codes):
+        """Tạo sheet Project_Code từ DataFrame và đảm bảo có đủ tất cả Project Codes"""
+        if self.workbook is None:
+            return
+
+        df_project_code, project_code_col_idx = self.prepare_project_code_table(
+            df_project_code, all_project_codes
         )
 
+        ws = self.workbook.create_sheet(title="Project_Code", index=0)
+
+        # Độ rộng cột phải set trước khi ghi dòng (write_only)
         for col_idx, column_name in enumerate(df_project_code.columns, start=1):
-            cell = ws.cell(row=1, column=col_idx)
-            if not isinstance(cell, MergedCell):
-                cell.value = column_name
-                cell.fill = header_fill
-                cell.font = header_font
-                cell.alignment = center_align
-                cell.border = thin_border
+            col_letter = get_column_letter(col_idx)
+            ws.column_dimensions[col_letter].width = self.get_project_code_column_width(
+                column_name
+            )
+
+        ws.append(
+            [
+                self.make_cell(ws, column_name, role="header")
+                for column_name in df_project_code.columns
+            ]
+        )
+
+        column_roles = [
+            "ratecard cell" if column_name == "Ratecard" else "project code cell"
+            for column_name in df_project_code.columns
+        ]
 
         self.project_code_row_map = {}
 
         for row_idx, row_data in enumerate(
             df_project_code.itertuples(index=False), start=2
         ):
-            for col_idx, value in enumerate(row_data, start=1):
-                cell = ws.cell(row=row_idx, column=col_idx)
-                if not isinstance(cell, MergedCell):
-                    cell.value = value
-                    cell.border = thin_border
-
-                    column_name = df_project_code.columns[col_idx - 1]
-                    if column_name == "Ratecard":
-                        cell.number_format = NUMBER_FORMAT
-
-            project_code = str(
-                ws.cell(row=row_idx, column=project_code_col_idx).value
-            ).strip()
-            self.project_code_row_map[project_code] = row_idx
+            ws.append(
+                [
+                    self.make_cell(ws, value, role=role)
+                    for value, role in zip(row_data, column_roles)
+                ]
+            )
 
-        for col_idx, column_name in enumerate(df_project_code.columns, start=1):
-            col_letter = get_column_letter(col_idx)
-            if column_name == "Project Code":
-                ws.column_dimensions[col_letter].width = 25
-            elif column_name == "Ratecard":
-                ws.column_dimensions[col_letter].width = 15
-            else:
-                ws.column_dimensions[col_letter].width = 20
+            project_code = str(row_data[project_code_col_idx - 1]).strip()
+            self.project_code_row_map[project_code] = row_idx
 
     def get_revenue_formula(self, project_code):
         """Tạo Excel formula để reference đến Ratecard"""
@@ -162,13 +279,84 @@ class ReportGenerator:
         else:
             return 0
 
+    def get_revenue_value(self, project_code):
+        """Giá trị của formula REVENUE (Ratecard của Project Code)"""
+        if project_code in self.project_code_row_map and self.ratecard_col_letter:
+            return self.ratecard_map.get(project_code, 0)
+        else:
+            return 0
+
+    def get_revenue_formulas(self, project_codes):
+        """REVENUE formula cho cả cột Project Code (mỗi code chỉ tạo một lần)"""
+        formulas = {
+            code: self.get_revenue_formula(code) for code in self.project_code_row_map
+        }
+        return [formulas.get(code, 0) for code in project_codes]
+
+    def get_revenue_values(self, project_codes):
+        """Giá trị REVENUE cho cả cột Project Code"""
+        values = {
+            code: self.get_revenue_value(code) for code in self.project_code_row_map
+        }
+        return [values.get(code, 0) for code in project_codes]
+
+    def get_project_report_columns(self, df_input, has_month_label):
+        """
+        Lấy dữ liệu các cột của sheet Project Report một lần (không duyệt
+        DataFrame theo từng dòng)
+
+        Returns:
+            list: Giá trị của từng cột theo thứ tự header, cột REVENUE là
+            formula tham chiếu Ratecard
+        """
+
+        def column(name, default=""):
+            if name in df_input.columns:
+                return df_input[name].astype(object).tolist()
+            return [default] * len(df_input)
+
+        project_codes = column("Project Code")
+
+        columns = [list(range(1, len(df_input) + 1))]  # NO
+        if has_month_label:
+            columns.append(column("Month_Label"))
+        columns += [
+            column("Username"),
+            column("MAIL"),
+            project_codes,
+            column("AI Project"),
+            self.get_revenue_formulas(project_codes),
+            column("Calendar Effort", 0),
+            column("Member Type", "Internal"),
+        ]
+        return columns
+
+    def get_project_report_roles(self, row_role, ai_role, has_month_label):
+        """Role của từng cell trong một dòng data của Project Report"""
+        roles = [row_role]  # NO
+        if has_month_label:
+            roles.append(f"{row_role} month")
+        # Tô màu các cột (trừ AI PROJECT và REVENUE)
+        roles += [f"{row_role} text"] * 3  # ACCOUNT, MAIL, PROJECT CODE
+        roles += [ai_role, "revenue cell", f"{row_role} effort", row_role]
+        return roles
+
     def generate_report_two_sheets(
-        self, df_input, df_monthly, month_list, output_path, df_project_code=None
+        self,
+        df_input,
+        df_monthly,
+        month_list,
+        output_path,
+        df_project_code=None,
+        monthly_metrics=None,
     ):
         """
         Tạo báo cáo 2 sheets:
         1. Project Report: records gốc
         2. Summary: Metrics theo tháng (allocate)
+
+        monthly_metrics: bảng metrics đã tính sẵn
+        (RevenueCalculator.get_monthly_metrics), None để tự tính
         """
         self.create_workbook()
 
@@ -184,18 +372,30 @@ class ReportGenerator:
         # 1. Tạo sheet Project_Code (với tất cả project codes)
         if df_project_code is not None:
             self.create_project_code_sheet(df_project_code, all_project_codes)
+            self.progress.emit(
+                "project_code_sheet",
+                "Đã tạo sheet Project_Code",
+                rows=len(df_project_code),
+            )
 
         # 2. Tạo sheet Project Report (records gốc)
         print("  Tạo sheet Project Report...")
         self._create_project_report_sheet(df_input, df_project_code)
+        self.progress.emit(
+            "project_report_sheet", "Đã tạo sheet Project Report", rows=len(df_input)
+        )
 
         # 3. Tạo sheet Summary (metrics theo tháng)
         print("  Tạo sheet Summary...")
-        self._create_summary_sheet(df_monthly, month_list)
+        self._create_summary_sheet(df_monthly, month_list, monthly_metrics)
+        self.progress.emit(
+            "summary_sheet", "Đã tạo sheet Summary", rows=len(month_list)
+        )
 
         # 4. Lưu file
         if self.workbook is not None:
             self.workbook.save(output_path)
+            self.progress.emit("save", "Đã lưu file báo cáo")
             print(f"✓ Báo cáo đã được tạo: {output_path}")
         else:
             print("✗ Không thể lưu file")
@@ -208,30 +408,6 @@ class ReportGenerator:
 
         ws = self.workbook.create_sheet(title="Project Report", index=1)
 
-        header_fill = PatternFill(
-            start_color=COLORS["fixed_header"],
-            end_color=COLORS["fixed_header"],
-            fill_type="solid",
-        )
-        header_font = Font(bold=True, size=12, color="FFFFFF")
-        center_align = Alignment(horizontal="center", vertical="center")
-        left_align = Alignment(horizontal="left", vertical="center")
-        right_align = Alignment(horizontal="right", vertical="center")
-
-        thin_border = Border(
-            left=Side(style="thin"),
-            right=Side(style="thin"),
-            top=Side(style="thin"),
-            bottom=Side(style="thin"),
-        )
-
-        thick_border = Border(
-            left=Side(style="medium"),
-            right=Side(style="medium"),
-            top=Side(style="medium"),
-            bottom=Side(style="medium"),
-        )
-
         # Kiểm tra xem có cột Month_Label không (multi-file mode)
         has_month_label = "Month_Label" in df_input.columns
 
@@ -259,280 +435,16 @@ class ReportGenerator:
                 "MEMBER TYPE",
             ]
 
-        # Header row với style đẹp hơn
-        for col_idx, header in enumerate(headers, start=1):
-            cell = ws.cell(row=1, column=col_idx)
-            cell.value = header
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = center_align
-            cell.border = thick_border
-
         data_start_row = 2
-
-        # Thêm data rows với alternating colors
-        for row_idx, (_, row) in enumerate(df_input.iterrows(), start=data_start_row):
-            current_col = 1
-
-            # NO
-            cell = ws.cell(row=row_idx, column=current_col)
-            cell.value = row_idx - 1
-            cell.alignment = center_align
-            cell.border = thin_border
-            current_col += 1
-
-            # MONTH (nếu có)
-            if has_month_label:
-                cell = ws.cell(row=row_idx, column=current_col)
-                cell.value = row.get("Month_Label", "")
-                cell.alignment = center_align
-                cell.border = thin_border
-                cell.font = Font(bold=True, size=10)
-                month_col = current_col
-                current_col += 1
-
-            # ACCOUNT
-            cell = ws.cell(row=row_idx, column=current_col)
-            cell.value = row.get("Username", "")
-            cell.alignment = left_align
-            cell.border = thin_border
-            current_col += 1
-
-            # MAIL
-            cell = ws.cell(row=row_idx, column=current_col)
-            cell.value = row.get("MAIL", "")
-            cell.alignment = left_align
-            cell.border = thin_border
-            current_col += 1
-
-            # PROJECT CODE
-            cell = ws.cell(row=row_idx, column=current_col)
-            cell.value = row.get("Project Code", "")
-            cell.alignment = left_align
-            cell.border = thin_border
-            current_col += 1
-
-            # AI PROJECT
-            cell = ws.cell(row=row_idx, column=current_col)
-            ai_value = row.get("AI Project", "")
-            cell.value = ai_value
-            cell.alignment = center_align
-            cell.border = thin_border
-
-            # Highlight AI projects
-            if ai_value == "AI":
-                cell.fill = PatternFill(
-                    start_color=COLORS["ai_project"],
-                    end_color=COLORS["ai_project"],
-                    fill_type="solid",
-                )
-                cell.font = Font(bold=True, color="FF6B35")
-
-            ai_col = current_col
-            current_col += 1
-
-            # REVENUE
-            cell = ws.cell(row=row_idx, column=current_col)
-            project_code = row.get("Project Code", "")
-            revenue_formula = self.get_revenue_formula(project_code)
-            if isinstance(revenue_formula, str) and revenue_formula.startswith("="):
-                cell.value = revenue_formula
-            else:
-                cell.value = revenue_formula
-            cell.number_format = INTEGER_FORMAT
-            cell.alignment = right_align
-            cell.border = thin_border
-            revenue_col = current_col
-            current_col += 1
-
-            # CALENDAR EFFORT
-            cell = ws.cell(row=row_idx, column=current_col)
-            cell.value = row.get("Calendar Effort", 0)
-            cell.number_format = NUMBER_FORMAT
-            cell.alignment = right_align
-            cell.border = thin_border
-            effort_col = current_col
-            current_col += 1
-
-            # MEMBER TYPE
-            member_type = row.get("Member Type", "Internal")
-            cell = ws.cell(row=row_idx, column=current_col)
-            cell.value = member_type
-            cell.alignment = center_align
-            cell.border = thin_border
-            member_col = current_col
-
-            # Row coloring based on member type
-            color = COLORS["internal"] if member_type == "Internal" else COLORS["xjobs"]
-            fill = PatternFill(start_color=color, end_color=color, fill_type="solid")
-
-            # Tô màu các cột (trừ AI PROJECT và REVENUE)
-            for col in range(1, current_col + 1):
-                if col not in [ai_col, revenue_col]:
-                    ws.cell(row=row_idx, column=col).fill = fill
-
         data_end_row = data_start_row + len(df_input) - 1
 
-        # === TẠO BẢNG TOTAL SUMMARY ĐẸP ===
+        # === BẢNG TOTAL SUMMARY (nằm bên phải, cùng các dòng với data) ===
         summary_start_col = (
             11 if has_month_label else 10
         )  # Dịch sang phải nếu có cột MONTH
         summary_start_row = 1
 
-        # Title header cho bảng summary
-        title_fill = PatternFill(
-            start_color="1F4E78",  # Navy blue
-            end_color="1F4E78",
-            fill_type="solid",
-        )
-        title_font = Font(bold=True, size=14, color="FFFFFF")
-
-        ws.cell(row=summary_start_row, column=summary_start_col).value = (
-            "📊 TOTAL SUMMARY"
-        )
-        ws.cell(row=summary_start_row, column=summary_start_col).fill = title_fill
-        ws.cell(row=summary_start_row, column=summary_start_col).font = title_font
-        ws.cell(row=summary_start_row, column=summary_start_col).alignment = (
-            center_align
-        )
-        ws.cell(row=summary_start_row, column=summary_start_col).border = thick_border
-        ws.merge_cells(
-            start_row=summary_start_row,
-            start_column=summary_start_col,
-            end_row=summary_start_row,
-            end_column=summary_start_col + 1,
-        )
-
-        summary_row = summary_start_row + 1
-
-        # Style cho summary rows
-        label_fill = PatternFill(
-            start_color="D9E1F2",  # Light blue
-            end_color="D9E1F2",
-            fill_type="solid",
-        )
-        label_font = Font(bold=True, size=11, color="1F4E78")
-
-        value_fill = PatternFill(
-            start_color="FFFFFF",
-            end_color="FFFFFF",
-            fill_type="solid",
-        )
-        value_font = Font(bold=True, size=11, color="000000")
-
-        # Xác định column letters dựa trên có MONTH hay không
-        revenue_col_letter = get_column_letter(7 if has_month_label else 6)
-        ai_col_letter = get_column_letter(6 if has_month_label else 5)
-        effort_col_letter = get_column_letter(8 if has_month_label else 7)
-        member_col_letter = get_column_letter(9 if has_month_label else 8)
-
-        # Total Revenue
-        ws.cell(row=summary_row, column=summary_start_col).value = "💰 Total Revenue"
-        ws.cell(row=summary_row, column=summary_start_col).fill = label_fill
-        ws.cell(row=summary_row, column=summary_start_col).font = label_font
-        ws.cell(row=summary_row, column=summary_start_col).alignment = left_align
-        ws.cell(row=summary_row, column=summary_start_col).border = thin_border
-
-        cell = ws.cell(row=summary_row, column=summary_start_col + 1)
-        cell.value = f"=SUM({revenue_col_letter}{data_start_row}:{revenue_col_letter}{data_end_row})"
-        cell.number_format = "#,##0"
-        cell.fill = value_fill
-        cell.font = value_font
-        cell.alignment = right_align
-        cell.border = thin_border
-
-        summary_row += 1
-
-        # Total AI Revenue
-        ws.cell(row=summary_row, column=summary_start_col).value = "🤖 Total AI Revenue"
-        ws.cell(row=summary_row, column=summary_start_col).fill = label_fill
-        ws.cell(row=summary_row, column=summary_start_col).font = label_font
-        ws.cell(row=summary_row, column=summary_start_col).alignment = left_align
-        ws.cell(row=summary_row, column=summary_start_col).border = thin_border
-
-        cell = ws.cell(row=summary_row, column=summary_start_col + 1)
-        cell.value = f'=SUMIF({ai_col_letter}{data_start_row}:{ai_col_letter}{data_end_row},"AI",{revenue_col_letter}{data_start_row}:{revenue_col_letter}{data_end_row})'
-        cell.number_format = "#,##0"
-        cell.fill = value_fill
-        cell.font = value_font
-        cell.alignment = right_align
-        cell.border = thin_border
-
-        summary_row += 1
-
-        # Total Effort
-        ws.cell(row=summary_row, column=summary_start_col).value = "⏱️ Total Effort"
-        ws.cell(row=summary_row, column=summary_start_col).fill = label_fill
-        ws.cell(row=summary_row, column=summary_start_col).font = label_font
-        ws.cell(row=summary_row, column=summary_start_col).alignment = left_align
-        ws.cell(row=summary_row, column=summary_start_col).border = thin_border
-
-        cell = ws.cell(row=summary_row, column=summary_start_col + 1)
-        cell.value = f"=SUM({effort_col_letter}{data_start_row}:{effort_col_letter}{data_end_row})"
-        cell.number_format = NUMBER_FORMAT
-        cell.fill = value_fill
-        cell.font = value_font
-        cell.alignment = right_align
-        cell.border = thin_border
-
-        summary_row += 1
-
-        # Separator line
-        summary_row += 1
-
-        # Total Internal Member
-        ws.cell(row=summary_row, column=summary_start_col).value = "👥 Internal Members"
-        ws.cell(row=summary_row, column=summary_start_col).fill = label_fill
-        ws.cell(row=summary_row, column=summary_start_col).font = label_font
-        ws.cell(row=summary_row, column=summary_start_col).alignment = left_align
-        ws.cell(row=summary_row, column=summary_start_col).border = thin_border
-
-        cell = ws.cell(row=summary_row, column=summary_start_col + 1)
-        cell.value = f'=COUNTIF({member_col_letter}{data_start_row}:{member_col_letter}{data_end_row},"Internal")'
-        cell.fill = value_fill
-        cell.font = value_font
-        cell.alignment = right_align
-        cell.border = thin_border
-
-        summary_row += 1
-
-        # Total X-Jobs Member
-        ws.cell(row=summary_row, column=summary_start_col).value = "🔧 X-Jobs Members"
-        ws.cell(row=summary_row, column=summary_start_col).fill = label_fill
-        ws.cell(row=summary_row, column=summary_start_col).font = label_font
-        ws.cell(row=summary_row, column=summary_start_col).alignment = left_align
-        ws.cell(row=summary_row, column=summary_start_col).border = thin_border
-
-        cell = ws.cell(row=summary_row, column=summary_start_col + 1)
-        cell.value = f'=COUNTIF({member_col_letter}{data_start_row}:{member_col_letter}{data_end_row},"X-Jobs")'
-        cell.fill = value_fill
-        cell.font = value_font
-        cell.alignment = right_align
-        cell.border = thin_border
-
-        summary_row += 1
-
-        # Total Members
-        ws.cell(row=summary_row, column=summary_start_col).value = "📈 Total Members"
-        ws.cell(row=summary_row, column=summary_start_col).fill = PatternFill(
-            start_color="B4C7E7", end_color="B4C7E7", fill_type="solid"
-        )
-        ws.cell(row=summary_row, column=summary_start_col).font = Font(
-            bold=True, size=11, color="1F4E78"
-        )
-        ws.cell(row=summary_row, column=summary_start_col).alignment = left_align
-        ws.cell(row=summary_row, column=summary_start_col).border = thick_border
-
-        cell = ws.cell(row=summary_row, column=summary_start_col + 1)
-        cell.value = f"=COUNTA({member_col_letter}{data_start_row}:{member_col_letter}{data_end_row})"
-        cell.fill = PatternFill(
-            start_color="B4C7E7", end_color="B4C7E7", fill_type="solid"
-        )
-        cell.font = Font(bold=True, size=11, color="1F4E78")
-        cell.alignment = right_align
-        cell.border = thick_border
-
-        # Set column widths
+        # Set column widths (trước khi ghi dòng để dùng được với write_only)
         ws.column_dimensions["A"].width = 6
 
         if has_month_label:
@@ -561,207 +473,321 @@ class ReportGenerator:
         # Freeze panes
         ws.freeze_panes = "A2"
 
-    def _create_summary_sheet(self, df_monthly, month_list):
-        """Tạo sheet Summary với metrics theo tháng dùng Excel formulas"""
-
-        if self.workbook is None:
-            return
-
-        ws = self.workbook.create_sheet(title="Summary", index=2)
-
-        header_fill = PatternFill(
-            start_color=COLORS["fixed_header"],
-            end_color=COLORS["fixed_header"],
-            fill_type="solid",
+        summary_rows = self._build_total_summary_rows(
+            ws,
+            has_month_label,
+            data_start_row,
+            data_end_row,
+            summary_start_row,
         )
-        header_font = Font(bold=True, size=11, color="FFFFFF")
-        center_align = Alignment(horizontal="center", vertical="center")
 
-        section_fill = PatternFill(
-            start_color=COLORS["header_month"],
-            end_color=COLORS["header_month"],
-            fill_type="solid",
+        # Header row với style đẹp hơn
+        header_cells = [
+            self.make_cell(ws, header, role="report header") for header in headers
+        ]
+        ws.append(
+            self._with_summary_cells(
+                header_cells, summary_rows, summary_start_row, summary_start_col
+            )
         )
 
-        thin_border = Border(
-            left=Side(style="thin"),
-            right=Side(style="thin"),
-            top=Side(style="thin"),
-            bottom=Side(style="thin"),
-        )
+        # Lấy dữ liệu theo cột một lần rồi ghi từng dòng
+        columns = self.get_project_report_columns(df_input, has_month_label)
+        ai_col_idx = headers.index("AI PROJECT")
+        row_roles = {}
 
-        current_row = 1
+        # Thêm data rows với alternating colors
+        for row_idx, values in enumerate(zip(*columns), start=data_start_row):
+            # Row coloring based on member type, highlight AI projects
+            key = (self.get_row_role(values[-1]), self.get_ai_role(values[ai_col_idx]))
+            if key not in row_roles:
+                row_roles[key] = self.get_project_report_roles(*key, has_month_label)
+
+            row_cells = [
+                self.make_cell(ws, value, role=role)
+                for value, role in zip(values, row_roles[key])
+            ]
 
-        # Header row
-        headers = ["Metrics"] + [f"{self.get_month_name(m)} {y}" for y, m in month_list]
-        for col_idx, header in enumerate(headers, start=1):
-            cell = ws.cell(row=current_row, column=col_idx)
-            cell.value = header
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = center_align
-            cell.border = thin_border
+            ws.append(
+                self._with_summary_cells(
+                    row_cells, summary_rows, row_idx, summary_start_col
+                )
+            )
 
-        current_row += 1
+        # Bảng summary dài hơn data (ít dòng) thì ghi nốt các dòng còn lại
+        for row_idx in range(data_end_row + 1, max(summary_rows) + 1):
+            ws.append(
+                self._with_summary_cells([], summary_rows, row_idx, summary_start_col)
+            )
 
-        # Lưu vị trí các row cho việc tính toán
-        total_revenue_row = current_row
-        ai_revenue_row = current_row + 1
-        actual_member_row = current_row + 2
-        actual_member_ai_row = current_row + 3
-        productivity_row = current_row + 4
-        productivity_ai_row = current_row + 5
-        xjob_member_row = current_row + 6
-        bmm_row = current_row + 7
-
-        # === TOTAL REVENUE ===
-        ws.cell(row=current_row, column=1).value = "Total Revenue"
-        ws.cell(row=current_row, column=1).fill = section_fill
-        ws.cell(row=current_row, column=1).font = Font(bold=True)
-        ws.cell(row=current_row, column=1).border = thin_border
-
-        for col_idx, (year, month) in enumerate(month_list, start=2):
-            cell = ws.cell(row=current_row, column=col_idx)
-            mask = (df_monthly["Year"] == year) & (df_monthly["Month"] == month)
-            month_data = df_monthly[mask]
-
-            if not month_data.empty:
-                revenue = month_data["REVxEFF"].sum()
-                cell.value = revenue
-                cell.number_format = NUMBER_FORMAT
-                cell.border = thin_border
+        if self.conditional_formatting:
+            for cell_range, formula, role in self.get_row_format_rules(
+                has_month_label, data_start_row, data_end_row
+            ):
+                ws.conditional_formatting.add(
+                    cell_range, self.styles.get_formula_rule(formula, role)
+                )
 
-        current_row += 1
+        self.merge_cells(
+            ws,
+            start_row=summary_start_row,
+            start_column=summary_start_col,
+            end_row=summary_start_row,
+            end_column=summary_start_col + 1,
+        )
 
-        # === AI REVENUE ===
-        ws.cell(row=current_row, column=1).value = "AI Revenue"
-        ws.cell(row=current_row, column=1).fill = section_fill
-        ws.cell(row=current_row, column=1).font = Font(bold=True)
-        ws.cell(row=current_row, column=1).border = thin_border
-
-        for col_idx, (year, month) in enumerate(month_list, start=2):
-            mask = (
-                (df_monthly["Year"] == year)
-                & (df_monthly["Month"] == month)
-                & (df_monthly["AI Project"] == "AI")
-            )
-            month_data = df_monthly[mask]
+    def _with_summary_cells(self, row_cells, summary_rows, row_idx, summary_start_col):
+        """Ghép các cell của bảng Total Summary vào cuối dòng data"""
+        cells = summary_rows.get(row_idx)
+        if cells is None:
+            return row_cells
+        padding = [None] * (summary_start_col - 1 - len(row_cells))
+        return row_cells + padding + cells
 
-            if not month_data.empty:
-                ai_revenue = month_data["REVxEFF"].sum()
-                cell = ws.cell(row=current_row, column=col_idx)
-                cell.value = ai_revenue
-                cell.number_format = NUMBER_FORMAT
-                cell.border = thin_border
+    def get_total_summary_items(self, has_month_label, data_start_row, data_end_row):
+        """
+        Nội dung bảng TOTAL SUMMARY (dưới dòng title)
 
-        current_row += 1
+        Returns:
+            list: (nhãn, formula, number format, là dòng tổng) cho từng dòng,
+            None là dòng phân cách
+        """
+        # Xác định column letters dựa trên có MONTH hay không
+        revenue_col_letter = get_column_letter(7 if has_month_label else 6)
+        ai_col_letter = get_column_letter(6 if has_month_label else 5)
+        effort_col_letter = get_column_letter(8 if has_month_label else 7)
+        member_col_letter = get_column_letter(9 if has_month_label else 8)
 
-        # === ACTUAL MEMBER ===
-        ws.cell(row=current_row, column=1).value = "Actual Member"
-        ws.cell(row=current_row, column=1).fill = section_fill
-        ws.cell(row=current_row, column=1).font = Font(bold=True)
-        ws.cell(row=current_row, column=1).border = thin_border
+        revenue_range = (
+            f"{revenue_col_letter}{data_start_row}:{revenue_col_letter}{data_end_row}"
+        )
+        ai_range = f"{ai_col_letter}{data_start_row}:{ai_col_letter}{data_end_row}"
+        effort_range = (
+            f"{effort_col_letter}{data_start_row}:{effort_col_letter}{data_end_row}"
+        )
+        member_range = (
+            f"{member_col_letter}{data_start_row}:{member_col_letter}{data_end_row}"
+        )
 
-        for col_idx, (year, month) in enumerate(month_list, start=2):
-            mask = (df_monthly["Year"] == year) & (df_monthly["Month"] == month)
-            month_data = df_monthly[mask]
-            count = month_data["Username"].nunique()
+        return [
+            ("💰 Total Revenue", f"=SUM({revenue_range})", "#,##0", False),
+            (
+                "🤖 Total AI Revenue",
+                f'=SUMIF({ai_range},"AI",{revenue_range})',
+                "#,##0",
+                False,
+            ),
+            ("⏱️ Total Effort", f"=SUM({effort_range})", NUMBER_FORMAT, False),
+            None,
+            (
+                "👥 Internal Members",
+                f'=COUNTIF({member_range},"Internal")',
+                None,
+                False,
+            ),
+            ("🔧 X-Jobs Members", f'=COUNTIF({member_range},"X-Jobs")', None, False),
+            ("📈 Total Members", f"=COUNTA({member_range})", None, True),
+        ]
 
-            cell = ws.cell(row=current_row, column=col_idx)
-            cell.value = count
-            cell.border = thin_border
+    def get_total_summary_values(self, df_input):
+        """
+        Kết quả của các formula trong bảng TOTAL SUMMARY, cùng thứ tự với
+        get_total_summary_items (None ở dòng phân cách)
+        """
+        revenue = pd.Series(
+            self.get_revenue_values(df_input.get("Project Code", [])),
+            index=df_input.index,
+            dtype="float64",
+        )
+        ai_mask = df_input.get("AI Project", pd.Series(index=df_input.index))
+        ai_mask = ai_mask.astype(object) == "AI"
+        effort = pd.to_numeric(
+            df_input.get("Calendar Effort", pd.Series(index=df_input.index)),
+            errors="coerce",
+        )
+        member_types = df_input.get("Member Type", pd.Series(index=df_input.index))
+        member_types = member_types.astype(object)
+
+        return [
+            float(revenue.sum()),
+            float(revenue[ai_mask].sum()),
+            float(effort.sum()),
+            None,
+            int((member_types == "Internal").sum()),
+            int((member_types == "X-Jobs").sum()),
+            int((member_types.notna() & (member_types != "")).sum()),
+        ]
 
-        current_row += 1
+    def _build_total_summary_rows(
+        self,
+        ws,
+        has_month_label,
+        data_start_row,
+        data_end_row,
+        summary_start_row,
+    ):
+        """
+        Tạo các cell của bảng TOTAL SUMMARY
 
-        # === ACTUAL MEMBER (AI) ===
-        ws.cell(row=current_row, column=1).value = "Actual Member (AI)"
-        ws.cell(row=current_row, column=1).fill = section_fill
-        ws.cell(row=current_row, column=1).font = Font(bold=True)
-        ws.cell(row=current_row, column=1).border = thin_border
-
-        for col_idx, (year, month) in enumerate(month_list, start=2):
-            mask = (
-                (df_monthly["Year"] == year)
-                & (df_monthly["Month"] == month)
-                & (df_monthly["AI Project"] == "AI")
-            )
-            month_data = df_monthly[mask]
-            count = month_data["Username"].nunique()
+        Returns:
+            dict: {row_idx: [cell nhãn, cell giá trị]}
+        """
+        summary_rows = {}
 
-            cell = ws.cell(row=current_row, column=col_idx)
-            cell.value = count
-            cell.border = thin_border
+        # Title header cho bảng summary
+        summary_rows[summary_start_row] = [
+            self.make_cell(ws, "📊 TOTAL SUMMARY", role="summary title"),
+            self.make_cell(ws, role="summary title merged"),
+        ]
 
-        current_row += 1
+        summary_row = summary_start_row + 1
 
-        # === PRODUCTIVITY (dùng formula tham chiếu đến các row trên) ===
-        ws.cell(row=current_row, column=1).value = "Productivity"
-        ws.cell(row=current_row, column=1).fill = section_fill
-        ws.cell(row=current_row, column=1).font = Font(bold=True)
-        ws.cell(row=current_row, column=1).border = thin_border
+        summary_items = self.get_total_summary_items(
+            has_month_label, data_start_row, data_end_row
+        )
 
-        for col_idx in range(2, len(month_list) + 2):
-            col_letter = get_column_letter(col_idx)
-            cell = ws.cell(row=current_row, column=col_idx)
-            # Productivity = Total Revenue / Actual Member
-            cell.value = f"=IF({col_letter}{actual_member_row}=0,0,{col_letter}{total_revenue_row}/{col_letter}{actual_member_row})"
-            cell.number_format = NUMBER_FORMAT
-            cell.border = thin_border
+        for item in summary_items:
+            if item is not None:
+                label, formula, number_format, is_total = item
+                # Total Members (dòng cuối) dùng style riêng
+                role = "summary total" if is_total else "summary"
+                summary_rows[summary_row] = [
+                    self.make_cell(ws, label, role=f"{role} label"),
+                    self.make_cell(
+                        ws, formula, role=f"{role} value", number_format=number_format
+                    ),
+                ]
+            summary_row += 1
+
+        return summary_rows
+
+    def get_summary_rows(self, metrics, month_count, first_row):
+        """
+        Nội dung các dòng metrics của sheet Summary
 
-        current_row += 1
+        Args:
+            metrics: Bảng tháng × metric (RevenueCalculator.get_monthly_metrics)
+            month_count: Số cột tháng
+            first_row: Dòng Excel của metric đầu tiên (Total Revenue)
 
-        # === PRODUCTIVITY (AI) (dùng formula) ===
-        ws.cell(row=current_row, column=1).value = "Productivity (AI)"
-        ws.cell(row=current_row, column=1).fill = section_fill
-        ws.cell(row=current_row, column=1).font = Font(bold=True)
-        ws.cell(row=current_row, column=1).border = thin_border
+        Returns:
+            list: (nhãn, giá trị hoặc formula theo từng tháng, number format)
+        """
+        # Lưu vị trí các row cho việc tính toán
+        total_revenue_row = first_row
+        ai_revenue_row = first_row + 1
+        actual_member_row = first_row + 2
+        actual_member_ai_row = first_row + 3
+
+        col_letters = [get_column_letter(idx) for idx in range(2, month_count + 2)]
+
+        def formulas(template):
+            """Formula tham chiếu đến các row trên cùng cột"""
+            return [template.format(c=col_letter) for col_letter in col_letters]
+
+        return [
+            # === TOTAL REVENUE ===
+            ("Total Revenue", list(metrics["Total Revenue"]), NUMBER_FORMAT),
+            # === AI REVENUE ===
+            ("AI Revenue", list(metrics["AI Revenue"]), NUMBER_FORMAT),
+            # === ACTUAL MEMBER ===
+            ("Actual Member", list(metrics["Actual Member"]), None),
+            # === ACTUAL MEMBER (AI) ===
+            ("Actual Member (AI)", list(metrics["Actual Member (AI)"]), None),
+            # === PRODUCTIVITY = Total Revenue / Actual Member ===
+            (
+                "Productivity",
+                formulas(
+                    f"=IF({{c}}{actual_member_row}=0,0,"
+                    f"{{c}}{total_revenue_row}/{{c}}{actual_member_row})"
+                ),
+                NUMBER_FORMAT,
+            ),
+            # === PRODUCTIVITY (AI) = AI Revenue / Actual Member (AI) ===
+            (
+                "Productivity (AI)",
+                formulas(
+                    f"=IF({{c}}{actual_member_ai_row}=0,0,"
+                    f"{{c}}{ai_revenue_row}/{{c}}{actual_member_ai_row})"
+                ),
+                NUMBER_FORMAT,
+            ),
+            # === X-JOB MEMBER ===
+            ("X-Job Member", list(metrics["X-Job Member"]), None),
+            # === BMM = Actual Member (giống nhau vì đã count unique) ===
+            ("BMM", formulas(f"={{c}}{actual_member_row}"), None),
+        ]
 
-        for col_idx in range(2, len(month_list) + 2):
-            col_letter = get_column_letter(col_idx)
-            cell = ws.cell(row=current_row, column=col_idx)
-            # Productivity AI = AI Revenue / Actual Member (AI)
-            cell.value = f"=IF({col_letter}{actual_member_ai_row}=0,0,{col_letter}{ai_revenue_row}/{col_letter}{actual_member_ai_row})"
-            cell.number_format = NUMBER_FORMAT
-            cell.border = thin_border
+    def get_summary_row_values(self, metrics):
+        """
+        Giá trị của các dòng sheet Summary, cùng thứ tự với get_summary_rows
+        (dòng formula là kết quả tính sẵn của formula, ô trống tính là 0)
+        """
+        total_revenue = metrics["Total Revenue"].fillna(0)
+        ai_revenue = metrics["AI Revenue"].fillna(0)
+        actual_member = metrics["Actual Member"]
+        actual_member_ai = metrics["Actual Member (AI)"]
+
+        def productivity(revenue, members):
+            return [
+                0 if member == 0 else value / member
+                for value, member in zip(revenue, members)
+            ]
 
-        current_row += 1
+        return [
+            list(metrics["Total Revenue"]),
+            list(metrics["AI Revenue"]),
+            list(actual_member),
+            list(actual_member_ai),
+            productivity(total_revenue, actual_member),
+            productivity(ai_revenue, actual_member_ai),
+            list(metrics["X-Job Member"]),
+            list(actual_member),
+        ]
 
-        # === X-JOB MEMBER ===
-        ws.cell(row=current_row, column=1).value = "X-Job Member"
-        ws.cell(row=current_row, column=1).fill = section_fill
-        ws.cell(row=current_row, column=1).font = Font(bold=True)
-        ws.cell(row=current_row, column=1).border = thin_border
-
-        for col_idx, (year, month) in enumerate(month_list, start=2):
-            mask = (
-                (df_monthly["Year"] == year)
-                & (df_monthly["Month"] == month)
-                & (df_monthly["Member Type"] == "X-Jobs")
-            )
-            month_data = df_monthly[mask]
-            count = month_data["Username"].nunique()
+    def _create_summary_sheet(self, df_monthly, month_list, metrics=None):
+        """
+        Tạo sheet Summary với metrics theo tháng dùng Excel formulas
 
-            cell = ws.cell(row=current_row, column=col_idx)
-            cell.value = count
-            cell.border = thin_border
+        metrics là bảng tháng × metric từ RevenueCalculator.get_monthly_metrics,
+        nếu không truyền vào sẽ được tính từ df_monthly.
+        """
 
-        current_row += 1
+        if self.workbook is None:
+            return
 
-        # === BMM (dùng formula tham chiếu) ===
-        ws.cell(row=current_row, column=1).value = "BMM"
-        ws.cell(row=current_row, column=1).fill = section_fill
-        ws.cell(row=current_row, column=1).font = Font(bold=True)
-        ws.cell(row=current_row, column=1).border = thin_border
+        if metrics is None:
+            metrics = RevenueCalculator().get_monthly_metrics(df_monthly, month_list)
 
-        for col_idx in range(2, len(month_list) + 2):
-            col_letter = get_column_letter(col_idx)
-            cell = ws.cell(row=current_row, column=col_idx)
-            # BMM = Actual Member (giống nhau vì đã count unique)
-            cell.value = f"={col_letter}{actual_member_row}"
-            cell.border = thin_border
+        ws = self.workbook.create_sheet(title="Summary", index=2)
 
-        # Set column widths
+        # Set column widths (trước khi ghi dòng để dùng được với write_only)
         ws.column_dimensions["A"].width = 25
         for col_idx in range(2, len(month_list) + 2):
             col_letter = get_column_letter(col_idx)
             ws.column_dimensions[col_letter].width = 15
+
+        current_row = 1
+
+        # Header row
+        headers = ["Metrics"] + [f"{self.get_month_name(m)} {y}" for y, m in month_list]
+        ws.append([self.make_cell(ws, header, role="header") for header in headers])
+
+        current_row += 1
+
+        for label, values, number_format in self.get_summary_rows(
+            metrics, len(month_list), current_row
+        ):
+            label_cell = self.make_cell(ws, label, role="metric label")
+            # Revenue NaN (tháng không có dữ liệu) thì để trống
+            value_cells = [
+                (
+                    self.make_cell(
+                        ws, value, role="metric value", number_format=number_format
+                    )
+                    if pd.notna(value)
+                    else None
+                )
+                for value in values
+            ]
+            ws.append([label_cell] + value_cells)
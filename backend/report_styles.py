@@ -0,0 +1,248 @@
+"""
+Bảng style theo vai trò (role) dùng chung cho mọi sheet của báo cáo
+Mỗi workbook chỉ tạo style một lần, các cell chỉ tham chiếu tới role
+"""
+
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.formatting.rule import FormulaRule
+from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
+from config import COLORS, NUMBER_FORMAT, INTEGER_FORMAT
+
+# Định nghĩa style theo role:
+#   fill: màu nền, font: thuộc tính Font, align: căn ngang (căn dọc luôn giữa),
+#   border: "thin"/"medium" cho cả 4 cạnh hoặc dict {cạnh: kiểu},
+#   number_format: định dạng số mặc định của role
+STYLE_ROLES = {
+    # Header các sheet
+    "header": {
+        "fill": COLORS["fixed_header"],
+        "font": {"bold": True, "size": 11, "color": "FFFFFF"},
+        "align": "center",
+        "border": "thin",
+    },
+    "report header": {
+        "fill": COLORS["fixed_header"],
+        "font": {"bold": True, "size": 12, "color": "FFFFFF"},
+        "align": "center",
+        "border": "medium",
+    },
+    # Sheet Project_Code
+    "project code cell": {"border": "thin"},
+    "ratecard cell": {"border": "thin", "number_format": NUMBER_FORMAT},
+    # Dòng data của Project Report theo Member Type
+    "internal row": {"fill": COLORS["internal"], "align": "center", "border": "thin"},
+    "internal row text": {
+        "fill": COLORS["internal"],
+        "align": "left",
+        "border": "thin",
+    },
+    "internal row month": {
+        "fill": COLORS["internal"],
+        "font": {"bold": True, "size": 10},
+        "align": "center",
+        "border": "thin",
+    },
+    "internal row effort": {
+        "fill": COLORS["internal"],
+        "align": "right",
+        "border": "thin",
+        "number_format": NUMBER_FORMAT,
+    },
+    # Dòng data không tô màu (màu do conditional formatting của sheet)
+    "data row": {"align": "center", "border": "thin"},
+    "data row text": {"align": "left", "border": "thin"},
+    "data row month": {
+        "font": {"bold": True, "size": 10},
+        "align": "center",
+        "border": "thin",
+    },
+    "data row effort": {
+        "align": "right",
+        "border": "thin",
+        "number_format": NUMBER_FORMAT,
+    },
+    "xjobs row": {"fill": COLORS["xjobs"], "align": "center", "border": "thin"},
+    "xjobs row text": {"fill": COLORS["xjobs"], "align": "left", "border": "thin"},
+    "xjobs row month": {
+        "fill": COLORS["xjobs"],
+        "font": {"bold": True, "size": 10},
+        "align": "center",
+        "border": "thin",
+    },
+    "xjobs row effort": {
+        "fill": COLORS["xjobs"],
+        "align": "right",
+        "border": "thin",
+        "number_format": NUMBER_FORMAT,
+    },
+    "ai cell": {
+        "fill": COLORS["ai_project"],
+        "font": {"bold": True, "color": "FF6B35"},
+        "align": "center",
+        "border": "thin",
+    },
+    "non ai cell": {"align": "center", "border": "thin"},
+    "revenue cell": {
+        "align": "right",
+        "border": "thin",
+        "number_format": INTEGER_FORMAT,
+    },
+    # Bảng TOTAL SUMMARY
+    "summary title": {
+        "fill": "1F4E78",  # Navy blue
+        "font": {"bold": True, "size": 14, "color": "FFFFFF"},
+        "align": "center",
+        "border": "medium",
+    },
+    # Cell thứ hai bị merge vào title, giữ viền ngoài giống khi merge
+    "summary title merged": {
+        "border": {"right": "medium", "top": "medium", "bottom": "medium"}
+    },
+    "summary label": {
+        "fill": "D9E1F2",  # Light blue
+        "font": {"bold": True, "size": 11, "color": "1F4E78"},
+        "align": "left",
+        "border": "thin",
+    },
+    "summary value": {
+        "fill": "FFFFFF",
+        "font": {"bold": True, "size": 11, "color": "000000"},
+        "align": "right",
+        "border": "thin",
+    },
+    "summary total label": {
+        "fill": "B4C7E7",
+        "font": {"bold": True, "size": 11, "color": "1F4E78"},
+        "align": "left",
+        "border": "medium",
+    },
+    "summary total value": {
+        "fill": "B4C7E7",
+        "font": {"bold": True, "size": 11, "color": "1F4E78"},
+        "align": "right",
+        "border": "medium",
+    },
+    # Sheet Summary
+    "metric label": {
+        "fill": COLORS["header_month"],
+        "font": {"bold": True},
+        "border": "thin",
+    },
+    "metric value": {"border": "thin"},
+}
+
+BORDER_SIDES = ["left", "right", "top", "bottom"]
+
+
+def get_border_sides(border):
+    """
+    Chuẩn hóa khai báo border của role thành {cạnh: kiểu}
+
+    Args:
+        border: "thin"/"medium" cho cả 4 cạnh hoặc dict {cạnh: kiểu}
+
+    Returns:
+        dict: {cạnh: kiểu viền}
+    """
+    if border is None:
+        return {}
+    if isinstance(border, str):
+        return {side: border for side in BORDER_SIDES}
+    return dict(border)
+
+
+def get_member_row_role(member_type):
+    """Role của dòng data theo Member Type"""
+    return "internal row" if member_type == "Internal" else "xjobs row"
+
+
+class ReportStyles:
+    """Registry style của một workbook openpyxl, mỗi role chỉ dựng một lần"""
+
+    def __init__(self, roles=STYLE_ROLES):
+        """
+        Khởi tạo registry, dựng sẵn Fill/Font/Alignment/Border cho mọi role
+
+        Args:
+            roles: Bảng định nghĩa style theo role
+        """
+        self.roles = {}
+        for role, spec in roles.items():
+            self.roles[role] = self._build_role(spec)
+
+        # Style đã gắn vào workbook theo (role, number format)
+        self._style_arrays = {}
+
+    def _build_role(self, spec):
+        """Dựng các object style openpyxl cho một role"""
+        style = {"number_format": spec.get("number_format")}
+
+        if "fill" in spec:
+            style["fill"] = PatternFill(
+                start_color=spec["fill"], end_color=spec["fill"], fill_type="solid"
+            )
+        if "font" in spec:
+            style["font"] = Font(**spec["font"])
+        if "align" in spec:
+            style["alignment"] = Alignment(horizontal=spec["align"], vertical="center")
+        if "border" in spec:
+            style["border"] = Border(
+                **{
+                    side: Side(style=kind)
+                    for side, kind in get_border_sides(spec["border"]).items()
+                }
+            )
+
+        return style
+
+    def get_style_array(self, ws, role, number_format=None):
+        """
+        Lấy style (đã đăng ký vào workbook) của role
+
+        Lần đầu dùng một (role, number format) thì style được đăng ký vào
+        workbook, các lần sau chỉ trả lại chỉ số style đã đăng ký.
+
+        Args:
+            ws: Worksheet thuộc workbook của registry
+            role: Tên role trong STYLE_ROLES
+            number_format: Định dạng số ghi đè định dạng mặc định của role
+
+        Returns:
+            StyleArray dùng cho Cell(style_array=...)
+        """
+        key = (role, number_format)
+        style_array = self._style_arrays.get(key)
+
+        if style_array is None:
+            if role not in self.roles:
+                raise Exception(f"Không có style cho role '{role}'")
+            style = self.roles[role]
+            cell = WriteOnlyCell(ws)
+            for attribute in ["fill", "font", "alignment", "border"]:
+                if attribute in style:
+                    setattr(cell, attribute, style[attribute])
+            if number_format is None:
+                number_format = style["number_format"]
+            if number_format is not None:
+                cell.number_format = number_format
+            style_array = self._style_arrays[key] = cell._style
+
+        return style_array
+
+    def get_formula_rule(self, formula, role):
+        """
+        Tạo rule conditional formatting dùng fill và font của role
+
+        Args:
+            formula: Công thức điều kiện (không có dấu "=")
+            role: Tên role trong STYLE_ROLES
+
+        Returns:
+            Rule openpyxl
+        """
+        if role not in self.roles:
+            raise Exception(f"Không có style cho role '{role}'")
+        style = self.roles[role]
+        return FormulaRule(
+            formula=[formula], fill=style.get("fill"), font=style.get("font")
+        )
@@ -0,0 +1,143 @@
+"""
+Cache kết quả báo cáo theo nội dung (SHA-256 của file upload + tùy chọn xử lý)
+Báo cáo trùng yêu cầu được trả lại ngay, thư mục outputs bị giới hạn dung lượng/TTL
+"""
+
+import hashlib
+import json
+import os
+import time
+
+from config import (
+    REPORT_WRITER,
+    RESULT_CACHE_MAX_BYTES,
+    RESULT_CACHE_TTL_SECONDS,
+    RESULT_CACHE_VERSION,
+)
+
+REPORT_FILE_EXTENSION = ".xlsx"
+
+
+def _remove(path):
+    """Xóa file, bỏ qua nếu request khác đã xóa trước"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class ResultCache:
+    """Class quản lý các báo cáo đã tạo trong thư mục outputs"""
+
+    def __init__(
+        self,
+        output_dir,
+        max_bytes=RESULT_CACHE_MAX_BYTES,
+        ttl_seconds=RESULT_CACHE_TTL_SECONDS,
+        version=RESULT_CACHE_VERSION,
+    ):
+        """
+        Khởi tạo Result Cache
+
+        Args:
+            output_dir: Thư mục chứa báo cáo
+            max_bytes: Tổng dung lượng tối đa, vượt quá sẽ xóa báo cáo ít dùng nhất
+            ttl_seconds: Báo cáo không được dùng quá thời gian này sẽ bị xóa
+            version: Phiên bản báo cáo, đổi giá trị để bỏ kết quả cũ
+        """
+        self.output_dir = output_dir
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.version = version
+
+    def make_key(self, uploads, options=None):
+        """
+        Tính key của yêu cầu từ nội dung file upload và tùy chọn xử lý
+
+        Args:
+            uploads: List (vai trò, stream hoặc đường dẫn file) theo đúng thứ
+                tự xử lý, stream được đọc hết rồi tua lại đầu để lưu file sau đó
+            options: Tùy chọn ảnh hưởng tới báo cáo (phải serialize được JSON)
+
+        Returns:
+            str: Chuỗi hex digest
+        """
+        digest = hashlib.sha256()
+        digest.update(
+            json.dumps(
+                {
+                    "version": self.version,
+                    "writer": REPORT_WRITER,
+                    "options": options or {},
+                },
+                sort_keys=True,
+            ).encode("utf-8")
+        )
+
+        for role, source in uploads:
+            digest.update(f"\0{role}\0".encode("utf-8"))
+            if isinstance(source, str):
+                with open(source, "rb") as stream:
+                    digest.update(self._hash_stream(stream))
+            else:
+                digest.update(self._hash_stream(source))
+                source.seek(0)
+
+        return digest.hexdigest()
+
+    def _hash_stream(self, stream):
+        """SHA-256 (bytes) phần còn lại của stream"""
+        file_digest = hashlib.sha256()
+        for chunk in iter(lambda: stream.read(1024 * 1024), b""):
+            file_digest.update(chunk)
+        return file_digest.digest()
+
+    def get_output_filename(self, prefix, key):
+        """Tên file báo cáo cho key (cùng yêu cầu thì cùng tên file)"""
+        return f"{prefix}_{key[:32]}{REPORT_FILE_EXTENSION}"
+
+    def lookup(self, output_filename):
+        """
+        Kiểm tra báo cáo đã có sẵn chưa (còn hạn TTL)
+
+        Returns:
+            bool: True nếu dùng lại được báo cáo
+        """
+        path = os.path.join(self.output_dir, output_filename)
+        if not os.path.exists(path):
+            return False
+
+        if time.time() - os.stat(path).st_mtime > self.ttl_seconds:
+            _remove(path)
+            return False
+
+        # Đánh dấu vừa được dùng (cho TTL và LRU)
+        os.utime(path)
+        return True
+
+    def evict(self):
+        """Xóa báo cáo hết hạn TTL, sau đó xóa báo cáo ít dùng nhất tới dưới max_bytes"""
+        if not os.path.isdir(self.output_dir):
+            return
+
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.output_dir):
+            if not name.endswith(REPORT_FILE_EXTENSION):
+                continue
+            path = os.path.join(self.output_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if now - stat.st_mtime > self.ttl_seconds:
+                _remove(path)
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            _remove(path)
+            total_bytes -= size
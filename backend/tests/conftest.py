@@ -0,0 +1,58 @@
+"""
+Cấu hình pytest: các module của backend import phẳng (from config import ...)
+nên thêm thư mục backend vào sys.path
+"""
+
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+UPLOADS_DIR = os.path.join(BACKEND_DIR, "uploads")
+SAMPLE_INPUTS = ["input_t8.xls", "input_t9.xls"]
+
+
+@pytest.fixture(params=SAMPLE_INPUTS)
+def sample_input(request):
+    """Đường dẫn các file input mẫu trong uploads"""
+    return os.path.join(UPLOADS_DIR, request.param)
+
+
+@pytest.fixture
+def project_code_file():
+    """Đường dẫn file project_code.xlsx mẫu"""
+    return os.path.join(UPLOADS_DIR, "project_code.xlsx")
+
+
+@pytest.fixture
+def monthly_data(sample_input, project_code_file, tmp_path):
+    """
+    Dữ liệu monthly của file input mẫu như ProjectReportTool.run tạo ra
+    trước bước add_calculations
+
+    Returns:
+        tuple: (df_input, df_monthly, danh sách (year, month))
+    """
+    from ingest_cache import IngestCache
+    from main import ProjectReportTool
+    from ratecard_cache import RatecardCache
+
+    tool = ProjectReportTool(
+        ratecard_cache=RatecardCache(ratecard_dir=str(tmp_path / "ratecards"))
+    )
+    processor = tool.data_processor
+    processor.ingest_cache = IngestCache(cache_dir=str(tmp_path / "ingest"))
+
+    _, revenue_mapping = tool.load_project_code_file(project_code_file)
+    df_input = processor.add_revenue_to_data(
+        processor.load_data(sample_input), revenue_mapping
+    )
+    months = processor.get_available_months(df_input)
+    df_monthly = tool.ai_detector.mark_ai_projects(
+        processor.allocate_by_month(df_input)
+    )
+    df_input = tool.ai_detector.mark_ai_projects(df_input)
+    return df_input, df_monthly, months
@@ -0,0 +1,43 @@
+"""
+Metrics Summary tính bằng SQL (AnalyticsStore) so với RevenueCalculator
+"""
+
+import pandas as pd
+
+from analytics_store import AnalyticsStore
+from calculator import RevenueCalculator
+
+
+def test_sql_metrics_match_calculator(monthly_data, tmp_path):
+    df_input, df_monthly, months = monthly_data
+    df_monthly = RevenueCalculator().add_calculations(df_monthly)
+    store = AnalyticsStore(str(tmp_path / "analytics.sqlite3"))
+    store.load_source("input", None, "ratecard", df_input, df_monthly)
+    # Nạp thêm file khác để kiểm tra lọc theo file nguồn
+    store.load_source("other", None, "ratecard", df_input, df_monthly)
+    month_list = [(2000, 1)] + months
+
+    result = store.get_monthly_metrics(month_list, ["input"])
+    expected = RevenueCalculator().get_monthly_metrics(df_monthly, month_list)
+
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_sql_metrics_without_months(tmp_path):
+    store = AnalyticsStore(str(tmp_path / "analytics.sqlite3"))
+    # Input không có ngày hợp lệ: không có tháng và không có dòng monthly
+    df_monthly = pd.DataFrame(
+        {
+            "Year": pd.Series(dtype="int64"),
+            "Month": pd.Series(dtype="int64"),
+            "REVxEFF": pd.Series(dtype="float64"),
+            "Username": pd.Series(dtype=object),
+            "AI Project": pd.Series(dtype=object),
+            "Member Type": pd.Series(dtype=object),
+        }
+    )
+
+    result = store.get_monthly_metrics([])
+    expected = RevenueCalculator().get_monthly_metrics(df_monthly, [])
+
+    pd.testing.assert_frame_equal(result, expected)
@@ -0,0 +1,121 @@
+"""
+Đối chiếu RevenueCalculator (vectorized) với cách tính từng dòng trước đây
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from calculator import RevenueCalculator
+
+
+def reference_calculations(df):
+    """REVxEFF/AI-REV tính từng dòng bằng round() như trước khi vectorize"""
+    calculator = RevenueCalculator()
+    rev_eff = [
+        calculator.calculate_rev_eff(revenue, effort)
+        for revenue, effort in zip(df["Revenue"], df["Calendar Effort"])
+    ]
+    ai_rev = [
+        calculator.calculate_ai_rev(revenue, effort, is_ai == "AI")
+        for revenue, effort, is_ai in zip(
+            df["Revenue"], df["Calendar Effort"], df["AI Project"]
+        )
+    ]
+    return np.array(rev_eff, dtype="float64"), np.array(ai_rev, dtype="float64")
+
+
+def assert_same_calculations(df):
+    expected_rev_eff, expected_ai_rev = reference_calculations(df)
+
+    result = RevenueCalculator().add_calculations(df.copy())
+
+    np.testing.assert_array_equal(result["REVxEFF"].to_numpy(), expected_rev_eff)
+    np.testing.assert_array_equal(result["AI-REV"].to_numpy(), expected_ai_rev)
+
+
+def test_add_calculations_matches_row_round_on_samples(monthly_data):
+    _, df_monthly, _ = monthly_data
+
+    assert_same_calculations(df_monthly)
+
+
+@pytest.mark.parametrize(
+    "revenue, effort",
+    [(3733, 0.975), (4003, 0.125), (1001, 0.005), (2.675, 1.0), (1.005, 1.0)],
+)
+def test_add_calculations_near_half(revenue, effort):
+    # Các giá trị mà np.round lệch 0.01 so với round()
+    df = pd.DataFrame(
+        {"Revenue": [revenue], "Calendar Effort": [effort], "AI Project": ["AI"]}
+    )
+
+    assert_same_calculations(df)
+
+
+def test_add_calculations_matches_row_round_on_grid():
+    revenues = np.arange(1000, 6000, 7, dtype="float64")
+    efforts = np.arange(1, 41) / 40
+    revenue, effort = (values.ravel() for values in np.meshgrid(revenues, efforts))
+    df = pd.DataFrame(
+        {
+            "Revenue": revenue,
+            "Calendar Effort": effort,
+            "AI Project": np.where(np.arange(len(revenue)) % 3, "Non-AI", "AI"),
+        }
+    )
+
+    assert_same_calculations(df)
+
+
+def test_add_calculations_invalid_and_missing_values():
+    df = pd.DataFrame(
+        {
+            # Revenue lấy từ map ratecard: project thiếu là NaN (không có None)
+            "Revenue": [100.0, np.nan, "abc", 200.0, np.nan],
+            "Calendar Effort": ["x", 0.5, 0.5, np.nan, 1.0],
+            "AI Project": ["AI", "AI", "Non-AI", "AI", "AI"],
+        }
+    )
+
+    assert_same_calculations(df)
+
+
+def reference_monthly_metrics(df, month_list):
+    """Metrics Summary tính theo từng tháng như _create_summary_sheet trước đây"""
+    rows = []
+    for year, month in month_list:
+        month_data = df[(df["Year"] == year) & (df["Month"] == month)]
+        ai_data = month_data[month_data["AI Project"] == "AI"]
+        xjobs_data = month_data[month_data["Member Type"] == "X-Jobs"]
+        rows.append(
+            {
+                "Total Revenue": (
+                    np.nan if month_data.empty else month_data["REVxEFF"].sum()
+                ),
+                "AI Revenue": np.nan if ai_data.empty else ai_data["REVxEFF"].sum(),
+                "Actual Member": month_data["Username"].nunique(),
+                "Actual Member (AI)": ai_data["Username"].nunique(),
+                "X-Job Member": xjobs_data["Username"].nunique(),
+            }
+        )
+    return pd.DataFrame(
+        rows,
+        index=pd.MultiIndex.from_tuples(month_list, names=["Year", "Month"]),
+    )
+
+
+def test_monthly_metrics_match_per_month_logic(monthly_data):
+    _, df_monthly, months = monthly_data
+    df_monthly = RevenueCalculator().add_calculations(df_monthly)
+    # Thêm tháng không có dữ liệu: revenue để trống, số member là 0
+    month_list = [(2000, 1)] + months + [(2099, 12)]
+
+    result = RevenueCalculator().get_monthly_metrics(df_monthly, month_list)
+    expected = reference_monthly_metrics(df_monthly, month_list)
+
+    assert (df_monthly["AI Project"] == "AI").any()
+    assert (df_monthly["Member Type"] == "X-Jobs").any()
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+    assert result.loc[(2000, 1)].isna()[["Total Revenue", "AI Revenue"]].all()
+    assert (result.loc[(2099, 12), "Actual Member":] == 0).all()
@@ -0,0 +1,111 @@
+"""
+Đối chiếu allocate_by_month (vectorized) với allocate_by_month_reference
+(vòng lặp từng dòng)
+"""
+
+import pandas as pd
+import pytest
+
+from data_processor import DataProcessor
+
+
+def make_input(rows):
+    """DataFrame input từ list (from_date, to_date, effort)"""
+    return pd.DataFrame(
+        {
+            "Username": [f"user{i}" for i in range(len(rows))],
+            "Project Code": pd.Categorical([f"PC{i % 2}" for i in range(len(rows))]),
+            "From Date": pd.to_datetime([row[0] for row in rows]),
+            "To Date": pd.to_datetime([row[1] for row in rows]),
+            "Member Type": ["Internal", "Xjobs", None, "X-Jobs"][: len(rows)]
+            + ["Internal"] * max(0, len(rows) - 4),
+            "Calendar Effort": [row[2] for row in rows],
+            "Skill": ["AI"] * len(rows),
+            "Revenue": [100.0] * len(rows),
+        }
+    )
+
+
+def normalize(df):
+    """Bỏ khác biệt dtype (category/int) để so sánh giá trị"""
+    return df.astype(object).reset_index(drop=True)
+
+
+def assert_same_allocation(df, date_range=None):
+    processor = DataProcessor()
+    actual = processor.allocate_by_month(df.copy(), date_range)
+    expected = processor.allocate_by_month_reference(df.copy())
+    if date_range is not None:
+        (start_year, start_month), (end_year, end_month) = date_range
+        expected = processor.filter_by_date_range(
+            expected, start_year, start_month, end_year, end_month
+        )
+
+    assert list(actual.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(normalize(actual), normalize(expected))
+    return actual
+
+
+def test_sample_inputs_match_reference(sample_input):
+    processor = DataProcessor()
+    df = processor._read_input_file(sample_input)
+    df["Revenue"] = 1.0
+
+    actual = assert_same_allocation(df)
+    assert len(actual) > len(df)
+
+
+def test_missing_dates_produce_no_rows():
+    df = make_input(
+        [
+            (None, "2025-03-31", 1.0),
+            ("2025-01-01", None, 1.0),
+            ("2025-01-15", "2025-02-10", 0.5),
+        ]
+    )
+    actual = assert_same_allocation(df)
+    assert actual["Username"].tolist() == ["user2", "user2"]
+
+
+def test_to_date_before_from_date_produces_no_rows():
+    df = make_input(
+        [("2025-05-01", "2025-03-31", 1.0), ("2025-03-01", "2025-03-31", 1.0)]
+    )
+    actual = assert_same_allocation(df)
+    assert actual["Username"].tolist() == ["user1"]
+
+
+def test_one_month_span():
+    df = make_input([("2025-07-03", "2025-07-28", 0.75)])
+    actual = assert_same_allocation(df)
+    assert actual[["Year", "Month", "Calendar Effort"]].values.tolist() == [
+        [2025, 7, 0.75]
+    ]
+
+
+def test_span_across_year_end():
+    df = make_input([("2024-11-20", "2025-02-01", 1.0)])
+    actual = assert_same_allocation(df)
+    assert list(zip(actual["Year"], actual["Month"])) == [
+        (2024, 11),
+        (2024, 12),
+        (2025, 1),
+        (2025, 2),
+    ]
+
+
+@pytest.mark.parametrize(
+    "date_range",
+    [((2025, 2), (2025, 4)), ((2024, 12), (2025, 1)), ((2026, 1), (2026, 12))],
+)
+def test_date_range_clip_matches_filtered_reference(date_range):
+    df = make_input(
+        [
+            ("2024-11-01", "2025-06-30", 1.0),
+            ("2025-03-01", "2025-03-31", 0.5),
+            ("2025-04-15", "2025-09-30", 0.2),
+        ]
+    )
+    actual = assert_same_allocation(df, date_range)
+    start, end = date_range
+    assert all(start <= month <= end for month in zip(actual["Year"], actual["Month"]))
@@ -0,0 +1,64 @@
+"""
+Đọc file đầu vào theo INPUT_SCHEMA
+"""
+
+import pandas as pd
+import pytest
+
+from config import INPUT_SCHEMA
+from excel_reader import (
+    READER_ENGINES,
+    apply_schema,
+    get_available_engines,
+    read_excel_schema,
+)
+from ingest_cache import IngestCache
+from main import ProjectReportTool
+from ratecard_cache import RatecardCache
+
+
+def test_apply_schema_coerces_bad_numeric_cells():
+    df = pd.DataFrame({"Calendar Effort": [1.5, "abc", None, "0.25"]})
+
+    result = apply_schema(df, {"Calendar Effort": "float64"})
+
+    assert result["Calendar Effort"].dtype == "float64"
+    assert result["Calendar Effort"].tolist()[:2] == [1.5, 0.0]
+    assert pd.isna(result["Calendar Effort"].iloc[2])
+    assert result["Calendar Effort"].iloc[3] == 0.25
+
+
+def test_bad_effort_cell_still_produces_report(
+    sample_input, project_code_file, tmp_path
+):
+    df = read_excel_schema(sample_input, INPUT_SCHEMA).astype(
+        {"Calendar Effort": object}
+    )
+    df.loc[df.index[0], "Calendar Effort"] = "TBD"
+    input_file = tmp_path / "input_bad_effort.xlsx"
+    df.to_excel(input_file, index=False)
+
+    tool = ProjectReportTool(
+        ratecard_cache=RatecardCache(ratecard_dir=str(tmp_path / "ratecards"))
+    )
+    tool.data_processor.ingest_cache = IngestCache(cache_dir=str(tmp_path / "ingest"))
+    result = tool.run(str(input_file), project_code_file, str(tmp_path / "report.xlsx"))
+
+    assert result["rows"] == len(df)
+    assert (tmp_path / "report.xlsx").exists()
+
+
+@pytest.mark.parametrize(
+    "engine",
+    [
+        engine
+        for engine in get_available_engines()
+        if ".xls" in READER_ENGINES[engine]["extensions"]
+    ],
+)
+def test_engines_read_same_data(sample_input, engine):
+    expected = read_excel_schema(sample_input, INPUT_SCHEMA, engine="xlrd")
+
+    result = read_excel_schema(sample_input, INPUT_SCHEMA, engine=engine)
+
+    pd.testing.assert_frame_equal(result, expected)
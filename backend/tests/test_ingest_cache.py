@@ -0,0 +1,93 @@
+"""
+IngestCache khi nhiều process cùng đọc/evict một thư mục cache
+"""
+
+import os
+
+import pandas as pd
+import pytest
+
+import ingest_cache
+from ingest_cache import IngestCache
+
+pytestmark = pytest.mark.skipif(
+    ingest_cache.feather is None, reason="Cần pyarrow cho ingest cache"
+)
+
+
+def make_source(tmp_path, name="input.xls", content=b"data"):
+    path = tmp_path / name
+    path.write_bytes(content)
+    return str(path)
+
+
+def loader(file_path):
+    return pd.DataFrame({"Username": ["a", "b"], "Calendar Effort": [1.0, 0.5]})
+
+
+def test_load_uses_cache_on_second_call(tmp_path):
+    cache = IngestCache(cache_dir=str(tmp_path / "cache"))
+    source = make_source(tmp_path)
+    calls = []
+
+    def counting_loader(file_path):
+        calls.append(file_path)
+        return loader(file_path)
+
+    first = cache.load(source, counting_loader)
+    second = cache.load(source, counting_loader)
+
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(first, second)
+
+
+def test_evict_skips_files_removed_by_another_process(tmp_path, monkeypatch):
+    cache = IngestCache(cache_dir=str(tmp_path / "cache"), max_bytes=0)
+    cache.load(make_source(tmp_path), loader)
+
+    # Thư mục liệt kê một file mà process khác đã xóa
+    real_listdir = os.listdir
+    monkeypatch.setattr(
+        ingest_cache.os,
+        "listdir",
+        lambda path: real_listdir(path) + ["input_v2_gone.arrow"],
+    )
+
+    cache.evict()
+
+    assert real_listdir(cache.cache_dir) == []
+
+
+def test_evict_tolerates_concurrent_remove(tmp_path, monkeypatch):
+    cache = IngestCache(cache_dir=str(tmp_path / "cache"), max_bytes=0)
+    cache.load(make_source(tmp_path), loader)
+
+    # Process khác xóa file ngay trước khi evict xóa
+    real_remove = os.remove
+
+    def racing_remove(path):
+        real_remove(path)
+        real_remove(path)
+
+    monkeypatch.setattr(ingest_cache.os, "remove", racing_remove)
+
+    cache.evict()
+
+
+def test_hit_path_falls_back_when_file_disappears(tmp_path, monkeypatch):
+    cache = IngestCache(cache_dir=str(tmp_path / "cache"))
+    source = make_source(tmp_path)
+    cache.load(source, loader)
+    cache_path = cache.get_cache_path(cache.hash_file(source), "input")
+
+    # File bị evict giữa lúc kiểm tra tồn tại và lúc đọc
+    def read_evicted(path, *args, **kwargs):
+        os.remove(path)
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(ingest_cache.feather, "read_table", read_evicted)
+
+    df = cache.load(source, loader)
+
+    pd.testing.assert_frame_equal(df, loader(source))
+    assert os.path.exists(cache_path)
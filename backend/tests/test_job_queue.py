@@ -0,0 +1,161 @@
+"""
+Trạng thái job trong JobQueue
+"""
+
+import contextlib
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+
+import job_queue
+import main
+from job_queue import (
+    JOB_DONE,
+    JOB_FAILED,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    JobQueue,
+    run_job,
+)
+
+
+def insert_job(queue, job_id, status=JOB_QUEUED, owner_pid=None):
+    with contextlib.closing(job_queue._connect(queue.db_path)) as connection:
+        with connection:
+            connection.execute(
+                "INSERT INTO jobs (job_id, kind, status, params, created_at, "
+                "owner_pid) VALUES (?, 'single', ?, '{}', ?, ?)",
+                [job_id, status, job_queue._now(), owner_pid],
+            )
+
+
+def get_dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def fake_run(self, input_file, project_code_file, output_file=None, date_range=None):
+    with open(output_file, "wb") as f:
+        f.write(b"report")
+    return {"stages": {}}
+
+
+def test_metrics_error_does_not_fail_finished_job(tmp_path, monkeypatch):
+    queue = JobQueue(db_path=str(tmp_path / "jobs.sqlite3"))
+    insert_job(queue, "job1")
+    monkeypatch.setattr(main.ProjectReportTool, "run", fake_run)
+
+    def broken_metrics(db_path, metrics):
+        raise Exception("database is locked")
+
+    monkeypatch.setattr(job_queue, "_record_metrics", broken_metrics)
+
+    output_path = tmp_path / "report.xlsx"
+    run_job(
+        queue.db_path,
+        "job1",
+        "single",
+        {
+            "input_file": "input.xls",
+            "project_code_file": "project_code.xlsx",
+            "output_path": str(output_path),
+        },
+    )
+
+    assert queue.get("job1")["status"] == JOB_DONE
+    assert output_path.read_bytes() == b"report"
+
+
+def test_recover_fails_only_orphaned_jobs(tmp_path):
+    queue = JobQueue(db_path=str(tmp_path / "jobs.sqlite3"))
+    insert_job(queue, "legacy")
+    insert_job(queue, "orphaned", status=JOB_RUNNING, owner_pid=get_dead_pid())
+    # Job của một worker khác đang chạy (ở đây là chính process test)
+    insert_job(queue, "live", status=JOB_RUNNING, owner_pid=os.getpid())
+    insert_job(queue, "done", status=JOB_DONE)
+
+    queue.recover()
+
+    assert queue.get("legacy")["status"] == JOB_FAILED
+    assert queue.get("orphaned")["status"] == JOB_FAILED
+    assert queue.get("live")["status"] == JOB_RUNNING
+    assert queue.get("done")["status"] == JOB_DONE
+
+
+def test_adds_owner_column_to_existing_db(tmp_path):
+    db_path = str(tmp_path / "jobs.sqlite3")
+    with contextlib.closing(sqlite3.connect(db_path)) as connection, connection:
+        connection.execute(
+            "CREATE TABLE jobs (job_id TEXT PRIMARY KEY, kind TEXT NOT NULL, "
+            "status TEXT NOT NULL, params TEXT NOT NULL, output_file TEXT, "
+            "error TEXT, created_at TEXT NOT NULL, started_at TEXT, "
+            "finished_at TEXT)"
+        )
+
+    queue = JobQueue(db_path=db_path)
+    insert_job(queue, "queued", owner_pid=os.getpid())
+    queue.recover()
+
+    assert queue.get("queued")["status"] == JOB_QUEUED
+
+
+def wait_for(condition, timeout=30):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "Hết thời gian chờ"
+        time.sleep(0.05)
+
+
+def test_submit_after_worker_killed(tmp_path):
+    queue = JobQueue(db_path=str(tmp_path / "jobs.sqlite3"), max_workers=1)
+    params = {"output_path": str(tmp_path / "report.xlsx")}
+
+    # Loại job không hợp lệ: worker chạy xong ngay với trạng thái failed
+    first = queue.submit("unknown", params)
+    wait_for(lambda: queue.get(first)["status"] == JOB_FAILED)
+
+    # Worker bị kill (vd hết bộ nhớ) làm hỏng process pool
+    executor = queue._executor
+    for process in list(executor._processes.values()):
+        process.kill()
+    wait_for(lambda: executor._broken)
+
+    second = queue.submit("unknown", params)
+    wait_for(lambda: queue.get(second)["status"] not in (JOB_QUEUED, JOB_RUNNING))
+
+    assert "Loại job không hợp lệ" in queue.get(second)["error"]
+    assert queue.count_pending() == 0
+    queue._executor.shutdown()
+
+
+def test_stage_metrics_keep_largest_stage_rss(tmp_path):
+    db_path = str(tmp_path / "jobs.sqlite3")
+    # DB cũ: cột RSS còn tên peak_rss_mb
+    with contextlib.closing(sqlite3.connect(db_path)) as connection, connection:
+        connection.execute(
+            "CREATE TABLE stage_metrics (stage TEXT PRIMARY KEY, "
+            "runs INTEGER NOT NULL, wall_seconds REAL NOT NULL, "
+            "cpu_seconds REAL NOT NULL, rows INTEGER NOT NULL, "
+            "peak_rss_mb REAL NOT NULL)"
+        )
+
+    queue = JobQueue(db_path=db_path)
+    for rss_mb in [120.0, 150.0, 130.0]:
+        job_queue._record_metrics(
+            db_path,
+            {
+                "wall_time": 1.0,
+                "cpu_time": 1.0,
+                "rows": 10,
+                "rss_mb": rss_mb,
+                "stages": [],
+            },
+        )
+
+    (total,) = queue.get_metrics()["stages"]
+    assert total["stage"] == "total"
+    assert total["runs"] == 3
+    assert total["rss_mb"] == 150.0
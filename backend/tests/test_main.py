@@ -0,0 +1,49 @@
+"""
+Tham số command line và job spec của main.py
+"""
+
+import pytest
+
+from main import parse_args
+
+
+def write_spec(tmp_path, text):
+    path = tmp_path / "job.yaml"
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_spec_values_become_defaults(tmp_path):
+    spec = write_spec(
+        tmp_path,
+        "input_file: input.xls\nproject_code_file: project_code.xlsx\n"
+        "date_from: 2025-08\n",
+    )
+
+    is_batch, args = parse_args(["--spec", spec, "--to", "2025-09"])
+
+    assert not is_batch
+    assert args.input_file == "input.xls"
+    assert args.project_code_file == "project_code.xlsx"
+    assert args.date_from == (2025, 8)
+    assert args.date_to == (2025, 9)
+
+
+@pytest.mark.parametrize("key", ["unknown_option", "help", "spec"])
+def test_spec_rejects_unknown_options(tmp_path, key, capsys):
+    spec = write_spec(tmp_path, f"input_file: input.xls\n{key}: x\n")
+
+    with pytest.raises(SystemExit):
+        parse_args(["--spec", spec])
+
+    assert "Job spec có option không hợp lệ" in capsys.readouterr().err
+
+
+def test_write_only_requires_openpyxl_writer():
+    with pytest.raises(SystemExit):
+        parse_args(["input.xls", "project_code.xlsx", "--write-only"])
+
+    _, args = parse_args(
+        ["input.xls", "project_code.xlsx", "--write-only", "--writer", "openpyxl"]
+    )
+    assert args.write_only
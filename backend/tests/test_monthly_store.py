@@ -0,0 +1,142 @@
+"""
+Kho dữ liệu theo tháng: báo cáo incremental so với chạy lại toàn bộ
+"""
+
+import contextlib
+import functools
+import io
+import os
+
+import openpyxl
+import pandas as pd
+import pytest
+
+import data_processor
+from conftest import UPLOADS_DIR
+from ingest_cache import IngestCache
+from main_multi_files import MultiFileProjectReportTool
+from monthly_store import MonthlyStore
+from ratecard_cache import RatecardCache
+
+MONTH_FILES = [
+    (os.path.join(UPLOADS_DIR, "input_t8.xls"), 2025, 8),
+    (os.path.join(UPLOADS_DIR, "input_t9.xls"), 2025, 9),
+]
+
+
+@pytest.fixture(autouse=True)
+def ingest_cache_dir(tmp_path, monkeypatch):
+    """Cache đọc Excel của các DataProcessor tạo trong tool nằm trong tmp_path"""
+    monkeypatch.setattr(
+        data_processor,
+        "IngestCache",
+        functools.partial(IngestCache, cache_dir=str(tmp_path / "ingest")),
+    )
+
+
+def run_tool(
+    tmp_path, method, file_list, project_code_file, output_file=None, store=None
+):
+    """Chạy tool (đọc file tuần tự), trả về (metrics, sự kiện tiến độ)"""
+    events = []
+    tool = MultiFileProjectReportTool(
+        max_workers=1,
+        monthly_store=store,
+        ratecard_cache=RatecardCache(ratecard_dir=str(tmp_path / "ratecards")),
+        progress_callback=events.append,
+    )
+    with contextlib.redirect_stdout(io.StringIO()):
+        metrics = getattr(tool, method)(
+            file_list,
+            project_code_file,
+            output_file or str(tmp_path / "report.xlsx"),
+        )
+    return metrics, {event["stage"]: event["rows"] for event in events}
+
+
+def read_summary(output_file):
+    return pd.read_excel(output_file, sheet_name="Summary", index_col=0)
+
+
+def write_changed_ratecard(project_code_file, output_file, project_code):
+    """Bản sao project_code.xlsx với ratecard của project_code tăng thêm 1000"""
+    workbook = openpyxl.load_workbook(project_code_file)
+    for row in workbook.active.iter_rows():
+        if row[0].value == project_code:
+            row[3].value += 1000
+    workbook.save(output_file)
+    return str(output_file)
+
+
+def test_incremental_report_matches_full_run(tmp_path, project_code_file):
+    store = MonthlyStore(str(tmp_path / "monthly"))
+    full_report = str(tmp_path / "full.xlsx")
+    incremental_report = str(tmp_path / "incremental.xlsx")
+
+    run_tool(tmp_path, "run_multi_files", MONTH_FILES, project_code_file, full_report)
+    # Thêm lần lượt từng tháng vào kho
+    run_tool(
+        tmp_path, "run_incremental", MONTH_FILES[:1], project_code_file, store=store
+    )
+    _, stages = run_tool(
+        tmp_path,
+        "run_incremental",
+        MONTH_FILES[1:],
+        project_code_file,
+        incremental_report,
+        store=store,
+    )
+
+    assert store.get_months() == [(2025, 8), (2025, 9)]
+    assert stages["update_store"] == stages["load_input"]
+    pd.testing.assert_frame_equal(
+        read_summary(incremental_report), read_summary(full_report)
+    )
+
+
+def test_store_only_recomputes_changed_months(tmp_path, project_code_file):
+    store = MonthlyStore(str(tmp_path / "monthly"))
+    hash_file = IngestCache().hash_file
+    ratecard_hash = hash_file(project_code_file)
+
+    run_tool(tmp_path, "run_incremental", MONTH_FILES, project_code_file, store=store)
+    for file_path, year, month in MONTH_FILES:
+        assert store.is_current(year, month, hash_file(file_path), ratecard_hash)
+        assert not store.is_current(year, month, hash_file(file_path), "other")
+
+    # Cùng file, cùng ratecard: không đọc lại file nào
+    _, stages = run_tool(
+        tmp_path, "run_incremental", MONTH_FILES, project_code_file, store=store
+    )
+    assert stages["update_store"] == 0
+    assert "load_input" not in stages
+
+    # Đổi ratecard: các tháng được tính lại từ dữ liệu đã lưu
+    new_project_code = write_changed_ratecard(
+        project_code_file, tmp_path / "project_code_new.xlsx", "FHNNGTDevOps"
+    )
+    old_report = str(tmp_path / "old.xlsx")
+    run_tool(tmp_path, "run_multi_files", MONTH_FILES, project_code_file, old_report)
+    full_report = str(tmp_path / "full.xlsx")
+    incremental_report = str(tmp_path / "incremental.xlsx")
+    run_tool(tmp_path, "run_multi_files", MONTH_FILES, new_project_code, full_report)
+    _, stages = run_tool(
+        tmp_path,
+        "run_incremental",
+        [],
+        new_project_code,
+        incremental_report,
+        store=store,
+    )
+
+    assert "load_input" not in stages
+    assert stages["update_store"] > 0
+    new_hash = hash_file(new_project_code)
+    assert all(
+        store.get_entry(year, month)["ratecard_hash"] == new_hash
+        for year, month in store.get_months()
+    )
+    assert not read_summary(full_report).equals(read_summary(old_report))
+    pd.testing.assert_frame_equal(
+        read_summary(incremental_report), read_summary(full_report)
+    )
@@ -0,0 +1,34 @@
+"""
+Số liệu đo từng bước của ProgressReporter
+"""
+
+import sys
+
+import pytest
+
+from progress import ProgressReporter, get_peak_rss_mb, get_rss_mb
+
+
+def test_stage_metrics_and_events():
+    events = []
+    reporter = ProgressReporter(events.append)
+
+    reporter.emit("load_input", "Đã đọc file đầu vào", 1, 2, 10)
+    reporter.emit("done", "Hoàn thành", 2, 2, 10)
+    metrics = reporter.get_metrics()
+
+    assert [event["stage"] for event in events] == ["load_input", "done"]
+    assert [stage["stage"] for stage in metrics["stages"]] == ["load_input", "done"]
+    assert set(metrics["stages"][0]) >= {"rows", "wall_time", "cpu_time", "rss_mb"}
+    assert "peak_rss_mb" not in metrics["stages"][0]
+    assert metrics["rss_mb"] == max(stage["rss_mb"] for stage in metrics["stages"])
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="Cần /proc")
+def test_rss_is_current_not_process_peak():
+    # Cấp phát rồi giải phóng: mức cao nhất của process tăng, RSS hiện tại giảm
+    block = bytearray(64 * 1024 * 1024)
+    block[::4096] = b"x" * len(block[::4096])
+    del block
+
+    assert get_rss_mb() < get_peak_rss_mb()
@@ -0,0 +1,35 @@
+"""
+Báo cáo tạo với backend ghi mặc định
+"""
+
+import openpyxl
+
+from config import REPORT_WRITER
+from ingest_cache import IngestCache
+from main import ProjectReportTool
+from ratecard_cache import RatecardCache
+
+
+def test_default_report_has_cached_formula_values(
+    sample_input, project_code_file, tmp_path
+):
+    tool = ProjectReportTool(
+        ratecard_cache=RatecardCache(ratecard_dir=str(tmp_path / "ratecards"))
+    )
+    tool.data_processor.ingest_cache = IngestCache(cache_dir=str(tmp_path / "ingest"))
+    output_file = str(tmp_path / "report.xlsx")
+    tool.run(sample_input, project_code_file, output_file)
+
+    formulas = openpyxl.load_workbook(output_file)
+    values = openpyxl.load_workbook(output_file, data_only=True)
+
+    assert REPORT_WRITER == "xlsxwriter"
+    for sheet, cell in [("Project Report", "F2"), ("Project Report", "K2")]:
+        # Vẫn là công thức (liên kết với Project_Code) nhưng đọc được giá trị
+        assert str(formulas[sheet][cell].value).startswith("=")
+        assert isinstance(values[sheet][cell].value, (int, float))
+
+    summary = values["Summary"]
+    total_revenue = [cell.value for cell in summary[2][1:]]
+    assert summary["A2"].value == "Total Revenue"
+    assert all(isinstance(value, (int, float)) for value in total_revenue)
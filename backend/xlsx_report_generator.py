@@ -0,0 +1,363 @@
+"""
+Module tạo báo cáo Excel bằng XlsxWriter (chế độ constant_memory)
+Cùng bố cục và định dạng với ReportGenerator (openpyxl)
+"""
+
+import pandas as pd
+import xlsxwriter
+
+from calculator import RevenueCalculator
+from report_generator import ReportGenerator
+from report_styles import STYLE_ROLES, get_border_sides
+
+# Mã kiểu viền của XlsxWriter
+BORDER_STYLES = {"thin": 1, "medium": 2}
+
+# calcId của Excel hiện tại: file có calcId cũ hơn bị Excel tính lại toàn bộ
+EXCEL_CALC_ID = 191029
+
+
+class XlsxWriterReportGenerator(ReportGenerator):
+    """Class tạo báo cáo Excel bằng XlsxWriter, ghi từng dòng ra đĩa"""
+
+    def __init__(self, conditional_formatting=False):
+        super().__init__(conditional_formatting=conditional_formatting)
+        self._formats = {}
+
+    def create_workbook(self, output_path):
+        """Tạo workbook mới ở chế độ constant_memory"""
+        self.workbook = xlsxwriter.Workbook(
+            output_path, {"constant_memory": True, "nan_inf_to_errors": True}
+        )
+        # Mọi formula đều được ghi kèm kết quả tính sẵn nên không cần
+        # tính lại toàn bộ khi mở file (formula vẫn tự cập nhật khi sửa)
+        self.workbook.set_calc_mode("auto", calc_id=EXCEL_CALC_ID)
+        self.workbook.calc_on_load = False
+        self._formats = {}
+
+    def get_format(self, role, number_format=None):
+        """
+        Lấy format của role, mỗi (role, number format) chỉ tạo một lần
+        cho workbook
+
+        Args:
+            role: Tên role trong report_styles.STYLE_ROLES
+            number_format: Định dạng số ghi đè định dạng mặc định của role
+        """
+        key = (role, number_format)
+        if key not in self._formats:
+            if role not in STYLE_ROLES:
+                raise Exception(f"Không có style cho role '{role}'")
+            spec = STYLE_ROLES[role]
+            properties = self._get_fill_font_properties(spec)
+
+            if "align" in spec:
+                properties["align"] = spec["align"]
+                properties["valign"] = "vcenter"
+            for side, kind in get_border_sides(spec.get("border")).items():
+                properties[side] = BORDER_STYLES[kind]
+            if number_format is None:
+                number_format = spec.get("number_format")
+            if number_format is not None:
+                properties["num_format"] = number_format
+
+            self._formats[key] = self.workbook.add_format(properties)
+        return self._formats[key]
+
+    def get_conditional_format(self, role):
+        """Format (chỉ fill và font) của role dùng cho conditional formatting"""
+        key = ("conditional", role)
+        if key not in self._formats:
+            if role not in STYLE_ROLES:
+                raise Exception(f"Không có style cho role '{role}'")
+            self._formats[key] = self.workbook.add_format(
+                self._get_fill_font_properties(STYLE_ROLES[role])
+            )
+        return self._formats[key]
+
+    def _get_fill_font_properties(self, spec):
+        """Thuộc tính fill và font của XlsxWriter theo định nghĩa role"""
+        properties = {}
+        if "fill" in spec:
+            properties["bg_color"] = "#" + spec["fill"]
+            properties["pattern"] = 1
+        font = spec.get("font", {})
+        if font.get("bold"):
+            properties["bold"] = True
+        if "size" in font:
+            properties["font_size"] = font["size"]
+        if "color" in font:
+            properties["font_color"] = "#" + font["color"]
+        return properties
+
+    def write_value(self, ws, row, col, value, cell_format=None, result=None):
+        """
+        Ghi một giá trị (formula, số, chuỗi hoặc ô trống) với format
+
+        Args:
+            result: Kết quả tính sẵn của formula, được lưu cùng formula để
+                file mở ra và đọc bằng pandas không cần tính lại
+        """
+        if value is None or (not isinstance(value, str) and pd.isna(value)):
+            ws.write_blank(row, col, None, cell_format)
+        elif isinstance(value, str) and value.startswith("="):
+            if result is None or pd.isna(result):
+                result = 0
+            ws.write_formula(row, col, value, cell_format, result)
+        else:
+            ws.write(row, col, value, cell_format)
+
+    def generate_report_two_sheets(
+        self,
+        df_input,
+        df_monthly,
+        month_list,
+        output_path,
+        df_project_code=None,
+        monthly_metrics=None,
+    ):
+        """
+        Tạo báo cáo 2 sheets (cùng contract với ReportGenerator):
+        1. Project Report: records gốc
+        2. Summary: Metrics theo tháng (allocate)
+        """
+        self.create_workbook(output_path)
+
+        # Lấy tất cả Project Codes từ df_input
+        all_project_codes = (
+            df_input["Project Code"].astype(str).str.strip().unique().tolist()
+        )
+
+        # 1. Tạo sheet Project_Code (với tất cả project codes)
+        if df_project_code is not None:
+            self.create_project_code_sheet(df_project_code, all_project_codes)
+            self.progress.emit(
+                "project_code_sheet",
+                "Đã tạo sheet Project_Code",
+                rows=len(df_project_code),
+            )
+
+        # 2. Tạo sheet Project Report (records gốc)
+        print("  Tạo sheet Project Report...")
+        self._create_project_report_sheet(df_input, df_project_code)
+        self.progress.emit(
+            "project_report_sheet", "Đã tạo sheet Project Report", rows=len(df_input)
+        )
+
+        # 3. Tạo sheet Summary (metrics theo tháng)
+        print("  Tạo sheet Summary...")
+        self._create_summary_sheet(df_monthly, month_list, monthly_metrics)
+        self.progress.emit(
+            "summary_sheet", "Đã tạo sheet Summary", rows=len(month_list)
+        )
+
+        # 4. Lưu file
+        self.workbook.close()
+        self.progress.emit("save", "Đã lưu file báo cáo")
+        print(f"✓ Báo cáo đã được tạo: {output_path}")
+
+    def create_project_code_sheet(self, df_project_code, all_project_codes):
+        """Tạo sheet Project_Code từ DataFrame và đảm bảo có đủ tất cả Project Codes"""
+        df_project_code, project_code_col_idx = self.prepare_project_code_table(
+            df_project_code, all_project_codes
+        )
+
+        ws = self.workbook.add_worksheet("Project_Code")
+
+        header_format = self.get_format("header")
+
+        for col_idx, column_name in enumerate(df_project_code.columns):
+            ws.set_column(
+                col_idx, col_idx, self.get_project_code_column_width(column_name)
+            )
+            ws.write(0, col_idx, column_name, header_format)
+
+        column_formats = [
+            self.get_format(
+                "ratecard cell" if column_name == "Ratecard" else "project code cell"
+            )
+            for column_name in df_project_code.columns
+        ]
+
+        self.project_code_row_map = {}
+
+        for row_idx, row_data in enumerate(
+            df_project_code.itertuples(index=False), start=2
+        ):
+            for col_idx, value in enumerate(row_data):
+                self.write_value(
+                    ws, row_idx - 1, col_idx, value, column_formats[col_idx]
+                )
+
+            project_code = str(row_data[project_code_col_idx - 1]).strip()
+            self.project_code_row_map[project_code] = row_idx
+
+    def _create_project_report_sheet(self, df_input, df_project_code):
+        """Tạo sheet Project Report với records gốc và bảng Total đẹp"""
+        ws = self.workbook.add_worksheet("Project Report")
+
+        # Kiểm tra xem có cột Month_Label không (multi-file mode)
+        has_month_label = "Month_Label" in df_input.columns
+
+        headers = ["NO"]
+        widths = [6]
+        if has_month_label:
+            headers.append("MONTH")
+            widths.append(15)
+        headers += [
+            "ACCOUNT",
+            "MAIL",
+            "PROJECT CODE",
+            "AI PROJECT",
+            "REVENUE",
+            "CALENDAR EFFORT",
+            "MEMBER TYPE",
+        ]
+        widths += [18, 28, 25, 13, 15, 16, 14, 3]
+
+        summary_start_col = len(headers) + 1  # Cột trống làm khoảng cách
+        for col_idx, width in enumerate(widths):
+            ws.set_column(col_idx, col_idx, width)
+        ws.set_column(summary_start_col, summary_start_col, 22)
+        ws.set_column(summary_start_col + 1, summary_start_col + 1, 18)
+
+        # Freeze panes
+        ws.freeze_panes(1, 0)
+
+        data_start_row = 2
+        data_end_row = data_start_row + len(df_input) - 1
+
+        header_format = self.get_format("report header")
+
+        # Header row
+        for col_idx, header in enumerate(headers):
+            ws.write(0, col_idx, header, header_format)
+        self._write_total_summary_title(ws, summary_start_col)
+
+        summary_items = self.get_total_summary_items(
+            has_month_label, data_start_row, data_end_row
+        )
+        # {dòng Excel: item} cho bảng summary nằm cùng các dòng data
+        summary_values = self.get_total_summary_values(df_input)
+        summary_rows = {
+            row_idx: (item, value)
+            for row_idx, (item, value) in enumerate(
+                zip(summary_items, summary_values), start=2
+            )
+            if item is not None
+        }
+
+        # Lấy dữ liệu theo cột một lần rồi ghi từng dòng
+        columns = self.get_project_report_columns(df_input, has_month_label)
+        revenue_values = self.get_revenue_values(columns[headers.index("PROJECT CODE")])
+        ai_col_idx = headers.index("AI PROJECT")
+        revenue_col_idx = headers.index("REVENUE")
+        row_formats = {}
+
+        for row_idx, values in enumerate(zip(*columns), start=data_start_row):
+            key = (self.get_row_role(values[-1]), self.get_ai_role(values[ai_col_idx]))
+            if key not in row_formats:
+                row_formats[key] = [
+                    self.get_format(role)
+                    for role in self.get_project_report_roles(*key, has_month_label)
+                ]
+
+            revenue_value = revenue_values[row_idx - data_start_row]
+            for col_idx, (value, cell_format) in enumerate(
+                zip(values, row_formats[key])
+            ):
+                self.write_value(
+                    ws,
+                    row_idx - 1,
+                    col_idx,
+                    value,
+                    cell_format,
+                    revenue_value if col_idx == revenue_col_idx else None,
+                )
+
+            # constant_memory: phải ghi xong bảng summary của dòng này luôn
+            if row_idx in summary_rows:
+                self._write_total_summary_row(
+                    ws, row_idx, summary_start_col, *summary_rows.pop(row_idx)
+                )
+
+        # Bảng summary dài hơn data (ít dòng) thì ghi nốt các dòng còn lại
+        for row_idx in sorted(summary_rows):
+            self._write_total_summary_row(
+                ws, row_idx, summary_start_col, *summary_rows[row_idx]
+            )
+
+        if self.conditional_formatting:
+            for cell_range, formula, role in self.get_row_format_rules(
+                has_month_label, data_start_row, data_end_row
+            ):
+                ws.conditional_format(
+                    cell_range.split()[0],
+                    {
+                        "type": "formula",
+                        "criteria": "=" + formula,
+                        "format": self.get_conditional_format(role),
+                        "multi_range": cell_range,
+                    },
+                )
+
+    def _write_total_summary_title(self, ws, summary_start_col):
+        """Ghi title merge của bảng TOTAL SUMMARY"""
+        title_format = self.get_format("summary title")
+        ws.merge_range(
+            0,
+            summary_start_col,
+            0,
+            summary_start_col + 1,
+            "📊 TOTAL SUMMARY",
+            title_format,
+        )
+
+    def _write_total_summary_row(self, ws, row_idx, summary_start_col, item, result):
+        """Ghi một dòng (nhãn, formula kèm kết quả) của bảng TOTAL SUMMARY"""
+        label, formula, number_format, is_total = item
+
+        # Total Members (dòng cuối) dùng style riêng
+        role = "summary total" if is_total else "summary"
+        label_format = self.get_format(f"{role} label")
+        value_format = self.get_format(f"{role} value", number_format)
+
+        ws.write(row_idx - 1, summary_start_col, label, label_format)
+        self.write_value(
+            ws, row_idx - 1, summary_start_col + 1, formula, value_format, result
+        )
+
+    def _create_summary_sheet(self, df_monthly, month_list, metrics=None):
+        """Tạo sheet Summary với metrics theo tháng dùng Excel formulas"""
+        if metrics is None:
+            metrics = RevenueCalculator().get_monthly_metrics(df_monthly, month_list)
+
+        ws = self.workbook.add_worksheet("Summary")
+
+        # Set column widths
+        ws.set_column(0, 0, 25)
+        if month_list:
+            ws.set_column(1, len(month_list), 15)
+
+        header_format = self.get_format("header")
+        label_format = self.get_format("metric label")
+
+        # Header row
+        headers = ["Metrics"] + [f"{self.get_month_name(m)} {y}" for y, m in month_list]
+        for col_idx, header in enumerate(headers):
+            ws.write(0, col_idx, header, header_format)
+
+        summary_rows = zip(
+            self.get_summary_rows(metrics, len(month_list), 2),
+            self.get_summary_row_values(metrics),
+        )
+        for row_idx, ((label, values, number_format), results) in enumerate(
+            summary_rows, start=1
+        ):
+            ws.write(row_idx, 0, label, label_format)
+            value_format = self.get_format("metric value", number_format)
+
+            # Revenue NaN (tháng không có dữ liệu) thì để trống
+            for col_idx, (value, result) in enumerate(zip(values, results), start=1):
+                if pd.notna(value):
+                    self.write_value(ws, row_idx, col_idx, value, value_format, result)